@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'app',
     'core',
@@ -116,6 +117,37 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local memory default is private to each worker process, which leaves
+# token lookups uncached until CACHE_BACKEND names a shared backend, as
+# docker-compose-deploy.yml does with memcached
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'groupfit'),
+    }
+}
+
+# Lifetime of cached API responses, which are also keyed on data versions
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Lifetime of cached token lookups of member.authentication, which are only
+# cached when CACHE_BACKEND is shared by the workers, e.g. memcached
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+# Member tokens: 'db' issues DRF tokens, 'signed' issues short lived access
+# tokens signed with SECRET_KEY plus refresh tokens (see member.tokens)
+MEMBER_TOKEN_MODE = os.environ.get('MEMBER_TOKEN_MODE', 'db')
+ACCESS_TOKEN_LIFETIME = int(os.environ.get('ACCESS_TOKEN_LIFETIME', 5 * 60))
+REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get('REFRESH_TOKEN_LIFETIME', 30 * 24 * 60 * 60))
+# Seconds between reloads of the revoked access token list
+TOKEN_REVOCATION_REFRESH = 30
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -156,6 +188,28 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Media is authorised by EvidenceMediaView and, unless disabled, handed to
+# the nginx internal location below with X-Accel-Redirect
+
+MEDIA_ACCEL_REDIRECT = bool(int(
+    os.environ.get('MEDIA_ACCEL_REDIRECT', int(not DEBUG))))
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Workout evidence uploads, streamed to MEDIA_ROOT by group.uploads
+
+EVIDENCE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('EVIDENCE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
+EVIDENCE_MAX_IMAGE_DIMENSION = 8192
+EVIDENCE_MAX_IMAGE_PIXELS = 40_000_000
+
+# Background tasks (evidence image derivatives)
+
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 2))
+BACKGROUND_TASKS_EAGER = bool(int(os.environ.get('BACKGROUND_TASKS_EAGER', 0)))
+
+# Feeds with more recipients than this are written by the background tasks
+TIMELINE_INLINE_FANOUT = 200
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
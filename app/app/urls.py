@@ -20,9 +20,10 @@ from drf_spectacular.views import (
 )
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from group.views import EvidenceMediaView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -35,11 +36,10 @@ urlpatterns = [
     path('api/member/', include('member.urls')),
     path('api/group/', include('group.urls')),
     path('api/friends/', include('friends.urls')),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}<path:path>',
+        EvidenceMediaView.as_view(),
+        name='media',
+    ),
 
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT,
-    )
@@ -58,3 +58,5 @@ admin.site.register(models.Group)
 admin.site.register(models.GroupMembership)
 admin.site.register(models.GroupWorkout)
 admin.site.register(models.GroupWorkoutEvidence)
+admin.site.register(models.GroupStats)
+admin.site.register(models.EvidenceBlob)
@@ -0,0 +1,255 @@
+"""
+Scripted load against the GroupFit API, with latency percentiles
+"""
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from io import BytesIO
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.urls import reverse
+from PIL import Image
+
+# Relative frequency of the scenarios a virtual member runs
+SCENARIO_WEIGHTS = {
+    'login': 1,
+    'group_dashboard': 4,
+    'friend_search': 3,
+    'evidence_upload': 1,
+}
+REQUEST_TIMEOUT = 30
+
+
+class VirtualMember:
+    """One simulated member driving the API over HTTP"""
+
+    def __init__(self, runner, email, rng):
+        self.runner = runner
+        self.email = email
+        self.rng = rng
+        self.authorization = None
+        self.member_id = None
+
+    def request(self, label, method, path, params=None, data=None,
+                content_type='application/json'):
+        """Sends the request and records its latency under the label"""
+        url = self.runner.base_url + path
+        if params:
+            url += '?' + urlencode(params)
+        if data is not None and content_type == 'application/json':
+            data = json.dumps(data).encode()
+        request = Request(url, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', content_type)
+        if self.authorization:
+            request.add_header('Authorization', self.authorization)
+
+        started = time.monotonic()
+        try:
+            with urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                body = response.read()
+            ok = True
+        except HTTPError as exc:
+            body = exc.read()
+            ok = False
+        except (URLError, OSError):
+            body = b''
+            ok = False
+        self.runner.record(label, started, time.monotonic() - started, ok)
+
+        if not ok:
+            return None
+        return json.loads(body) if body else {}
+
+    def login(self):
+        """Obtains a token through CreateTokenView"""
+        self.authorization = None
+        tokens = self.request('member:token', 'POST', reverse('member:token'),
+                              data={'email': self.email,
+                                    'password': self.runner.password})
+        if not tokens:
+            return
+        if 'access' in tokens:
+            self.authorization = f'Bearer {tokens["access"]}'
+        else:
+            self.authorization = f'Token {tokens["token"]}'
+
+        profile = self.request('member:me', 'GET', reverse('member:me'))
+        self.member_id = profile['id'] if profile else None
+
+    def pick_group(self):
+        """Id of one of the member's groups, None if they have none"""
+        page = self.request('group:group-getGroups', 'GET',
+                            reverse('group:group-getGroups'))
+        if not page or not page['results']:
+            return None
+        return self.rng.choice(page['results'])['id']
+
+    def group_dashboard(self):
+        """Loads the screens of a group the member belongs to"""
+        group_id = self.pick_group()
+        if group_id is None:
+            return
+        params = {'group_id': group_id}
+        for route in ('group:group-members', 'group:group-stats'):
+            self.request(route, 'GET', reverse(route), params)
+        self.request('group:group-progress', 'GET',
+                     reverse('group:group-progress'),
+                     {'group_id': group_id, 'weeks': 4})
+        self.request('group:workout-groupEvidenceLog', 'GET',
+                     reverse('group:workout-groupEvidenceLog',
+                             kwargs={'pk': None}), params)
+
+    def friend_search(self):
+        """Searches for members and lists the member's friends"""
+        self.request('member:member-getMemberSearchResults', 'GET',
+                     reverse('member:member-getMemberSearchResults'),
+                     {'search_string': self.rng.choice(
+                         self.runner.search_terms)})
+        if self.member_id is not None:
+            self.request('friends:friends-getFriends', 'GET',
+                         reverse('friends:friends-getFriends'),
+                         {'user_id': self.member_id})
+
+    def evidence_upload(self):
+        """Uploads an image as evidence for a workout of a group"""
+        group_id = self.pick_group()
+        if group_id is None:
+            return
+        workouts = self.request('group:workout-workout', 'GET',
+                                reverse('group:workout-workout',
+                                        kwargs={'pk': None}),
+                                {'group_id': group_id})
+        if not workouts:
+            return
+
+        boundary = uuid.uuid4().hex
+        body, content_type = encode_multipart(boundary, {
+            'workout_id': str(self.rng.choice(workouts)['id']),
+            'comment': 'Benchmark evidence',
+        }, ('evidence_image', 'evidence.jpg', make_evidence_image(self.rng)))
+        self.request('group:workout-uploadEvidence', 'POST',
+                     reverse('group:workout-uploadEvidence',
+                             kwargs={'pk': None}),
+                     data=body, content_type=content_type)
+
+    def run(self, deadline):
+        """Runs weighted scenarios until the deadline"""
+        self.login()
+        names = list(SCENARIO_WEIGHTS)
+        weights = [SCENARIO_WEIGHTS[name] for name in names]
+        while time.monotonic() < deadline:
+            if self.authorization is None:
+                self.login()
+                continue
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+class LoadRunner:
+    """Runs concurrent virtual members against a base URL
+
+    Samples taken during the warmup are left out of the results, so
+    connection set up and cold caches do not skew the percentiles.
+    """
+
+    def __init__(self, base_url, emails, password, search_terms,
+                 concurrency=8, duration=30, warmup=5, seed=0):
+        self.base_url = base_url.rstrip('/')
+        self.emails = emails
+        self.password = password
+        self.search_terms = search_terms
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.seed = seed
+        self.samples = []
+        self.measure_from = None
+
+    def record(self, label, started, latency, ok):
+        if started >= self.measure_from:
+            # list.append is atomic, workers share the list without a lock
+            self.samples.append((label, latency, ok))
+
+    def run(self):
+        """Drives the load, returns the samples and the measured seconds"""
+        rng = random.Random(self.seed)
+        started = time.monotonic()
+        self.measure_from = started + self.warmup
+        deadline = self.measure_from + self.duration
+        workers = [
+            threading.Thread(
+                target=VirtualMember(self, rng.choice(self.emails),
+                                     random.Random(rng.random())).run,
+                args=(deadline,), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        return self.samples, time.monotonic() - self.measure_from
+
+
+def make_evidence_image(rng):
+    """A small JPEG, its colour random so uploads are rarely duplicates"""
+    content = BytesIO()
+    colour = tuple(rng.randrange(256) for _ in range(3))
+    Image.new('RGB', (64, 48), colour).save(content, format='JPEG')
+    return content.getvalue()
+
+
+def encode_multipart(boundary, fields, upload):
+    """Body and content type of a multipart form with one file"""
+    name, filename, content = upload
+    lines = []
+    for field, value in fields.items():
+        lines += [f'--{boundary}'.encode(),
+                  f'Content-Disposition: form-data; name="{field}"'.encode(),
+                  b'', value.encode()]
+    lines += [f'--{boundary}'.encode(),
+              f'Content-Disposition: form-data; name="{name}"; '
+              f'filename="{filename}"'.encode(),
+              b'Content-Type: image/jpeg', b'', content,
+              f'--{boundary}--'.encode(), b'']
+
+    return b'\r\n'.join(lines), f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of values sorted in ascending order"""
+    if not values:
+        return None
+    return values[max(math.ceil(fraction * len(values)), 1) - 1]
+
+
+def summarise(samples, elapsed):
+    """Throughput and latency percentiles by endpoint and overall"""
+    by_label = {}
+    for label, latency, ok in samples:
+        by_label.setdefault(label, []).append((latency, ok))
+
+    def stats(rows):
+        latencies = sorted(latency * 1000 for latency, _ in rows)
+        return {
+            'requests': len(rows),
+            'errors': sum(1 for _, ok in rows if not ok),
+            'throughput': round(len(rows) / elapsed, 2) if elapsed else None,
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2),
+        }
+
+    return {
+        'endpoints': {label: stats(rows)
+                      for label, rows in sorted(by_label.items())},
+        'total': stats([(latency, ok) for _, latency, ok in samples])
+        if samples else None,
+    }
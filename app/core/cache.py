@@ -0,0 +1,73 @@
+"""
+Read-through caching of API responses scoped to a group or a user
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+# ResponseCache instances by name, for reporting their counters
+registry = {}
+
+
+class ResponseCache:
+    """Read-through cache of data belonging to one group or user
+
+    Entries are keyed by the version counter of the group or user, which
+    writes bump in the same transaction as the rows they change. Every
+    worker reads the committed counter from the database, so none of
+    them can serve an entry cached for an older version, whatever the
+    cache backend.
+    """
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        registry[name] = self
+
+    def get_or_set(self, scope_id, version, compute, variant=''):
+        """Returns the value cached for the version, computing it on a miss
+
+        Without a version (e.g. an unknown group) nothing is cached.
+        """
+        if version is None or not str(scope_id).isdigit():
+            # Only ids make safe keys, anything else is computed uncached
+            return compute()
+
+        key = f'{self.name}:{scope_id}:{version}:{variant}'
+
+        value = cache.get(key)
+        if value is None:
+            _count(self.name, 'misses')
+            value = compute()
+            timeout = self.timeout or settings.RESPONSE_CACHE_TIMEOUT
+            cache.set(key, value, timeout)
+        else:
+            _count(self.name, 'hits')
+
+        return value
+
+
+def get_stats():
+    """Hit and miss counts of each response cache"""
+    keys = [_counter_key(name, outcome)
+            for name in registry for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+
+    return {
+        name: {outcome: counts.get(_counter_key(name, outcome), 0)
+               for outcome in ('hits', 'misses')}
+        for name in sorted(registry)
+    }
+
+
+def _count(name, outcome):
+    key = _counter_key(name, outcome)
+    # add() then incr() keeps the counter shared between workers
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def _counter_key(name, outcome):
+    return f'cache-stats:{name}:{outcome}'
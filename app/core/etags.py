@@ -0,0 +1,42 @@
+"""
+Conditional GET support for list endpoints with version counters
+"""
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def list_etag(request, resource, version):
+    """ETag of a list from its version and the request's query string"""
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha1(repr(query).encode()).hexdigest()[:16]
+    return quote_etag(f'{resource}-{version}-{digest}')
+
+
+def conditional_response(request, resource, version, get_response):
+    """Answers 304 when the client holds the current version of the list
+
+    The version is looked up by the caller with a single-row query, so
+    an unchanged list is never queried or serialized. Without a version
+    (e.g. an unknown group) the response is built as usual.
+    """
+    if version is None:
+        return get_response()
+
+    etag = list_etag(request, resource, version)
+    client_etags = [tag[2:] if tag.startswith('W/') else tag
+                    for tag in parse_etags(
+                        request.headers.get('If-None-Match', ''))]
+    if etag in client_etags or '*' in client_etags:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = get_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+
+    response['ETag'] = etag
+    # Clients may keep the list but must revalidate it before use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
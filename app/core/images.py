@@ -0,0 +1,97 @@
+"""
+Resized derivatives of workout evidence images
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core.models import EvidenceBlob, Group, GroupWorkoutEvidence
+
+# Derivative field -> (file name suffix, bounding box)
+EVIDENCE_DERIVATIVES = {
+    'evidence_thumbnail': ('thumb', (320, 320)),
+    'evidence_medium': ('medium', (1080, 1080)),
+}
+DERIVATIVE_JPEG_QUALITY = 82
+
+
+def derivative_name(name, suffix):
+    """Storage name of a derivative, kept alongside the original"""
+    stem = os.path.splitext(name)[0]
+    return f'{stem}_{suffix}.jpg'
+
+
+def render_derivative(image, size):
+    """Encodes the image scaled down to fit within size as a JPEG"""
+    derivative = image.copy()
+    derivative.thumbnail(size, Image.LANCZOS)
+    if derivative.mode != 'RGB':
+        derivative = derivative.convert('RGB')
+
+    output = BytesIO()
+    derivative.save(output, format='JPEG', quality=DERIVATIVE_JPEG_QUALITY,
+                    optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def generate_evidence_derivatives(evidence_id):
+    """Creates the missing derivatives of an evidence image"""
+    evidence = GroupWorkoutEvidence.objects.filter(id=evidence_id).only(
+        'id', 'group_id', 'evidence_image').first()
+    if not evidence or not evidence.evidence_image:
+        return
+
+    original = evidence.evidence_image
+    storage = original.storage
+    largest = max(size for _, size in EVIDENCE_DERIVATIVES.values())
+
+    with original.open('rb') as image_file:
+        image = Image.open(image_file)
+        # Let the JPEG decoder downscale while decoding large photos
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+
+    names = {}
+    for field, (suffix, size) in EVIDENCE_DERIVATIVES.items():
+        name = derivative_name(original.name, suffix)
+        if not storage.exists(name):
+            name = storage.save(
+                name, ContentFile(render_derivative(image, size)))
+        names[field] = name
+
+    # core.signals imports this module to purge blobs
+    from core.signals import bump_group_versions
+
+    # update() sends no signals, so the cached evidence lists of the
+    # group are marked as changed here
+    with transaction.atomic():
+        GroupWorkoutEvidence.objects.filter(id=evidence_id).update(**names)
+        bump_group_versions(Group.objects.filter(id=evidence.group_id))
+
+
+def purge_evidence_blob(blob_id):
+    """Deletes an unreferenced blob along with its files
+
+    The blob row stays locked while its files are removed, so an upload
+    of the same content waits and then stores the file afresh.
+    """
+    with transaction.atomic():
+        blob = EvidenceBlob.objects.select_for_update().filter(
+            id=blob_id, ref_count=0).first()
+        if blob is None:
+            return
+
+        blob.delete()
+        default_storage.delete(blob.name)
+        for suffix, _ in EVIDENCE_DERIVATIVES.values():
+            default_storage.delete(derivative_name(blob.name, suffix))
+
+
+def purge_evidence_blobs(blob_ids):
+    """Deletes those of the blobs that are no longer referenced"""
+    for blob_id in blob_ids:
+        purge_evidence_blob(blob_id)
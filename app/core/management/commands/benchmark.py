@@ -0,0 +1,152 @@
+"""
+Django command to load test the API against a throwaway database
+"""
+import datetime
+import json
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmark import LoadRunner, summarise
+from core.synthetic import (FIRST_NAMES, PASSWORD, generate_dataset,
+                            member_email)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that leaves the benchmark output uncluttered"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the REST API under concurrent load
+
+    A test database is created next to the configured one and seeded
+    with synthetic data, the app is served from a threaded in-process
+    server, and virtual members run scripted scenarios against it. Runs
+    with the same options are comparable across commits. SQLite only
+    works with a file test database, threads cannot share one in memory.
+    """
+
+    help = 'Load tests the API and reports latency percentiles as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='File the JSON results are written to')
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Number of members sending requests at once')
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Seconds of load measured after the warmup')
+        parser.add_argument(
+            '--warmup', type=float, default=5,
+            help='Seconds of load before measuring starts')
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the dataset and of the scenario choices')
+        parser.add_argument('--members', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--weeks', type=int, default=4)
+        parser.add_argument('--workouts-per-group', type=int, default=10)
+        parser.add_argument('--max-group-size', type=int, default=200)
+        parser.add_argument('--max-friends', type=int, default=100)
+        parser.add_argument('--evidence-per-week', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        test_name = connection.settings_dict['TEST']['NAME']
+        if connection.vendor == 'sqlite' and (
+                not test_name
+                or connection.creation.is_in_memory_db(test_name)):
+            raise CommandError(
+                'Benchmarking SQLite needs a file test database, set '
+                "DATABASES['default']['TEST']['NAME'] to a path")
+
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        media_root = tempfile.mkdtemp(prefix='groupfit-benchmark-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                self.stdout.write('Seeding the benchmark database...')
+                dataset = generate_dataset(
+                    options['members'], options['groups'],
+                    weeks=options['weeks'],
+                    workouts_per_group=options['workouts_per_group'],
+                    max_group_size=options['max_group_size'],
+                    max_friends=options['max_friends'],
+                    evidence_per_week=options['evidence_per_week'],
+                    seed=options['seed'])
+                samples, elapsed = self.run_load(options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        results = {
+            'commit': get_commit(),
+            'created': datetime.datetime.now(
+                datetime.timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'options': {name: options[name] for name in (
+                'concurrency', 'duration', 'warmup', 'seed')},
+            'dataset': dataset,
+            'elapsed': round(elapsed, 2),
+            **summarise(samples, elapsed),
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=4, sort_keys=True)
+            output.write('\n')
+
+        for label, stats in results['endpoints'].items():
+            self.stdout.write(
+                f'{label:45} {stats["throughput"]:>8} req/s  '
+                f'p50 {stats["p50_ms"]:>8} ms  p95 {stats["p95_ms"]:>8} ms  '
+                f'p99 {stats["p99_ms"]:>8} ms  errors {stats["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Benchmark results written to {options["output"]}!'))
+
+    def run_load(self, options):
+        """Serves the app in-process and drives the scenarios against it"""
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.stdout.write(
+                f'Running {options["concurrency"]} members for '
+                f'{options["warmup"]}s warmup and '
+                f'{options["duration"]}s measured...')
+            runner = LoadRunner(
+                f'http://127.0.0.1:{server.server_port}',
+                [member_email(index) for index in range(options['members'])],
+                PASSWORD,
+                FIRST_NAMES,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+            )
+            return runner.run()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def get_commit():
+    """Commit of the code under test, None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,81 @@
+"""
+Django command to generate a large synthetic dataset
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import EMAIL_DOMAIN, PASSWORD, generate_dataset
+
+
+class Command(BaseCommand):
+    """Django command to fill the database with production sized data
+
+    Members, groups, memberships, workouts, evidence and friendships are
+    generated with skewed distributions so that scaling problems seen in
+    production can be reproduced locally. Every member logs in with the
+    same synthetic password.
+    """
+
+    help = 'Generates synthetic members and their activity in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000)
+        parser.add_argument('--groups', type=int, default=10000)
+        parser.add_argument(
+            '--weeks', type=int, default=12,
+            help='Weeks of evidence history before today')
+        parser.add_argument('--workouts-per-group', type=int, default=10)
+        parser.add_argument(
+            '--group-size-alpha', type=float, default=1.5,
+            help='Power law exponent of group sizes, lower is more skewed')
+        parser.add_argument('--min-group-size', type=int, default=3)
+        parser.add_argument('--max-group-size', type=int, default=5000)
+        parser.add_argument(
+            '--friend-alpha', type=float, default=2.0,
+            help='Power law exponent of the friends each member adds')
+        parser.add_argument('--min-friends', type=int, default=1)
+        parser.add_argument('--max-friends', type=int, default=1000)
+        parser.add_argument(
+            '--evidence-per-week', type=float, default=2.0,
+            help='Mean evidence a member posts per group and week')
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Number of placeholder images shared by the evidence')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of rows inserted per query')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if get_user_model().objects.filter(
+                email__endswith=f'@{EMAIL_DOMAIN}').exists():
+            raise CommandError(
+                'Synthetic data already exists, flush the database first')
+
+        started = time.monotonic()
+        counts = generate_dataset(
+            options['members'], options['groups'],
+            weeks=options['weeks'],
+            workouts_per_group=options['workouts_per_group'],
+            group_size_alpha=options['group_size_alpha'],
+            min_group_size=options['min_group_size'],
+            max_group_size=options['max_group_size'],
+            friend_alpha=options['friend_alpha'],
+            min_friends=options['min_friends'],
+            max_friends=options['max_friends'],
+            evidence_per_week=options['evidence_per_week'],
+            images=options['images'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=lambda stage, rows: self.stdout.write(
+                f'Generated {rows} {stage}...'),
+        )
+
+        for name, count in counts.items():
+            self.stdout.write(f'{name:12} {count:>12}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Dataset generated in {time.monotonic() - started:.1f}s, '
+            f'members log in with password {PASSWORD!r}!'))
@@ -0,0 +1,47 @@
+"""
+Django command to create missing evidence image derivatives
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core.images import generate_evidence_derivatives
+from core.models import GroupWorkoutEvidence
+
+
+class Command(BaseCommand):
+    """Django command to backfill thumbnails of uploaded evidence"""
+
+    help = 'Creates thumbnails for evidence images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of evidence rows read per query')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        missing = GroupWorkoutEvidence.objects.exclude(
+            evidence_image__isnull=True).exclude(evidence_image='').filter(
+            Q(evidence_thumbnail__isnull=True) | Q(evidence_thumbnail='')
+        ).order_by('id')
+        last_id = 0
+        generated = 0
+
+        while True:
+            evidence_ids = list(missing.filter(id__gt=last_id).values_list(
+                'id', flat=True)[:batch_size])
+            if not evidence_ids:
+                break
+
+            for evidence_id in evidence_ids:
+                try:
+                    generate_evidence_derivatives(evidence_id)
+                    generated += 1
+                except (OSError, ValueError) as exc:
+                    self.stderr.write(
+                        f'Evidence {evidence_id} skipped: {exc}')
+            last_id = evidence_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Derivatives generated for {generated} evidence images!'))
@@ -0,0 +1,37 @@
+"""
+Django command to rebuild the group statistics from scratch
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Group, GroupStats
+
+
+class Command(BaseCommand):
+    """Django command to recount the statistics of every group"""
+
+    help = 'Recounts members, workouts and evidence for every group'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of groups recounted per transaction')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        last_id = 0
+        rebuilt = 0
+
+        while True:
+            group_ids = list(Group.objects.filter(id__gt=last_id).order_by(
+                'id').values_list('id', flat=True)[:batch_size])
+            if not group_ids:
+                break
+
+            GroupStats.objects.rebuild(group_ids)
+            rebuilt += len(group_ids)
+            last_id = group_ids[-1]
+            self.stdout.write(f'Rebuilt statistics for {rebuilt} groups...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Group statistics rebuilt for {rebuilt} groups!'))
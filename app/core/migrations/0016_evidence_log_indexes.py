@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_remove_user_date_of_birth'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupworkoutevidence',
+            index=models.Index(fields=['member', '-submission_date', '-id'], name='evidence_member_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupworkoutevidence',
+            index=models.Index(fields=['workout', '-submission_date', '-id'], name='evidence_workout_date_idx'),
+        ),
+    ]
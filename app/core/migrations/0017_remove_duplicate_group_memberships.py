@@ -0,0 +1,43 @@
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    """Keep one membership per group and member, preferring Admin rows"""
+    GroupMembership = apps.get_model('core', 'GroupMembership')
+    duplicates = (GroupMembership.objects
+                  .values('group_id', 'member_id')
+                  .annotate(rows=Count('id'))
+                  .filter(rows__gt=1)
+                  .order_by('group_id', 'member_id'))
+
+    while True:
+        batch = list(duplicates[:BATCH_SIZE])
+        if not batch:
+            break
+
+        ids_to_delete = []
+        for pair in batch:
+            rows = list(GroupMembership.objects.filter(
+                group_id=pair['group_id'], member_id=pair['member_id'],
+            ).order_by('id').values_list('id', 'member_role'))
+            keep = next((row_id for row_id, role in rows if role == 'Admin'),
+                        rows[0][0])
+            ids_to_delete.extend(
+                row_id for row_id, _ in rows if row_id != keep)
+
+        GroupMembership.objects.filter(id__in=ids_to_delete).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_evidence_log_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_memberships,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_remove_duplicate_group_memberships'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(fields=['group', 'member_role'], include=('member',), name='membership_group_role_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupmembership',
+            constraint=models.UniqueConstraint(fields=('group', 'member'), name='unique_group_member'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_groupmembership_unique_group_member'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.group')),
+                ('member_count', models.IntegerField(default=0)),
+                ('workout_count', models.IntegerField(default=0)),
+                ('evidence_count', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
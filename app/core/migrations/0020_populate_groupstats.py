@@ -0,0 +1,53 @@
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def populate_group_stats(apps, schema_editor):
+    """Count the members, workouts and evidence of existing groups"""
+    Group = apps.get_model('core', 'Group')
+    GroupMembership = apps.get_model('core', 'GroupMembership')
+    GroupStats = apps.get_model('core', 'GroupStats')
+    GroupWorkout = apps.get_model('core', 'GroupWorkout')
+    GroupWorkoutEvidence = apps.get_model('core', 'GroupWorkoutEvidence')
+
+    last_id = 0
+    while True:
+        group_ids = list(Group.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not group_ids:
+            break
+
+        member_counts = dict(GroupMembership.objects.filter(
+            group_id__in=group_ids).values_list('group_id').annotate(
+            Count('id')))
+        workout_counts = dict(GroupWorkout.objects.filter(
+            group_id__in=group_ids).values_list('group_id').annotate(
+            Count('id')))
+        evidence_counts = dict(GroupWorkoutEvidence.objects.filter(
+            workout__group_id__in=group_ids).values_list(
+            'workout__group_id').annotate(Count('id')))
+
+        GroupStats.objects.bulk_create([
+            GroupStats(
+                group_id=group_id,
+                member_count=member_counts.get(group_id, 0),
+                workout_count=workout_counts.get(group_id, 0),
+                evidence_count=evidence_counts.get(group_id, 0),
+            )
+            for group_id in group_ids
+        ])
+        last_id = group_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_groupstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_group_stats,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_populate_groupstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupworkoutevidence',
+            name='evidence_medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='groupworkoutevidence',
+            name='evidence_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+    ]
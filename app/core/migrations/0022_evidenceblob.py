@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 19:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_evidence_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvidenceBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_date', models.DateField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='groupworkoutevidence',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='evidence', to='core.evidenceblob'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_evidence_image_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='friends_version',
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+    ]
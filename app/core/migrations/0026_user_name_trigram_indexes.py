@@ -0,0 +1,42 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    'core_user_first_name_trgm': 'first_name',
+    'core_user_last_name_trgm': 'last_name',
+    'core_user_email_trgm': 'email',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Index member names and emails for similarity and ILIKE search"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name, column in TRIGRAM_INDEXES.items():
+        # CONCURRENTLY keeps the user table writable while indexes build
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+            f'ON core_user USING gin ({column} gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0025_member_tokens'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
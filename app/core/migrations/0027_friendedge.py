@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 20:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_user_name_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accepted', models.BooleanField(default=False)),
+                ('connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edges', to='core.friends')),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_edges', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='friendedge',
+            constraint=models.UniqueConstraint(fields=('user', 'friend'), name='unique_friend_edge'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def populate_friend_edges(apps, schema_editor):
+    """Create both edges of every existing friend connection
+
+    Accepted connections are written first, then the rest in id order.
+    Where a pair of members has several connections, the unique
+    (user, friend) constraint keeps the edges of the first one written.
+    """
+    Friends = apps.get_model('core', 'Friends')
+    FriendEdge = apps.get_model('core', 'FriendEdge')
+
+    for connections in (Friends.objects.filter(status='Accepted'),
+                        Friends.objects.exclude(status='Accepted')):
+        last_id = 0
+        while True:
+            batch = list(connections.filter(id__gt=last_id).order_by(
+                'id').values_list('id', 'user1_id', 'user2_id',
+                                  'status')[:BATCH_SIZE])
+            if not batch:
+                break
+
+            edges = []
+            for connection_id, user1_id, user2_id, status in batch:
+                for user_id, friend_id in {(user1_id, user2_id),
+                                           (user2_id, user1_id)}:
+                    edges.append(FriendEdge(
+                        user_id=user_id,
+                        friend_id=friend_id,
+                        connection_id=connection_id,
+                        accepted=status == 'Accepted',
+                    ))
+            FriendEdge.objects.bulk_create(edges, ignore_conflicts=True)
+            last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_friendedge'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_friend_edges,
+                             migrations.RunPython.noop),
+    ]
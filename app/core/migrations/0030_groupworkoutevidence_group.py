@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def populate_evidence_groups(apps, schema_editor):
+    """Copy the group of each evidence row's workout onto the row"""
+    GroupWorkout = apps.get_model('core', 'GroupWorkout')
+    GroupWorkoutEvidence = apps.get_model('core', 'GroupWorkoutEvidence')
+
+    GroupWorkoutEvidence.objects.filter(group__isnull=True).update(
+        group_id=Subquery(GroupWorkout.objects.filter(
+            id=OuterRef('workout_id')).values('group_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupworkoutevidence',
+            name='group',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.group'),
+        ),
+        migrations.RunPython(populate_evidence_groups,
+                             migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='group',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='core.group'),
+        ),
+        migrations.AddIndex(
+            model_name='groupworkoutevidence',
+            index=models.Index(fields=['group', '-submission_date', '-id'], name='evidence_group_date_idx'),
+        ),
+    ]
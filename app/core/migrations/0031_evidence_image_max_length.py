@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:31
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_groupworkoutevidence_group'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='evidence_image',
+            field=models.ImageField(db_index=True, max_length=255, null=True, upload_to=core.models.workout_evidence_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='evidence_medium',
+            field=models.ImageField(blank=True, db_index=True, editable=False, max_length=255, null=True, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='evidence_thumbnail',
+            field=models.ImageField(blank=True, db_index=True, editable=False, max_length=255, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def remove_outside_timeline_entries(apps, schema_editor):
+    """Drop entries fanned out to friends outside the evidence's group"""
+    GroupMembership = apps.get_model('core', 'GroupMembership')
+    TimelineEntry = apps.get_model('core', 'TimelineEntry')
+
+    TimelineEntry.objects.exclude(Exists(GroupMembership.objects.filter(
+        group_id=OuterRef('evidence__group_id'),
+        member_id=OuterRef('owner_id')))).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_evidence_image_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_outside_timeline_entries,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-17 21:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_remove_outside_timeline_entries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='group',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='core.group'),
+        ),
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='member',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='groupworkoutevidence',
+            name='workout',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='core.groupworkout'),
+        ),
+    ]
@@ -4,7 +4,8 @@ Database models for GroupFit server
 import uuid
 import os
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -24,6 +25,12 @@ def workout_evidence_image_file_path(instance, filename):
     return os.path.join('uploads', 'workout_evidence', filename)
 
 
+def evidence_blob_file_path(sha256, extension):
+    """generate content addressed path for a workout evidence image"""
+    return os.path.join('uploads', 'workout_evidence', sha256[:2],
+                        f'{sha256}{extension}')
+
+
 class UserManager(BaseUserManager):
     """Manager for members"""
 
@@ -54,6 +61,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     join_date = models.DateField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=True)
+    # Bumped whenever the member's friends list would read differently
+    friends_version = models.PositiveBigIntegerField(
+        default=1, editable=False)
 
     objects = UserManager()
     USERNAME_FIELD = 'email'
@@ -65,6 +75,8 @@ class Group(models.Model):
     target_workout_number_per_week = models.PositiveIntegerField(null=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING)
+    # Bumped whenever the group's members, workouts or evidence change
+    version = models.PositiveBigIntegerField(default=1, editable=False)
 
     def __str__(self):
         return self.group_name
@@ -77,6 +89,18 @@ class GroupMembership(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
     member_role = models.CharField(max_length=25)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['group', 'member'],
+                                    name='unique_group_member'),
+        ]
+        indexes = [
+            # Covering index so role checks within a group are index-only
+            models.Index(fields=['group', 'member_role'],
+                         include=['member'],
+                         name='membership_group_role_idx'),
+        ]
+
 
 class GroupWorkout(models.Model):
     """Exercise workout for group"""
@@ -87,16 +111,169 @@ class GroupWorkout(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
 
 
+class EvidenceBlobManager(models.Manager):
+    """Manager for reference counted evidence image files"""
+
+    def acquire(self, sha256, size, extension):
+        """Takes a reference to the blob with the content hash
+
+        Creates the blob when the content is new. Must be called inside a
+        transaction, the row stays locked until it ends. Returns the blob
+        and whether it was created.
+        """
+        blob, created = self.select_for_update().get_or_create(
+            sha256=sha256,
+            defaults={
+                'name': evidence_blob_file_path(sha256, extension),
+                'size': size,
+                'ref_count': 1,
+            },
+        )
+        if not created:
+            self.filter(id=blob.id).update(ref_count=F('ref_count') + 1)
+        return blob, created
+
+    def release(self, blob_id):
+        """Drops a reference to the blob"""
+        self.filter(id=blob_id).update(ref_count=F('ref_count') - 1)
+
+    def release_many(self, evidence):
+        """Drops the references held by the evidence rows, in one update"""
+        references = evidence.filter(blob=OuterRef('pk')).order_by().values(
+            'blob').annotate(count=Count('id')).values('count')
+        self.filter(id__in=evidence.values('blob_id')).update(
+            ref_count=F('ref_count') - Subquery(references))
+
+
+class EvidenceBlob(models.Model):
+    """Evidence image file stored once per distinct content"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_date = models.DateField(auto_now_add=True)
+
+    objects = EvidenceBlobManager()
+
+    def __str__(self):
+        return self.name
+
+
+class GroupWorkoutEvidenceManager(models.Manager):
+    """Manager for workout evidence"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fills in the group of each row from its workout before inserting"""
+        objs = list(objs)
+        missing = {obj.workout_id for obj in objs if obj.group_id is None}
+        if missing:
+            groups = dict(GroupWorkout.objects.filter(
+                id__in=missing).values_list('id', 'group_id'))
+            for obj in objs:
+                if obj.group_id is None:
+                    obj.group_id = groups.get(obj.workout_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class GroupWorkoutEvidence(models.Model):
-    """Member evidence for workout completed"""
+    """Member evidence for workout completed
+
+    The group of the workout is copied onto the row, so a group's evidence
+    log is read from one index in date order across all its workouts.
+    """
+    # Led by the date indexes below, which serve the lookups on their own
     member = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,)
-    workout = models.ForeignKey(GroupWorkout, on_delete=models.CASCADE)
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
+    workout = models.ForeignKey(
+        GroupWorkout, on_delete=models.CASCADE, db_index=False)
+    group = models.ForeignKey(
+        Group, on_delete=models.CASCADE, editable=False, db_index=False)
+    # Blob names and their derivative suffixes exceed the default 100
     evidence_image = models.ImageField(
-        null=True, upload_to=workout_evidence_image_file_path)
+        null=True, db_index=True, max_length=255,
+        upload_to=workout_evidence_image_file_path)
+    evidence_thumbnail = models.ImageField(
+        null=True, blank=True, db_index=True, editable=False,
+        max_length=255)
+    evidence_medium = models.ImageField(
+        null=True, blank=True, db_index=True, editable=False,
+        max_length=255)
+    blob = models.ForeignKey(
+        EvidenceBlob, null=True, blank=True, editable=False,
+        on_delete=models.PROTECT, related_name='evidence')
     comment = models.CharField(max_length=255)
     submission_date = models.DateField(auto_now_add=True)
 
+    objects = GroupWorkoutEvidenceManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['member', '-submission_date', '-id'],
+                         name='evidence_member_date_idx'),
+            models.Index(fields=['workout', '-submission_date', '-id'],
+                         name='evidence_workout_date_idx'),
+            models.Index(fields=['group', '-submission_date', '-id'],
+                         name='evidence_group_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Copies the group of the workout onto new evidence"""
+        if self.group_id is None:
+            self.group_id = self.workout.group_id
+        super().save(*args, **kwargs)
+
+
+class GroupStatsManager(models.Manager):
+    """Manager for group statistics"""
+
+    def rebuild(self, group_ids):
+        """Recount and store the statistics for the given groups
+
+        The statistics rows are locked before counting, so increments
+        from concurrent writes either land before the count or wait and
+        apply on top of it.
+        """
+        with transaction.atomic(using=self.db):
+            group_ids = list(Group.objects.filter(
+                id__in=group_ids).values_list('id', flat=True))
+            self.bulk_create([self.model(group_id=group_id)
+                              for group_id in group_ids],
+                             ignore_conflicts=True)
+            stats = list(self.select_for_update().filter(
+                group_id__in=group_ids).order_by('group_id'))
+
+            member_counts = dict(GroupMembership.objects.filter(
+                group_id__in=group_ids).values_list('group_id').annotate(
+                Count('id')))
+            workout_counts = dict(GroupWorkout.objects.filter(
+                group_id__in=group_ids).values_list('group_id').annotate(
+                Count('id')))
+            evidence_counts = dict(GroupWorkoutEvidence.objects.filter(
+                group_id__in=group_ids).values_list('group_id').annotate(
+                Count('id')))
+
+            for group_stats in stats:
+                group_id = group_stats.group_id
+                group_stats.member_count = member_counts.get(group_id, 0)
+                group_stats.workout_count = workout_counts.get(group_id, 0)
+                group_stats.evidence_count = evidence_counts.get(group_id, 0)
+            self.bulk_update(stats, ['member_count', 'workout_count',
+                                     'evidence_count'])
+
+        return stats
+
+
+class GroupStats(models.Model):
+    """Counts for a group, maintained as its rows are written"""
+    group = models.OneToOneField(
+        Group, primary_key=True, on_delete=models.CASCADE,
+        related_name='stats')
+    member_count = models.IntegerField(default=0)
+    workout_count = models.IntegerField(default=0)
+    evidence_count = models.IntegerField(default=0)
+
+    objects = GroupStatsManager()
+
 
 class Friends(models.Model):
     """Friendship connections"""
@@ -111,3 +288,73 @@ class Friends(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
         related_name='Requesting_User')
     request_date = models.DateField(auto_now_add=True)
+
+
+class FriendEdge(models.Model):
+    """One direction of a friend connection, stored for both members
+
+    Each connection has an edge from either member, so the friends of a
+    member and whether two members are connected are both index range
+    scans on (user, friend).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='friend_edges')
+    friend = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='+')
+    connection = models.ForeignKey(
+        Friends, on_delete=models.CASCADE, related_name='edges')
+    accepted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'friend'],
+                                    name='unique_friend_edge'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Evidence posted by a fellow group member, in a member's feed
+
+    Entries are written for every recipient when evidence is uploaded, so
+    reading a feed is one index range scan on (owner, id).
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='+')
+    evidence = models.ForeignKey(
+        GroupWorkoutEvidence, on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'evidence'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-id'],
+                         name='timeline_owner_id_idx'),
+        ]
+
+
+class RefreshToken(models.Model):
+    """Long lived token exchanged for signed access tokens"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='refresh_tokens')
+    # Only a hash is stored, the token itself is shown to the client once
+    token_hash = models.CharField(max_length=64, unique=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked = models.BooleanField(default=False)
+
+
+class RevokedAccessToken(models.Model):
+    """Signed access token withdrawn before it expires"""
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination for GroupFit list endpoints
+"""
+import datetime
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import (FieldDoesNotExist,
+                                    ValidationError as DjangoValidationError)
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginates by seeking past the last row of the previous page
+
+    `ordering` must end with a unique field and every field is sorted in
+    the same direction, so each row has a distinct position and a page
+    costs one index range scan however deep the client has paged.
+    """
+    ordering = ('id',)
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the rows of the page selected by the request cursor"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        """Wrap the serialized page with the link to the next page"""
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Page size requested by the client, capped at max_page_size"""
+        try:
+            page_size = int(
+                request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last_row = self.page[-1]
+        values = [self.encode_value(getattr(last_row, field))
+                  for field in self.get_field_names()]
+        cursor = b64encode(json.dumps(values).encode('ascii'))
+
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param,
+                                   cursor.decode('ascii'))
+
+    def decode_cursor(self, request, model):
+        """Return the position encoded in the request cursor, if any"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        field_names = self.get_field_names()
+        try:
+            values = json.loads(b64decode(encoded.encode('ascii')))
+            if len(values) != len(field_names):
+                raise ValueError
+            return [self.decode_value(model, name, value)
+                    for name, value in zip(field_names, values)]
+        except (TypeError, ValueError, UnicodeError, BinasciiError,
+                DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_seek_filter(self, position):
+        """Filter for rows positioned strictly after the cursor"""
+        descending = self.ordering[0].startswith('-')
+        after = 'lt' if descending else 'gt'
+        field_names = self.get_field_names()
+
+        seek = Q()
+        for index in reversed(range(len(field_names))):
+            equal = {name: value for name, value in
+                     zip(field_names[:index], position[:index])}
+            seek |= Q(**equal, **{
+                f'{field_names[index]}__{after}': position[index]})
+
+        # Redundant bound on the leading column so the database can start
+        # the index scan at the cursor rather than filter its way there.
+        leading = 'lte' if descending else 'gte'
+        return Q(**{f'{field_names[0]}__{leading}': position[0]}) & seek
+
+    def get_field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def decode_value(model, name, value):
+        """Convert a cursor value back to the python type of its field"""
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotated values (e.g. search rank) are stored as plain JSON
+            return value
+
+        return field.to_python(value)
@@ -0,0 +1,48 @@
+"""
+Shared behaviour for the serializers of the GroupFit APIs
+"""
+from rest_framework import serializers
+
+
+class EagerLoadingMixin:
+    """Declares the relations a serializer reads so views load them upfront
+
+    `select_related_fields` lists the forward relations to join and
+    `prefetch_related_fields` the many-valued ones. Relations of nested
+    serializers are added under the nested field's source, so preparing
+    a queryset for the outer serializer covers the whole tree.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def get_related_fields(cls):
+        """Relations to select and to prefetch, nested ones included"""
+        select = list(cls.select_related_fields)
+        prefetch = list(cls.prefetch_related_fields)
+
+        for name, field in cls._declared_fields.items():
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, EagerLoadingMixin):
+                continue
+
+            source = field.source or name
+            nested_select, nested_prefetch = nested.get_related_fields()
+            # Joins below a many-valued relation ride on its prefetch
+            (prefetch if many else select).extend(
+                f'{source}__{path}' for path in nested_select)
+            prefetch.extend(f'{source}__{path}' for path in nested_prefetch)
+
+        return select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Returns the queryset loading every relation the serializer reads"""
+        select, prefetch = cls.get_related_fields()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        return queryset
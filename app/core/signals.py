@@ -0,0 +1,272 @@
+"""
+Signal handlers keeping denormalised GroupFit data in step with writes
+"""
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from core.images import purge_evidence_blob, purge_evidence_blobs
+from core.models import (EvidenceBlob,
+                         FriendEdge,
+                         Friends,
+                         Group,
+                         GroupMembership,
+                         GroupStats,
+                         GroupWorkout,
+                         GroupWorkoutEvidence,
+                         TimelineEntry)
+from core.tasks import submit_on_commit
+
+# Sent with the model class as sender, and group_id and created (the
+# number of rows inserted) arguments, after rows of a group are inserted
+# with bulk_create, which skips post_save.
+group_rows_bulk_created = Signal()
+
+# Statistics field counting the rows of each model
+_STATS_FIELDS = {
+    GroupMembership: 'member_count',
+    GroupWorkout: 'workout_count',
+    GroupWorkoutEvidence: 'evidence_count',
+}
+
+
+@contextmanager
+def deleting_group(group):
+    """Deletes the rows of the group in bulk before the group itself
+
+    Members, workouts and evidence have post_delete receivers, so the
+    cascade from the group would fetch and signal them one by one. Their
+    bookkeeping is moot as the group is going too, so they are deleted
+    with one statement per table, leaving the cascade nothing to do. The
+    blob references of the evidence are released in one update. Use
+    inside the transaction deleting the group.
+    """
+    evidence = GroupWorkoutEvidence.objects.filter(group_id=group.id)
+    release_evidence_blobs(evidence)
+    TimelineEntry.objects.filter(evidence__group_id=group.id).delete()
+    delete_rows(evidence)
+    delete_rows(GroupWorkout.objects.filter(group_id=group.id))
+    delete_rows(GroupMembership.objects.filter(group_id=group.id))
+    yield
+
+
+@contextmanager
+def deleting_member(member):
+    """Deletes the rows of the member in bulk before the member itself
+
+    Like deleting_group, the statistics and versions of the member's
+    groups and friends are adjusted with one update each, rather than by
+    the receivers of every membership, evidence and friendship. Use
+    inside the transaction deleting the member.
+    """
+    User = get_user_model()
+    memberships = GroupMembership.objects.filter(member_id=member.id)
+    evidence = GroupWorkoutEvidence.objects.filter(member_id=member.id)
+    friendships = Friends.objects.filter(
+        Q(user1_id=member.id) | Q(user2_id=member.id)
+        | Q(requested_by_id=member.id))
+
+    adjust_group_stats(
+        GroupStats.objects.filter(group_id__in=memberships.values(
+            'group_id')), member_count=-1)
+    posted = evidence.filter(group_id=OuterRef('group_id')).order_by(
+        ).values('group_id').annotate(count=Count('id')).values('count')
+    GroupStats.objects.filter(
+        group_id__in=evidence.values('group_id')).update(
+        evidence_count=F('evidence_count') - Subquery(posted))
+    bump_group_versions(Group.objects.filter(
+        Q(id__in=memberships.values('group_id'))
+        | Q(id__in=evidence.values('group_id'))))
+    bump_friends_versions(User.objects.filter(
+        Q(id__in=friendships.values('user1_id'))
+        | Q(id__in=friendships.values('user2_id'))).exclude(id=member.id))
+    release_evidence_blobs(evidence)
+
+    TimelineEntry.objects.filter(
+        Q(owner_id=member.id) | Q(actor_id=member.id)
+        | Q(evidence__member_id=member.id)).delete()
+    FriendEdge.objects.filter(
+        Q(user_id=member.id) | Q(friend_id=member.id)).delete()
+    delete_rows(friendships)
+    delete_rows(evidence)
+    delete_rows(memberships)
+    yield
+
+
+def delete_rows(queryset):
+    """Deletes the rows in one statement, skipping signals and cascades
+
+    Only for rows whose dependents and bookkeeping were already dealt
+    with, QuerySet.delete() fetches rows of models with receivers.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def release_evidence_blobs(evidence):
+    """Releases the blobs of the evidence and purges them after commit"""
+    blob_ids = list(evidence.filter(blob__isnull=False).values_list(
+        'blob_id', flat=True).distinct())
+    if blob_ids:
+        EvidenceBlob.objects.release_many(evidence.filter(
+            blob__isnull=False))
+        submit_on_commit(purge_evidence_blobs, blob_ids)
+
+
+def adjust_group_stats(stats, **deltas):
+    """Applies count deltas to the given group statistics rows"""
+    stats.update(**{field: F(field) + delta
+                    for field, delta in deltas.items()})
+
+
+def bump_group_versions(groups):
+    """Marks the member, workout and evidence lists of groups as changed"""
+    groups.update(version=F('version') + 1)
+
+
+def bump_friends_versions(users):
+    """Marks the friends lists of the given users as changed"""
+    users.update(friends_version=F('friends_version') + 1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.create(group=instance)
+
+
+@receiver(post_save, sender=GroupMembership)
+def count_membership_created(sender, instance, created, raw=False,
+                             **kwargs):
+    if created and not raw:
+        adjust_group_stats(
+            GroupStats.objects.filter(group_id=instance.group_id),
+            member_count=1)
+
+
+@receiver(post_delete, sender=GroupMembership)
+def count_membership_deleted(sender, instance, **kwargs):
+    adjust_group_stats(
+        GroupStats.objects.filter(group_id=instance.group_id),
+        member_count=-1)
+
+
+@receiver(post_save, sender=GroupWorkout)
+def count_workout_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_group_stats(
+            GroupStats.objects.filter(group_id=instance.group_id),
+            workout_count=1)
+
+
+@receiver(post_delete, sender=GroupWorkout)
+def count_workout_deleted(sender, instance, **kwargs):
+    adjust_group_stats(
+        GroupStats.objects.filter(group_id=instance.group_id),
+        workout_count=-1)
+
+
+@receiver(post_save, sender=GroupWorkoutEvidence)
+def count_evidence_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_group_stats(
+            GroupStats.objects.filter(
+                group__groupworkout__id=instance.workout_id),
+            evidence_count=1)
+
+
+@receiver(post_delete, sender=GroupWorkoutEvidence)
+def count_evidence_deleted(sender, instance, **kwargs):
+    adjust_group_stats(
+        GroupStats.objects.filter(
+            group__groupworkout__id=instance.workout_id),
+        evidence_count=-1)
+
+
+@receiver(post_delete, sender=GroupWorkoutEvidence)
+def release_evidence_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        EvidenceBlob.objects.release(instance.blob_id)
+        transaction.on_commit(
+            partial(purge_evidence_blob, instance.blob_id))
+
+
+@receiver(group_rows_bulk_created)
+def count_rows_bulk_created(sender, group_id, created, **kwargs):
+    adjust_group_stats(GroupStats.objects.filter(group_id=group_id),
+                       **{_STATS_FIELDS[sender]: created})
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        bump_group_versions(Group.objects.filter(id=instance.id))
+
+
+@receiver([post_save, post_delete], sender=GroupMembership)
+@receiver([post_save, post_delete], sender=GroupWorkout)
+def group_row_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_group_versions(Group.objects.filter(id=instance.group_id))
+
+
+@receiver([post_save, post_delete], sender=GroupWorkoutEvidence)
+def evidence_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_group_versions(Group.objects.filter(
+            groupworkout__id=instance.workout_id))
+
+
+@receiver([post_save, post_delete], sender=GroupMembership)
+def membership_changed(sender, instance, raw=False, **kwargs):
+    # Shared groups feed the member's friend suggestions
+    if not raw:
+        bump_friends_versions(get_user_model().objects.filter(
+            id=instance.member_id))
+
+
+@receiver(group_rows_bulk_created)
+def group_rows_created(sender, group_id, **kwargs):
+    bump_group_versions(Group.objects.filter(id=group_id))
+
+
+@receiver(post_save, sender=Friends)
+def sync_friend_edges(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    accepted = instance.status == 'Accepted'
+    if not created:
+        FriendEdge.objects.filter(connection=instance).update(
+            accepted=accepted)
+        return
+
+    pairs = {(instance.user1_id, instance.user2_id),
+             (instance.user2_id, instance.user1_id)}
+    FriendEdge.objects.bulk_create([
+        FriendEdge(user_id=user_id, friend_id=friend_id,
+                   connection=instance, accepted=accepted)
+        for user_id, friend_id in pairs
+    ])
+
+
+@receiver([post_save, post_delete], sender=Friends)
+def friends_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_friends_versions(get_user_model().objects.filter(
+            id__in=[instance.user1_id, instance.user2_id]))
+
+
+@receiver(post_save, sender=get_user_model())
+def member_changed(sender, instance, created, raw=False,
+                   update_fields=None, **kwargs):
+    # Members are nested in group and friends lists, logins show nowhere
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    bump_group_versions(Group.objects.filter(
+        groupmembership__member_id=instance.id))
+    bump_friends_versions(get_user_model().objects.filter(
+        Q(id=instance.id) | Q(friend_edges__friend_id=instance.id)))
@@ -0,0 +1,259 @@
+"""
+Synthetic GroupFit data for benchmarks and load tests
+"""
+import datetime
+import hashlib
+import itertools
+import random
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image
+
+from core.models import (EvidenceBlob, FriendEdge, Friends, Group,
+                         GroupMembership, GroupStats, GroupWorkout,
+                         GroupWorkoutEvidence, evidence_blob_file_path)
+
+EMAIL_DOMAIN = 'synthetic.groupfit.test'
+PASSWORD = 'synthetic-pass-123'
+
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey',
+               'Riley', 'Jamie', 'Avery', 'Quinn', 'Rowan', 'Drew')
+LAST_NAMES = ('Smith', 'Jones', 'Brown', 'Taylor', 'Wilson', 'Evans',
+              'Walker', 'Wright', 'Green', 'Hall', 'Wood', 'Clarke')
+WORKOUTS = ('Morning run', 'Leg day', 'Hill sprints', 'Yoga flow',
+            'Core circuit', 'Long ride', 'Swim intervals', 'Upper body')
+
+
+def member_email(index):
+    """Email of the synthetic member with the index"""
+    return f'member{index}@{EMAIL_DOMAIN}'
+
+
+def generate_dataset(members, groups, weeks=12, workouts_per_group=10,
+                     group_size_alpha=1.5, min_group_size=3,
+                     max_group_size=5000, friend_alpha=2.0, min_friends=1,
+                     max_friends=1000, evidence_per_week=2.0, images=0,
+                     seed=0, batch_size=5000, progress=None):
+    """Inserts a production sized dataset with skewed distributions
+
+    Group sizes and the number of friends a member adds are drawn from
+    power laws, and each member's weekly evidence rate from an
+    exponential distribution with the given mean, spread over the days of
+    the last weeks. Rows are generated lazily and written in chunks of
+    batch_size, each chunk in its own transaction, so memory stays flat
+    however large the dataset. With images, evidence shares that many
+    placeholder blobs. Progress is reported as (stage, rows) calls.
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda stage, rows: None)
+    today = timezone.localdate()
+
+    member_ids = insert_members(members, rng, batch_size)
+    report('members', len(member_ids))
+
+    blobs = create_placeholder_blobs(images, rng)
+    counts = {'members': len(member_ids), 'groups': 0, 'memberships': 0,
+              'workouts': 0, 'evidence': 0, 'friendships': 0,
+              'images': len(blobs)}
+    max_group_size = min(max_group_size, len(member_ids))
+
+    def memberships(group_rows):
+        for group_id, owner_id in group_rows:
+            size = power_law(rng, group_size_alpha, min_group_size,
+                             max_group_size)
+            others = set(rng.sample(member_ids, size)) - {owner_id}
+            yield group_id, owner_id, 'Admin'
+            for member_id in itertools.islice(others, size - 1):
+                yield group_id, member_id, 'Member'
+
+    def evidence(joined, daily_rates, group_workouts):
+        for (group_id, member_id), rate in zip(joined, daily_rates):
+            for _ in range(int(rate) + (rng.random() < rate % 1)):
+                blob = rng.choice(blobs) if blobs else None
+                yield GroupWorkoutEvidence(
+                    member_id=member_id,
+                    workout_id=rng.choice(group_workouts[group_id]),
+                    group_id=group_id,
+                    comment='Synthetic evidence',
+                    evidence_image=blob.name if blob else None,
+                    blob=blob,
+                )
+
+    last_group_id = 0
+    for start in range(0, groups, batch_size):
+        with transaction.atomic():
+            Group.objects.bulk_create([
+                Group(group_name=f'Synthetic group {index}',
+                      target_workout_number_per_week=rng.randint(1, 7),
+                      created_by_id=rng.choice(member_ids))
+                for index in range(start, min(start + batch_size, groups))
+            ])
+            group_rows = list(Group.objects.filter(
+                group_name__startswith='Synthetic group ',
+                id__gt=last_group_id).order_by('id').values_list(
+                'id', 'created_by_id'))
+            group_ids = [group_id for group_id, _ in group_rows]
+            last_group_id = group_ids[-1]
+
+            counts['workouts'] += insert_in_chunks(GroupWorkout, (
+                GroupWorkout(group_id=group_id, name=rng.choice(WORKOUTS),
+                             description='Synthetic workout',
+                             link='https://example.com/workout')
+                for group_id in group_ids
+                for _ in range(workouts_per_group)
+            ), batch_size)
+            group_workouts = {}
+            for workout_id, group_id in GroupWorkout.objects.filter(
+                    group_id__in=group_ids).values_list('id', 'group_id'):
+                group_workouts.setdefault(group_id, []).append(workout_id)
+
+            joined = list(memberships(group_rows))
+            counts['memberships'] += insert_in_chunks(GroupMembership, (
+                GroupMembership(group_id=group_id, member_id=member_id,
+                                member_role=role)
+                for group_id, member_id, role in joined
+            ), batch_size)
+
+            if workouts_per_group:
+                posting = [(group_id, member_id)
+                           for group_id, member_id, _ in joined]
+                daily_rates = [
+                    rng.expovariate(1 / evidence_per_week) / 7
+                    if evidence_per_week > 0 else 0 for _ in posting]
+                # Oldest first, so ids grow with the date as in production
+                for days_ago in reversed(range(7 * weeks)):
+                    counts['evidence'] += insert_dated(
+                        GroupWorkoutEvidence, 'submission_date',
+                        today - datetime.timedelta(days=days_ago),
+                        evidence(posting, daily_rates, group_workouts),
+                        batch_size)
+
+            GroupStats.objects.rebuild(group_ids)
+
+        counts['groups'] += len(group_ids)
+        report('groups', counts['groups'])
+
+    for start in range(0, len(member_ids), batch_size):
+        chunk = member_ids[start:start + batch_size]
+        friendships = []
+        for offset, user_id in enumerate(chunk, start):
+            # Each pair is added by its earlier member, so none repeat
+            later = range(offset + 1, len(member_ids))
+            added = min(len(later), power_law(rng, friend_alpha,
+                                              min_friends, max_friends))
+            friendships += [
+                Friends(user1_id=user_id, user2_id=member_ids[index],
+                        status='Accepted', requested_by_id=user_id,
+                        connected_date=today)
+                for index in rng.sample(later, added)
+            ]
+
+        with transaction.atomic():
+            Friends.objects.bulk_create(friendships, batch_size=batch_size)
+            insert_friend_edges(Friends.objects.filter(
+                user1_id__gte=chunk[0], user1_id__lte=chunk[-1]),
+                batch_size)
+
+        counts['friendships'] += len(friendships)
+        report('friendships', counts['friendships'])
+
+    if blobs:
+        references = GroupWorkoutEvidence.objects.filter(
+            blob=OuterRef('pk')).order_by().values('blob').annotate(
+            count=Count('id')).values('count')
+        EvidenceBlob.objects.filter(id__in=[blob.id for blob in blobs]).update(
+            ref_count=Coalesce(Subquery(references), 0))
+
+    return counts
+
+
+def power_law(rng, alpha, minimum, maximum):
+    """Pareto distributed integer between minimum and maximum"""
+    return min(maximum, int(minimum * rng.paretovariate(alpha)))
+
+
+def insert_members(count, rng, batch_size):
+    """Inserts synthetic members sharing one password hash, returns ids
+
+    Hashing is deliberately slow, so the hash is computed once instead of
+    once per member.
+    """
+    User = get_user_model()
+    password_hash = make_password(PASSWORD)
+    insert_in_chunks(User, (
+        User(email=member_email(index), password=password_hash,
+             first_name=rng.choice(FIRST_NAMES),
+             last_name=rng.choice(LAST_NAMES))
+        for index in range(count)
+    ), batch_size)
+
+    return list(User.objects.filter(
+        email__endswith=f'@{EMAIL_DOMAIN}').order_by('id').values_list(
+        'id', flat=True))
+
+
+def insert_friend_edges(friendships, batch_size):
+    """Inserts the edges of both members of the accepted friendships"""
+    insert_in_chunks(FriendEdge, (
+        FriendEdge(user_id=user_id, friend_id=friend_id,
+                   connection_id=connection_id, accepted=True)
+        for connection_id, user1_id, user2_id in friendships.values_list(
+            'id', 'user1_id', 'user2_id').iterator()
+        for user_id, friend_id in ((user1_id, user2_id),
+                                   (user2_id, user1_id))
+    ), batch_size)
+
+
+def insert_in_chunks(model, objects, batch_size):
+    """Bulk inserts the lazily built objects, returns how many there were"""
+    inserted = 0
+    objects = iter(objects)
+    while True:
+        chunk = list(itertools.islice(objects, batch_size))
+        if not chunk:
+            return inserted
+        model.objects.bulk_create(chunk)
+        inserted += len(chunk)
+
+
+def insert_dated(model, date_field, date, objects, batch_size):
+    """Bulk inserts the objects dated on date, returns how many there were
+
+    auto_now_add overwrites the date given to bulk_create, so the rows are
+    dated afterwards. They are the only ones past the largest id before
+    the insert, as the dataset has a single writer.
+    """
+    last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    inserted = insert_in_chunks(model, objects, batch_size)
+    if inserted:
+        model.objects.filter(id__gt=last_id).update(**{date_field: date})
+    return inserted
+
+
+def create_placeholder_blobs(count, rng):
+    """Stores count distinct placeholder JPEGs as evidence blobs"""
+    blobs = []
+    for _ in range(count):
+        content = BytesIO()
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (640, 480), colour).save(content, format='JPEG')
+        data = content.getvalue()
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        blob, _ = EvidenceBlob.objects.get_or_create(
+            sha256=sha256,
+            defaults={'name': evidence_blob_file_path(sha256, '.jpg'),
+                      'size': len(data)})
+        if not default_storage.exists(blob.name):
+            default_storage.save(blob.name, ContentFile(data))
+        blobs.append(blob)
+
+    return blobs
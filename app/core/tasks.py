@@ -0,0 +1,48 @@
+"""
+Background work run outside the request/response cycle
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the worker pool, created lazily in each server process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix='groupfit-task',
+            )
+    return _executor
+
+
+def submit(func, *args):
+    """Runs func in the worker pool, or inline when tasks are eager"""
+    if settings.BACKGROUND_TASKS_EAGER:
+        return func(*args)
+    return get_executor().submit(_run, func, *args)
+
+
+def submit_on_commit(func, *args):
+    """Runs func in the worker pool once the current transaction commits"""
+    transaction.on_commit(lambda: submit(func, *args))
+
+
+def _run(func, *args):
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        # Worker threads hold their own connection, release it per task
+        connection.close()
@@ -0,0 +1,89 @@
+"""
+Test the load test runner and the benchmark command
+"""
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import (LiveServerTestCase, SimpleTestCase,
+                         override_settings)
+
+from core.benchmark import LoadRunner, percentile, summarise
+from core.synthetic import (FIRST_NAMES, PASSWORD, generate_dataset,
+                            member_email)
+
+
+class SummaryTests(SimpleTestCase):
+    """Test the latency statistics of the benchmark report"""
+
+    def test_percentile_nearest_rank(self):
+        """Test percentiles pick the nearest ranked value"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_summarise_by_endpoint(self):
+        """Test samples are summarised per endpoint and overall"""
+        samples = [('a', 0.010, True), ('a', 0.030, False),
+                   ('b', 0.020, True)]
+
+        summary = summarise(samples, 2)
+
+        self.assertEqual(summary['endpoints']['a']['requests'], 2)
+        self.assertEqual(summary['endpoints']['a']['errors'], 1)
+        self.assertEqual(summary['endpoints']['a']['throughput'], 1)
+        self.assertEqual(summary['endpoints']['a']['p50_ms'], 10)
+        self.assertEqual(summary['endpoints']['a']['max_ms'], 30)
+        self.assertEqual(summary['total']['requests'], 3)
+        self.assertEqual(summary['total']['mean_ms'], 20)
+
+    def test_summarise_without_samples(self):
+        """Test an empty run reports no statistics"""
+        self.assertEqual(summarise([], 1), {'endpoints': {}, 'total': None})
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class LoadRunnerTests(LiveServerTestCase):
+    """Test driving the scenarios against a live server"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def test_run_scenarios(self):
+        """Test every scenario succeeds and is measured"""
+        generate_dataset(10, 2, weeks=1, workouts_per_group=2,
+                         max_group_size=10, max_friends=2)
+        runner = LoadRunner(self.live_server_url,
+                            [member_email(index) for index in range(10)],
+                            PASSWORD, FIRST_NAMES, concurrency=1,
+                            duration=2, warmup=0)
+
+        samples, elapsed = runner.run()
+
+        self.assertGreater(elapsed, 0)
+        labels = {label for label, _, _ in samples}
+        self.assertTrue({'member:token', 'group:group-progress',
+                         'member:member-getMemberSearchResults'} <= labels)
+        self.assertEqual([label for label, _, ok in samples if not ok], [])
+
+
+class BenchmarkCommandTests(SimpleTestCase):
+    """Test the benchmark command"""
+
+    def test_refuses_in_memory_sqlite(self):
+        """Test threads are not pointed at an in-memory SQLite database"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Only SQLite keeps test databases in memory')
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark', duration=0)
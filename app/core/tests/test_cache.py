@@ -0,0 +1,136 @@
+"""
+Tests for the API response cache
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import cache
+from core.models import Group, GroupMembership
+
+CACHE_STATS_URL = reverse('cache-stats')
+GROUP_MEMBERS_URL = reverse('group:group-members')
+
+
+class ResponseCacheTests(TestCase):
+    """Tests read-through caching keyed by version"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.response_cache = cache.ResponseCache('test-cache')
+        self.computed = 0
+
+    def tearDown(self):
+        cache.registry.pop('test-cache')
+
+    def compute(self):
+        self.computed += 1
+        return ['value', self.computed]
+
+    def test_cached_per_version(self):
+        """Tests values are computed once per version of the scope"""
+        first = self.response_cache.get_or_set(1, 7, self.compute)
+        second = self.response_cache.get_or_set(1, 7, self.compute)
+        other_group = self.response_cache.get_or_set(2, 7, self.compute)
+
+        self.assertEqual(first, ['value', 1])
+        self.assertEqual(second, first)
+        self.assertEqual(other_group, ['value', 2])
+
+        self.assertEqual(self.response_cache.get_or_set(1, 8, self.compute),
+                         ['value', 3])
+        self.assertEqual(self.response_cache.get_or_set(2, 7, self.compute),
+                         ['value', 2])
+
+    def test_without_version_not_cached(self):
+        """Tests nothing is cached for a scope without a version"""
+        self.response_cache.get_or_set(1, None, self.compute)
+        self.response_cache.get_or_set(1, None, self.compute)
+
+        self.assertEqual(self.computed, 2)
+
+    def test_hits_and_misses_counted(self):
+        """Tests the counters reported for monitoring"""
+        self.response_cache.get_or_set(1, 1, self.compute)
+        self.response_cache.get_or_set(1, 1, self.compute)
+        self.response_cache.get_or_set(1, 1, self.compute)
+
+        self.assertEqual(cache.get_stats()['test-cache'],
+                         {'hits': 2, 'misses': 1})
+
+    def test_non_id_scope_not_cached(self):
+        """Tests arbitrary request values are never used in keys"""
+        self.response_cache.get_or_set('1 OR 1', 1, self.compute)
+        self.response_cache.get_or_set('1 OR 1', 1, self.compute)
+
+        self.assertEqual(self.computed, 2)
+        self.assertEqual(cache.get_stats()['test-cache'],
+                         {'hits': 0, 'misses': 0})
+
+
+class CachedEndpointTests(TestCase):
+    """Tests cached list endpoints and the counters endpoint"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=self.user,
+        )
+        GroupMembership.objects.create(
+            member=self.user, group=self.group, member_role='Admin')
+
+    def test_members_cached_and_invalidated(self):
+        """Tests group members are served from cache until they change"""
+        self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+
+        # Only the version lookup for the ETag reaches the database
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                GROUP_MEMBERS_URL, {'group_id': self.group.id})
+        self.assertEqual(len(res.data), 1)
+
+        user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com',
+            password='testPass111',
+        )
+        GroupMembership.objects.create(
+            member=user2, group=self.group, member_role='Member')
+        res = self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+        self.assertEqual(len(res.data), 2)
+
+        user2.first_name = 'Renamed'
+        user2.save()
+        res = self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+        self.assertIn('Renamed', [membership['member']['first_name']
+                                  for membership in res.data])
+
+    def test_cache_stats_for_admin(self):
+        """Tests the hit and miss counters are reported"""
+        self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+        self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['group-members'], {'hits': 1, 'misses': 1})
+
+    def test_cache_stats_requires_staff(self):
+        """Tests the counters are not reported to members"""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
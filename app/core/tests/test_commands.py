@@ -2,13 +2,30 @@
 Test custom Django management commands.
 """
 
+import datetime
+import shutil
+import tempfile
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
+from PIL import Image
+
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import authenticate, get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.models import (EvidenceBlob, FriendEdge, Friends, Group,
+                         GroupMembership, GroupStats, GroupWorkout,
+                         GroupWorkoutEvidence)
+from core.synthetic import PASSWORD, member_email
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -33,3 +50,126 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class RebuildGroupStatsCommandTests(TestCase):
+    """Test rebuilding group statistics"""
+
+    def test_rebuild_group_stats(self):
+        """Test statistics are recounted for every group in batches"""
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+        groups = [
+            Group.objects.create(group_name=f'Group {index}',
+                                 created_by=user)
+            for index in range(3)
+        ]
+        for group in groups:
+            GroupMembership.objects.create(
+                member=user, group=group, member_role='Admin')
+        GroupStats.objects.all().delete()
+
+        call_command('rebuild_group_stats', batch_size=2,
+                     stdout=StringIO())
+
+        self.assertEqual(GroupStats.objects.count(), 3)
+        self.assertEqual(
+            [stats.member_count for stats in GroupStats.objects.all()],
+            [1, 1, 1])
+
+
+class GenerateEvidenceDerivativesCommandTests(TestCase):
+    """Test backfilling evidence image derivatives"""
+
+    def test_generate_evidence_derivatives(self):
+        """Test thumbnails are created for evidence without them"""
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+        group = Group.objects.create(group_name='Group', created_by=user)
+        workout = GroupWorkout.objects.create(
+            name='Workout1',
+            description='full body workout',
+            link='http://test.co.uk',
+            group=group
+        )
+        evidence = GroupWorkoutEvidence.objects.create(
+            member=user, workout=workout, comment='Amazing workout!')
+        image_bytes = BytesIO()
+        Image.new('RGB', (640, 480)).save(image_bytes, format='PNG')
+        evidence.evidence_image.save(
+            'evidence.png', ContentFile(image_bytes.getvalue()))
+
+        version = Group.objects.get(id=group.id).version
+
+        call_command('generate_evidence_derivatives', stdout=StringIO())
+
+        evidence.refresh_from_db()
+        try:
+            self.assertGreater(Group.objects.get(id=group.id).version,
+                               version)
+            self.assertTrue(evidence.evidence_thumbnail.name.endswith(
+                '_thumb.jpg'))
+            self.assertTrue(evidence.evidence_medium.name.endswith(
+                '_medium.jpg'))
+        finally:
+            evidence.evidence_image.delete()
+            evidence.evidence_thumbnail.delete()
+            evidence.evidence_medium.delete()
+
+
+class GenerateDatasetCommandTests(TestCase):
+    """Test generating a synthetic dataset"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def test_generate_dataset(self):
+        """Test rows are generated in chunks with the requested shape"""
+        call_command('generate_dataset', members=60, groups=7, weeks=4,
+                     workouts_per_group=2, max_group_size=20,
+                     max_friends=5, evidence_per_week=1, images=2,
+                     batch_size=10, stdout=StringIO())
+
+        self.assertEqual(get_user_model().objects.count(), 60)
+        self.assertIsNotNone(authenticate(email=member_email(7),
+                                          password=PASSWORD))
+        self.assertEqual(Group.objects.count(), 7)
+        self.assertEqual(GroupWorkout.objects.count(), 14)
+        group_sizes = GroupMembership.objects.values('group').annotate(
+            size=Count('id')).values_list('size', flat=True)
+        self.assertTrue(all(3 <= size <= 20 for size in group_sizes))
+        self.assertEqual(GroupMembership.objects.filter(
+            member_role='Admin').count(), 7)
+        self.assertEqual(FriendEdge.objects.count(),
+                         2 * Friends.objects.count())
+
+        evidence = GroupWorkoutEvidence.objects.all()
+        self.assertTrue(evidence.exists())
+        oldest = timezone.localdate() - datetime.timedelta(weeks=4)
+        self.assertFalse(evidence.filter(submission_date__lt=oldest).exists())
+        self.assertTrue(evidence.filter(
+            submission_date__lt=timezone.localdate()).exists())
+        self.assertFalse(evidence.filter(blob__isnull=True).exists())
+        self.assertEqual(
+            sum(EvidenceBlob.objects.values_list('ref_count', flat=True)),
+            evidence.count())
+        for blob in EvidenceBlob.objects.all():
+            self.assertTrue(default_storage.exists(blob.name))
+        self.assertEqual(
+            sum(GroupStats.objects.values_list('evidence_count', flat=True)),
+            evidence.count())
+
+    def test_generate_dataset_twice(self):
+        """Test synthetic data is not generated on top of itself"""
+        call_command('generate_dataset', members=5, groups=1,
+                     stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', members=5, groups=1,
+                         stdout=StringIO())
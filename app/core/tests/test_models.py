@@ -2,10 +2,12 @@
 Tests for models
 """
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from unittest.mock import patch
 from core import models
+from core.images import EVIDENCE_DERIVATIVES, derivative_name
 
 
 class ModelTests(TestCase):
@@ -92,6 +94,32 @@ class ModelTests(TestCase):
         self.assertEqual(str(group), group_member.group.group_name)
         self.assertEqual(group_member.member_role, 'Admin')
 
+    def test_group_member_unique_per_group(self):
+        """Tests that a member can only belong to a group once"""
+
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+
+        group = models.Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=user
+        )
+
+        models.GroupMembership.objects.create(
+            member=user,
+            group=group,
+            member_role='Admin'
+        )
+
+        with self.assertRaises(IntegrityError):
+            models.GroupMembership.objects.create(
+                member=user,
+                group=group,
+                member_role='Member'
+            )
+
     def test_create_workout(self):
         """Tests that the workout model can be created"""
         user = get_user_model().objects.create_user(
@@ -154,8 +182,16 @@ class ModelTests(TestCase):
         )
         self.assertEqual(workout_evidence.member.id, user.id)
         self.assertEqual(workout_evidence.workout.id, workout.id)
+        self.assertEqual(workout_evidence.group_id, group.id)
         self.assertIsNotNone(workout_evidence.submission_date)
 
+        models.GroupWorkoutEvidence.objects.bulk_create([
+            models.GroupWorkoutEvidence(member=user, workout=workout,
+                                        comment='Bulk workout!'),
+        ])
+        self.assertEqual(models.GroupWorkoutEvidence.objects.get(
+            comment='Bulk workout!').group_id, group.id)
+
     @patch('core.models.uuid.uuid4')
     def test_workout_evidence_name_uuid(self, mock_uuid):
         """Test image path generation"""
@@ -190,3 +226,141 @@ class ModelTests(TestCase):
 
         self.assertEqual(connection.user1.id, user1.id)
         self.assertEqual(connection.user2.id, user2.id)
+
+    def test_friend_edges_maintained(self):
+        """Tests both edges of a connection follow its status"""
+        user1 = get_user_model().objects.create_user(
+            email='testUser1@example.com')
+        user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com')
+
+        connection = models.Friends.objects.create(
+            user1=user1, user2=user2, status='Pending', requested_by=user1)
+        edges = models.FriendEdge.objects.filter(connection=connection)
+        self.assertEqual(
+            sorted(edges.values_list('user_id', 'friend_id', 'accepted')),
+            sorted([(user1.id, user2.id, False), (user2.id, user1.id, False)]))
+
+        connection.status = 'Accepted'
+        connection.save()
+        self.assertEqual(edges.filter(accepted=True).count(), 2)
+
+        with self.assertRaises(IntegrityError):
+            models.Friends.objects.create(
+                user1=user2, user2=user1, status='Pending',
+                requested_by=user2)
+
+    def test_friend_edges_removed_with_connection(self):
+        """Tests deleting a connection deletes its edges"""
+        user1 = get_user_model().objects.create_user(
+            email='testUser1@example.com')
+        user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com')
+        connection = models.Friends.objects.create(
+            user1=user1, user2=user2, status='Pending', requested_by=user1)
+
+        connection.delete()
+
+        self.assertFalse(models.FriendEdge.objects.exists())
+
+    def test_group_stats_maintained_on_write(self):
+        """Tests group statistics follow membership, workout and evidence"""
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+        group = models.Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=user
+        )
+        membership = models.GroupMembership.objects.create(
+            member=user,
+            group=group,
+            member_role='Admin'
+        )
+        workout = models.GroupWorkout.objects.create(
+            name='Workout1',
+            description='full body workout',
+            link='http://test.co.uk',
+            group=group
+        )
+        models.GroupWorkoutEvidence.objects.create(
+            member=user,
+            workout=workout,
+            comment='Amazing workout!',
+        )
+
+        stats = models.GroupStats.objects.get(group=group)
+        self.assertEqual(stats.member_count, 1)
+        self.assertEqual(stats.workout_count, 1)
+        self.assertEqual(stats.evidence_count, 1)
+
+        workout.delete()
+        membership.delete()
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.member_count, 0)
+        self.assertEqual(stats.workout_count, 0)
+        self.assertEqual(stats.evidence_count, 0)
+
+    def test_group_stats_rebuild(self):
+        """Tests group statistics are recounted from the source tables"""
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+        group = models.Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=user
+        )
+        models.GroupMembership.objects.create(
+            member=user,
+            group=group,
+            member_role='Admin'
+        )
+        models.GroupStats.objects.filter(group=group).update(
+            member_count=10, workout_count=5)
+
+        stats = models.GroupStats.objects.rebuild([group.id])
+
+        self.assertEqual(stats[0].member_count, 1)
+        self.assertEqual(stats[0].workout_count, 0)
+        self.assertEqual(
+            models.GroupStats.objects.get(group=group).member_count, 1)
+
+    def test_group_stats_rebuild_missing_row(self):
+        """Tests rebuilding creates a missing row once, in place after"""
+        user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+        )
+        group = models.Group.objects.create(
+            group_name='Test Group', created_by=user)
+        models.GroupStats.objects.filter(group=group).delete()
+
+        models.GroupStats.objects.rebuild([group.id])
+        stats = models.GroupStats.objects.rebuild([group.id])
+
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(
+            models.GroupStats.objects.filter(group=group).count(), 1)
+
+    def test_evidence_names_fit_their_fields(self):
+        """Tests blob and derivative names fit the evidence columns"""
+        name = models.evidence_blob_file_path('f' * 64, '.jpeg')
+        evidence_fields = models.GroupWorkoutEvidence._meta
+
+        self.assertLessEqual(
+            len(name), evidence_fields.get_field('evidence_image').max_length)
+        for field, (suffix, _) in EVIDENCE_DERIVATIVES.items():
+            self.assertLessEqual(
+                len(derivative_name(name, suffix)),
+                evidence_fields.get_field(field).max_length)
+
+    def test_evidence_foreign_keys_indexed_once(self):
+        """Tests each evidence foreign key is served by one date index"""
+        evidence_fields = models.GroupWorkoutEvidence._meta
+        leading = [index.fields[0] for index in evidence_fields.indexes]
+
+        for field in ('member', 'workout', 'group'):
+            self.assertFalse(evidence_fields.get_field(field).db_index)
+            self.assertEqual(leading.count(field), 1)
@@ -0,0 +1,484 @@
+"""
+Query budgets of the API endpoints, checked at two dataset sizes
+
+Every route of the group, friends and member APIs is requested against
+a small and a large dataset. The number of queries must not depend on
+the dataset size and must stay within the budget recorded for the route
+in query_budgets.json. After an intended change to an endpoint's
+queries, rerun the tests with RECORD_QUERY_BUDGETS=1 to record the new
+budgets and review the diff of the file.
+"""
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (FriendEdge, Friends, Group, GroupMembership,
+                         GroupWorkout, GroupWorkoutEvidence, TimelineEntry)
+from core.signals import group_rows_bulk_created
+from member.tokens import issue_token_pair
+
+BUDGETS_PATH = Path(__file__).with_name('query_budgets.json')
+DATASET_SIZES = (10, 1000)
+PASSWORD = 'testPass123'
+
+# The workout viewset is registered on the same prefix as the group
+# viewset, whose list and detail routes resolve first
+SHADOWED_ROUTES = {'group:workout-list', 'group:workout-detail'}
+
+# Requests by route and method, each built from the dataset
+SCENARIOS = {}
+
+
+def scenario(route, method, format='json', batched=False):
+    """Registers the function building the request for a route
+
+    Batched scenarios delete rows in bulk, which Django does a hundred
+    primary keys per statement, so only their budget is checked.
+    """
+    def register(build):
+        SCENARIOS[f'{route} {method.upper()}'] = (route, method, format,
+                                                  batched, build)
+        return build
+    return register
+
+
+def api_routes():
+    """Names of the routes of the group, friends and member APIs"""
+    names = set()
+    for resolver in get_resolver().url_patterns:
+        if (isinstance(resolver, URLResolver)
+                and resolver.namespace in ('group', 'friends', 'member')):
+            names.update(f'{resolver.namespace}:{name}'
+                         for name in resolver.reverse_dict
+                         if isinstance(name, str) and name != 'api-root')
+    return names
+
+
+def create_users(prefix, count):
+    """Creates members without passwords, in one insert"""
+    get_user_model().objects.bulk_create([
+        get_user_model()(email=f'{prefix}{index}@example.com',
+                         first_name=f'Runner{index}', last_name=prefix)
+        for index in range(count)
+    ])
+    return list(get_user_model().objects.filter(
+        email__startswith=prefix).order_by('id'))
+
+
+def build_dataset(size):
+    """A member whose groups, friends, workouts and feed have size rows"""
+    owner = get_user_model().objects.create_user(
+        email=f'owner{size}@example.com', password=PASSWORD)
+    members = create_users(f'member{size}-', size)
+
+    group = Group.objects.create(
+        group_name=f'Group {size}', target_workout_number_per_week=3,
+        created_by=owner)
+    GroupMembership.objects.create(
+        member=owner, group=group, member_role='Admin')
+    GroupMembership.objects.bulk_create([
+        GroupMembership(member=member, group=group, member_role='Member')
+        for member in members
+    ])
+    GroupWorkout.objects.bulk_create([
+        GroupWorkout(group=group, name=f'Workout {index}',
+                     description='Full body', link='http://test.co.uk')
+        for index in range(size)
+    ])
+    workouts = list(group.groupworkout_set.order_by('id'))
+    GroupWorkoutEvidence.objects.bulk_create([
+        GroupWorkoutEvidence(member=owner, workout=workouts[0],
+                             comment=f'Evidence {index}')
+        for index in range(size)
+    ])
+    evidence = list(GroupWorkoutEvidence.objects.filter(
+        workout=workouts[0]).order_by('id'))
+    for model in (GroupMembership, GroupWorkout, GroupWorkoutEvidence):
+        group_rows_bulk_created.send(sender=model, group_id=group.id,
+                                     created=size)
+
+    Group.objects.bulk_create([
+        Group(group_name=f'Other Group {size}-{index}',
+              target_workout_number_per_week=3, created_by=members[index])
+        for index in range(size)
+    ])
+    GroupMembership.objects.bulk_create([
+        GroupMembership(member=owner, group=other, member_role='Member')
+        for other in Group.objects.filter(
+            group_name__startswith=f'Other Group {size}-')
+    ])
+
+    Friends.objects.bulk_create([
+        Friends(user1=owner, user2=member, status='Accepted',
+                requested_by=owner)
+        for member in members
+    ])
+    connections = list(Friends.objects.filter(user1=owner).order_by('id'))
+    FriendEdge.objects.bulk_create([
+        FriendEdge(user_id=user_id, friend_id=friend_id,
+                   connection=friends, accepted=True)
+        for friends in connections
+        for user_id, friend_id in ((friends.user1_id, friends.user2_id),
+                                   (friends.user2_id, friends.user1_id))
+    ])
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(owner=member, actor=owner, evidence=row)
+        for member, row in zip(members, evidence)
+    ] + [
+        TimelineEntry(owner=owner, actor=owner, evidence=row)
+        for row in evidence
+    ])
+
+    return SimpleNamespace(owner=owner, members=members, group=group,
+                           workouts=workouts, evidence=evidence,
+                           connections=connections)
+
+
+def create_stranger(data):
+    """A member with no relation to the dataset"""
+    return get_user_model().objects.create_user(
+        email=f'stranger-{data.owner.id}@example.com', password=PASSWORD)
+
+
+@scenario('group:group-list', 'get')
+def list_memberships(data):
+    return reverse('group:group-list'), {}
+
+
+@scenario('group:group-list', 'post')
+def create_group(data):
+    return reverse('group:group-list'), {
+        'group_name': 'New Group',
+        'target_workout_number_per_week': 3,
+        'created_by': data.owner.id,
+    }
+
+
+@scenario('group:group-detail', 'patch')
+def update_membership(data):
+    membership = GroupMembership.objects.get(
+        group=data.group, member=data.owner)
+    return (reverse('group:group-detail', kwargs={'pk': membership.id}),
+            {'member_role': 'Admin'})
+
+
+@scenario('group:group-detail', 'delete')
+def delete_membership(data):
+    membership = GroupMembership.objects.get(
+        group=data.group, member=data.owner)
+    return reverse('group:group-detail', kwargs={'pk': membership.id}), {}
+
+
+@scenario('group:group-addMember', 'post')
+def add_member(data):
+    return reverse('group:group-addMember'), {
+        'group': data.group.id,
+        'member': create_stranger(data).id,
+        'member_role': 'Member',
+    }
+
+
+@scenario('group:group-addMembers', 'post')
+def add_members(data):
+    users = create_users(f'batch{data.owner.id}-', 5)
+    return reverse('group:group-addMembers'), {
+        'group': data.group.id,
+        'members': [{'member': user.id, 'member_role': 'Member'}
+                    for user in users],
+    }
+
+
+@scenario('group:group-getGroupmember', 'get')
+def get_group_member(data):
+    return reverse('group:group-getGroupmember'), {
+        'group_id': data.group.id, 'member_id': data.members[0].id}
+
+
+@scenario('group:group-getGroups', 'get')
+def get_groups(data):
+    return reverse('group:group-getGroups'), {}
+
+
+@scenario('group:group-members', 'get')
+def list_group_members(data):
+    return reverse('group:group-members'), {'group_id': data.group.id}
+
+
+@scenario('group:group-progress', 'get')
+def get_progress(data):
+    return reverse('group:group-progress'), {
+        'group_id': data.group.id, 'weeks': 4}
+
+
+@scenario('group:group-stats', 'get')
+def get_stats(data):
+    return reverse('group:group-stats'), {'group_id': data.group.id}
+
+
+@scenario('group:group-deleteGroup', 'delete')
+def delete_group(data):
+    return reverse('group:group-deleteGroup',
+                   kwargs={'pk': data.group.id}), {}
+
+
+@scenario('group:group-updateMember', 'put')
+def update_member(data):
+    return reverse('group:group-updateMember', kwargs={'pk': None}), {
+        'group': data.group.id,
+        'member': data.members[0].id,
+        'new_member_role': 'Admin',
+    }
+
+
+@scenario('group:group-deleteMember', 'delete')
+def delete_member(data):
+    return reverse('group:group-deleteMember', kwargs={'pk': None}), {
+        'group': data.group.id, 'member': data.members[0].id}
+
+
+@scenario('group:workout-workout', 'get')
+def list_workouts(data):
+    return reverse('group:workout-workout', kwargs={'pk': None}), {
+        'group_id': data.group.id}
+
+
+@scenario('group:workout-addWorkout', 'post')
+def add_workout(data):
+    return reverse('group:workout-addWorkout', kwargs={'pk': None}), {
+        'name': 'New Workout',
+        'description': 'Full body',
+        'group_id': data.group.id,
+        'link': 'http://test.co.uk',
+    }
+
+
+@scenario('group:workout-importWorkouts', 'post')
+def import_workouts(data):
+    return reverse('group:workout-importWorkouts', kwargs={'pk': None}), {
+        'group_id': data.group.id,
+        'workouts': [{'name': f'Imported {index}',
+                      'description': 'Full body',
+                      'link': 'http://test.co.uk'}
+                     for index in range(5)],
+    }
+
+
+@scenario('group:workout-deleteWorkout', 'delete')
+def delete_workout(data):
+    return reverse('group:workout-deleteWorkout', kwargs={'pk': None}), {
+        'workout_id': data.workouts[-1].id}
+
+
+@scenario('group:workout-evidence', 'get')
+def list_workout_evidence(data):
+    return reverse('group:workout-evidence', kwargs={'pk': None}), {
+        'member_id': data.owner.id, 'workout_id': data.workouts[0].id}
+
+
+@scenario('group:workout-evidenceLog', 'get')
+def list_member_evidence(data):
+    return reverse('group:workout-evidenceLog', kwargs={'pk': None}), {
+        'member_id': data.owner.id, 'group_id': data.group.id}
+
+
+@scenario('group:workout-groupEvidenceLog', 'get')
+def list_group_evidence(data):
+    return reverse('group:workout-groupEvidenceLog', kwargs={'pk': None}), {
+        'group_id': data.group.id}
+
+
+@scenario('group:workout-uploadEvidence', 'post', format='multipart')
+def upload_evidence(data):
+    image = BytesIO()
+    Image.new('RGB', (10, 20)).save(image, format='JPEG')
+    return reverse('group:workout-uploadEvidence', kwargs={'pk': None}), {
+        'workout_id': data.workouts[0].id,
+        'evidence_image': SimpleUploadedFile(
+            'evidence.jpg', image.getvalue(), content_type='image/jpeg'),
+        'comment': 'Excellent Workout',
+    }
+
+
+@scenario('group:workout-deleteWorkoutEvidence', 'delete')
+def delete_evidence(data):
+    return (reverse('group:workout-deleteWorkoutEvidence',
+                    kwargs={'pk': None}),
+            {'workout_evidence_id': data.evidence[0].id})
+
+
+@scenario('friends:friends-list', 'get')
+def list_connections(data):
+    return reverse('friends:friends-list'), {}
+
+
+@scenario('friends:friends-detail', 'delete')
+def delete_connection(data):
+    return reverse('friends:friends-detail',
+                   kwargs={'pk': data.connections[0].id}), {}
+
+
+@scenario('friends:friends-feed', 'get')
+def get_feed(data):
+    return reverse('friends:friends-feed'), {}
+
+
+@scenario('friends:friends-getFriends', 'get')
+def get_friends(data):
+    return reverse('friends:friends-getFriends'), {
+        'user_id': data.owner.id, 'include_mutual': 'true'}
+
+
+@scenario('friends:friends-suggestions', 'get')
+def get_suggestions(data):
+    return reverse('friends:friends-suggestions'), {}
+
+
+@scenario('friends:friends-addFriend', 'post')
+def add_friend(data):
+    return reverse('friends:friends-addFriend', kwargs={'pk': None}), {
+        'requested_by_id': data.owner.id,
+        'user2_id': create_stranger(data).id,
+    }
+
+
+@scenario('friends:friends-response', 'patch')
+def respond_to_request(data):
+    pending = Friends.objects.create(
+        user1=create_stranger(data), user2=data.owner, status='Pending',
+        requested_by=data.owner)
+    return reverse('friends:friends-response', kwargs={'pk': None}), {
+        'friend_conn_id': pending.id, 'status': 'Accepted'}
+
+
+@scenario('friends:friends-deleteFriend', 'delete')
+def delete_friend(data):
+    return reverse('friends:friends-deleteFriend',
+                   kwargs={'pk': data.connections[0].id}), {}
+
+
+@scenario('member:create', 'post')
+def create_member(data):
+    return reverse('member:create'), {
+        'email': f'new-{data.owner.id}@example.com',
+        'password': PASSWORD,
+        'first_name': 'New',
+        'last_name': 'Member',
+    }
+
+
+@scenario('member:token', 'post')
+def create_token(data):
+    return reverse('member:token'), {
+        'email': data.owner.email, 'password': PASSWORD}
+
+
+@scenario('member:token-refresh', 'post')
+def refresh_token(data):
+    return reverse('member:token-refresh'), {
+        'refresh': issue_token_pair(data.owner)['refresh']}
+
+
+@scenario('member:token-revoke', 'post')
+def revoke_token(data):
+    return reverse('member:token-revoke'), {
+        'refresh': issue_token_pair(data.owner)['refresh']}
+
+
+@scenario('member:me', 'get')
+def get_profile(data):
+    return reverse('member:me'), {}
+
+
+@scenario('member:me', 'patch')
+def update_profile(data):
+    return reverse('member:me'), {'first_name': 'Updated'}
+
+
+@scenario('member:member-getMemberSearchResults', 'get')
+def search_members(data):
+    return reverse('member:member-getMemberSearchResults'), {
+        'search_string': 'Runner', 'include_mutual': 'true'}
+
+
+@scenario('member:member-detail', 'get')
+def get_member(data):
+    return reverse('member:member-detail',
+                   kwargs={'pk': data.members[0].id}), {}
+
+
+@scenario('member:member-deleteMember', 'delete')
+def delete_member_profile(data):
+    return reverse('member:member-deleteMember', kwargs={'pk': None}), {
+        'member_id': data.owner.id}
+
+
+class QueryBudgetTests(TestCase):
+    """Tests the queries of each endpoint against its recorded budget"""
+
+    def setUp(self):
+        self.client = APIClient()
+        # Uploads outlive the rolled back rows, keep them out of MEDIA_ROOT
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def count_queries(self, data):
+        """Queries of each scenario, every one rolled back afterwards"""
+        query_counts = {}
+        for key, (route, method, format, _, build) in SCENARIOS.items():
+            with transaction.atomic():
+                url, payload = build(data)
+                self.client.force_authenticate(data.owner)
+                # Measure the uncached path, the one a cold cache takes
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    res = getattr(self.client, method)(
+                        url, payload, format=None if method == 'get'
+                        else format)
+                self.assertLess(res.status_code, 400,
+                                f'{key} failed: {res.status_code}')
+                transaction.set_rollback(True)
+            query_counts[key] = len(queries)
+
+        return query_counts
+
+    def test_every_route_has_a_scenario(self):
+        """Tests new routes cannot be added without a query budget"""
+        covered = {route for route, *_ in SCENARIOS.values()}
+
+        self.assertEqual(api_routes() - SHADOWED_ROUTES - covered, set())
+
+    def test_query_counts_within_budget(self):
+        """Tests query counts are independent of size and within budget"""
+        small, large = [self.count_queries(build_dataset(size))
+                        for size in DATASET_SIZES]
+
+        if os.environ.get('RECORD_QUERY_BUDGETS'):
+            BUDGETS_PATH.write_text(
+                json.dumps(large, indent=4, sort_keys=True) + '\n')
+        budgets = json.loads(BUDGETS_PATH.read_text())
+
+        for key, (_, _, _, batched, _) in SCENARIOS.items():
+            with self.subTest(endpoint=key):
+                if not batched:
+                    self.assertEqual(small[key], large[key])
+                self.assertIn(key, budgets)
+                self.assertLessEqual(large[key], budgets[key])
@@ -0,0 +1,58 @@
+"""
+Tests for the shared serializer behaviour
+"""
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from core.serializers import EagerLoadingMixin
+from friends import serializers as friends_serializers
+from group import serializers as group_serializers
+from member import serializers as member_serializers
+
+
+def model_serializers():
+    """Every model serializer of the APIs"""
+    for module in (friends_serializers, group_serializers,
+                   member_serializers):
+        for value in vars(module).values():
+            if (isinstance(value, type)
+                    and issubclass(value, serializers.ModelSerializer)
+                    and value.__module__ == module.__name__):
+                yield value
+
+
+def reads_relation(field):
+    """Whether rendering the field follows a relation to another row"""
+    if field.write_only:
+        return False
+    if isinstance(field, (serializers.BaseSerializer,
+                          serializers.ManyRelatedField)):
+        return True
+    # Primary keys are read from the row's own foreign key column
+    return (isinstance(field, serializers.RelatedField)
+            and not field.use_pk_only_optimization())
+
+
+class EagerLoadingMixinTests(SimpleTestCase):
+    """Tests serializers declare the relations they read"""
+
+    def test_nested_relations_prefixed(self):
+        """Tests relations of nested serializers are loaded through them"""
+        select, prefetch = (friends_serializers.TimelineEntrySerializer
+                            .get_related_fields())
+
+        self.assertEqual(select, ['evidence', 'evidence__member',
+                                  'evidence__workout',
+                                  'evidence__workout__group'])
+        self.assertEqual(prefetch, [])
+
+    def test_relations_declared(self):
+        """Tests every relation a serializer renders is loaded upfront"""
+        for serializer_class in model_serializers():
+            with self.subTest(serializer=serializer_class.__name__):
+                self.assertTrue(
+                    issubclass(serializer_class, EagerLoadingMixin))
+                select, prefetch = serializer_class.get_related_fields()
+                for field in serializer_class().fields.values():
+                    if reads_relation(field):
+                        self.assertIn(field.source, select + prefetch)
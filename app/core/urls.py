@@ -3,5 +3,6 @@ from . import views
 
 # URL Conf
 urlpatterns = [
-    path('hello/', views.say_hello)
+    path('hello/', views.say_hello),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache-stats'),
 ]
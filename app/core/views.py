@@ -1,7 +1,23 @@
 from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import cache
+from member.authentication import SignedTokenAuthentication
 
 # Create your views here.
 
 
 def say_hello(request):
     return HttpResponse('Hello World')
+
+
+class CacheStatsView(APIView):
+    """Hit and miss counters of the API response caches"""
+
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.get_stats())
@@ -0,0 +1,38 @@
+"""
+Friend graph queries over the symmetric friend edges
+"""
+from django.db.models import Count
+
+from core.models import FriendEdge
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def accepted_friend_ids(user_id):
+    """Subquery of the members the user is friends with"""
+    return FriendEdge.objects.filter(
+        user_id=user_id, accepted=True).values('friend_id')
+
+
+def count_mutual_friends(user_id, member_ids):
+    """Mutual friends of the user with each member, in one grouped query"""
+    return dict(FriendEdge.objects.filter(
+        user_id__in=member_ids,
+        accepted=True,
+        friend_id__in=accepted_friend_ids(user_id),
+    ).values_list('user_id').annotate(Count('id')).order_by())
+
+
+def mutual_counts_requested(request):
+    """Whether the client opted in to mutual friend counts"""
+    return request.query_params.get(
+        'include_mutual', '').lower() in TRUE_VALUES
+
+
+def annotate_mutual_friends(user_id, rows, get_member_id):
+    """Adds the mutual friend count with the user to serialized rows"""
+    counts = count_mutual_friends(
+        user_id, {get_member_id(row) for row in rows})
+    for row in rows:
+        row['mutual_friends'] = counts.get(get_member_id(row), 0)
+    return rows
@@ -0,0 +1,11 @@
+"""
+Pagination for the Friends APIs
+"""
+from core.pagination import KeysetPagination
+
+
+class TimelinePagination(KeysetPagination):
+    """Pages through a feed, newest entries first"""
+    ordering = ('-id',)
+    page_size = 30
+    max_page_size = 100
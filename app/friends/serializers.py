@@ -1,20 +1,46 @@
 """Serializers for the Friends API"""
 
 from member.serializers import MemberSerializer
-from core.models import Friends
+from core.models import Friends, TimelineEntry
+from core.serializers import EagerLoadingMixin
+from group.serializers import GroupWorkoutEvidenceSerializer
 from rest_framework import serializers
 
 
-class FriendsSerializer(serializers.ModelSerializer):
+class FriendsSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for Friends"""
 
     user1 = MemberSerializer()
     user2 = MemberSerializer()
     requested_by = MemberSerializer()
 
+    select_related_fields = ('user1', 'user2', 'requested_by')
+
     class Meta:
         model = Friends
         fields = ['id', 'user1', 'user2',
                   'connected_date', 'status',
                   'requested_by', 'request_date']
         read_only_fields = ['id', 'requested_by', 'request_date']
+
+
+class FriendSuggestionSerializer(serializers.Serializer):
+    """Serializer for a member the user may know"""
+
+    member = MemberSerializer()
+    mutual_friends = serializers.IntegerField()
+    shared_groups = serializers.IntegerField()
+
+
+class TimelineEntrySerializer(EagerLoadingMixin,
+                              serializers.ModelSerializer):
+    """Serializer for an entry in a member's feed"""
+
+    evidence = GroupWorkoutEvidenceSerializer()
+
+    select_related_fields = ('evidence',)
+
+    class Meta:
+        model = TimelineEntry
+        fields = ['id', 'created_date', 'evidence']
+        read_only_fields = fields
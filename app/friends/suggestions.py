@@ -0,0 +1,62 @@
+"""
+People a member may know, from mutual friends and shared groups
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from core.models import FriendEdge, GroupMembership
+from friends.graph import accepted_friend_ids
+
+# Best candidates kept from each signal before they are combined
+CANDIDATE_POOL_SIZE = 500
+
+
+def suggest_friends(user_id, limit):
+    """Members ranked by mutual friends, then shared groups
+
+    Each signal is one grouped query over the friend edges or the group
+    memberships, however many friends or groups the member has. Members
+    already connected to the user, pending or accepted, are left out.
+    """
+    friend_ids = accepted_friend_ids(user_id)
+    connected_ids = FriendEdge.objects.filter(
+        user_id=user_id).values('friend_id')
+    group_ids = GroupMembership.objects.filter(
+        member_id=user_id).values('group_id')
+
+    mutual_friends = dict(FriendEdge.objects.filter(
+        user_id__in=friend_ids, accepted=True,
+    ).exclude(
+        friend_id=user_id,
+    ).exclude(
+        friend_id__in=connected_ids,
+    ).values_list('friend_id').annotate(
+        mutual=Count('id'),
+    ).order_by('-mutual')[:CANDIDATE_POOL_SIZE])
+
+    shared_groups = dict(GroupMembership.objects.filter(
+        group_id__in=group_ids,
+    ).exclude(
+        member_id=user_id,
+    ).exclude(
+        member_id__in=connected_ids,
+    ).values_list('member_id').annotate(
+        shared=Count('group_id', distinct=True),
+    ).order_by('-shared')[:CANDIDATE_POOL_SIZE])
+
+    candidate_ids = sorted(
+        mutual_friends.keys() | shared_groups.keys(),
+        key=lambda candidate_id: (-mutual_friends.get(candidate_id, 0),
+                                  -shared_groups.get(candidate_id, 0),
+                                  candidate_id),
+    )[:limit]
+    members = get_user_model().objects.in_bulk(candidate_ids)
+
+    return [
+        {
+            'member': members[candidate_id],
+            'mutual_friends': mutual_friends.get(candidate_id, 0),
+            'shared_groups': shared_groups.get(candidate_id, 0),
+        }
+        for candidate_id in candidate_ids if candidate_id in members
+    ]
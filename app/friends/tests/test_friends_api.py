@@ -1,18 +1,26 @@
 """Tests for the Firnds API"""
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Friends
+from core.models import (Friends, Group, GroupMembership, GroupWorkout,
+                         GroupWorkoutEvidence, TimelineEntry)
 from friends.serializers import FriendsSerializer
+from friends.timeline import publish_evidence
 
 FRIENDS_URL = reverse('friends:friends-getFriends')
 FRIENDS_ADD_URL = reverse('friends:friends-addFriend', kwargs={'pk': None})
 FRIENDS_ACCEPT_REJECT_RESPONSE_URL = reverse(
     'friends:friends-response', kwargs={'pk': None})
+FRIENDS_SUGGESTIONS_URL = reverse('friends:friends-suggestions')
+FRIENDS_LIST_URL = reverse('friends:friends-list')
+FRIENDS_FEED_URL = reverse('friends:friends-feed')
 
 
 def create_friend_connection(requestingUser, otherUser):
@@ -27,6 +35,12 @@ def create_friend_connection(requestingUser, otherUser):
     return friend_connection
 
 
+def create_accepted_connection(user, other_user):
+    """Connects two members as friends"""
+    return Friends.objects.create(user1=user, user2=other_user,
+                                  status='Accepted', requested_by=user)
+
+
 def create_user(**params):
     defaults = {
         'email': 'testUser@example.com',
@@ -59,6 +73,7 @@ class PrivateFriendsAPITests(TestCase):
     """Tests the authenticated user requests in Group API"""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = create_user()
         self.client.force_authenticate(self.user)
@@ -83,6 +98,72 @@ class PrivateFriendsAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_get_friends_cached_until_connections_change(self):
+        """Tests friends are cached and refreshed when connections change"""
+        user2 = create_user(email='user2@example.com')
+        user3 = create_user(email='user3@example.com')
+        create_friend_connection(self.user, user2)
+        self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        # Only the version lookup for the ETag reaches the database
+        with self.assertNumQueries(1):
+            self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        create_friend_connection(self.user, user3)
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        self.assertEqual([friend['user2']['email'] for friend in res.data],
+                         [user2.email, user3.email])
+
+    def test_get_friends_not_modified(self):
+        """Tests the friends list ETag follows the friends version"""
+        user2 = create_user(email='user2@example.com')
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+        etag = res['ETag']
+
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id},
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_friend_connection(self.user, user2)
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id},
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_get_friends_both_directions(self):
+        """Tests connections requested by either member are returned"""
+        user2 = create_user(email='user2@example.com')
+        user3 = create_user(email='user3@example.com')
+        create_friend_connection(self.user, user2)
+        create_friend_connection(user3, self.user)
+
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(friend['user1']['email'], friend['user2']['email'])
+             for friend in res.data],
+            [(self.user.email, user2.email), (user3.email, self.user.email)])
+
+    def test_add_friend_connection_reverse_exists(self):
+        """Tests a connection requested the other way round is found"""
+        user2 = create_user(email='user2@example.com')
+        create_friend_connection(user2, self.user)
+
+        res = self.client.post(FRIENDS_ADD_URL, {
+            'requested_by_id': self.user.id, 'user2_id': user2.id})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Friends.objects.count(), 1)
+
+    def test_add_friend_missing_member(self):
+        """Tests connecting to an unknown member is rejected"""
+        res = self.client.post(FRIENDS_ADD_URL, {
+            'requested_by_id': self.user.id, 'user2_id': 9999})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_add_friend_connection(self):
         """Test add a new friend connections"""
         params = {
@@ -192,3 +273,258 @@ class PrivateFriendsAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(friend_connection.count(), 0)
+
+    def test_friend_lists_query_count_independent_of_size(self):
+        """Tests listing connections costs the same for few and many"""
+        query_counts = []
+        for size in (3, 30):
+            owner = create_user(email=f'owner{size}@example.com')
+            for index in range(size):
+                create_accepted_connection(owner, create_user(
+                    email=f'friend{size}-{index}@example.com'))
+            self.client.force_authenticate(owner)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(FRIENDS_URL, {'user_id': owner.id})
+                self.assertEqual(len(res.data), size)
+                res = self.client.get(FRIENDS_LIST_URL)
+                self.assertEqual(len(res.data), size)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class FriendSuggestionsAPITests(TestCase):
+    """Tests the people you may know suggestions"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.others = {name: create_user(email=f'{name}@example.com')
+                       for name in ('friend1', 'friend2', 'mutual2',
+                                    'mutual1', 'grouped', 'pending',
+                                    'stranger')}
+        others = self.others
+        create_accepted_connection(self.user, others['friend1'])
+        create_accepted_connection(others['friend2'], self.user)
+        create_accepted_connection(others['friend1'], others['mutual2'])
+        create_accepted_connection(others['mutual2'], others['friend2'])
+        create_accepted_connection(others['friend1'], others['mutual1'])
+        create_accepted_connection(others['friend1'], others['pending'])
+        create_friend_connection(self.user, others['pending'])
+        # Pending connections of friends do not count as mutual friends
+        create_friend_connection(others['friend2'], others['stranger'])
+
+        group = Group.objects.create(group_name='Test Group',
+                                     created_by=self.user)
+        for member in (self.user, others['grouped'], others['mutual1']):
+            GroupMembership.objects.create(
+                member=member, group=group, member_role='Member')
+
+    def test_suggestions_ranked(self):
+        """Tests mutual friends rank first, then shared groups"""
+        res = self.client.get(FRIENDS_SUGGESTIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(suggestion['member']['email'], suggestion['mutual_friends'],
+              suggestion['shared_groups']) for suggestion in res.data],
+            [('mutual2@example.com', 2, 0),
+             ('mutual1@example.com', 1, 1),
+             ('grouped@example.com', 0, 1)])
+
+    def test_suggestions_query_count_independent_of_friends(self):
+        """Tests suggestions take a fixed number of queries"""
+        for index in range(20):
+            friend = create_user(email=f'extra{index}@example.com')
+            create_accepted_connection(self.user, friend)
+            create_accepted_connection(friend, self.others['mutual1'])
+
+        with self.assertNumQueries(4):
+            res = self.client.get(FRIENDS_SUGGESTIONS_URL)
+
+        self.assertEqual(res.data[0]['member']['email'],
+                         'mutual1@example.com')
+        self.assertEqual(res.data[0]['mutual_friends'], 21)
+
+    def test_suggestions_cached_until_connections_change(self):
+        """Tests suggestions are cached per user"""
+        self.client.get(FRIENDS_SUGGESTIONS_URL)
+
+        # Only the friends version is read
+        with self.assertNumQueries(1):
+            self.client.get(FRIENDS_SUGGESTIONS_URL)
+
+        create_accepted_connection(self.user, self.others['mutual2'])
+        res = self.client.get(FRIENDS_SUGGESTIONS_URL)
+
+        self.assertNotIn('mutual2@example.com',
+                         [suggestion['member']['email']
+                          for suggestion in res.data])
+
+    def test_suggestions_limit(self):
+        """Tests the number of suggestions is bounded"""
+        res = self.client.get(FRIENDS_SUGGESTIONS_URL, {'limit': 1})
+        self.assertEqual(len(res.data), 1)
+
+        res = self.client.get(FRIENDS_SUGGESTIONS_URL, {'limit': 500})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MutualFriendCountTests(TestCase):
+    """Tests the opt-in mutual friend counts on friend lists"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.friend1 = create_user(email='friend1@example.com')
+        self.friend2 = create_user(email='friend2@example.com')
+        self.friend3 = create_user(email='friend3@example.com')
+        create_accepted_connection(self.user, self.friend1)
+        create_accepted_connection(self.friend2, self.user)
+        create_accepted_connection(self.friend1, self.friend2)
+        create_friend_connection(self.user, self.friend3)
+        create_accepted_connection(self.friend3, self.friend1)
+        create_accepted_connection(self.friend3, self.friend2)
+
+    def mutual_counts(self, rows):
+        return {other_email(row, self.user.email): row['mutual_friends']
+                for row in rows}
+
+    def test_get_friends_with_mutual_counts(self):
+        """Tests each connection carries its mutual friend count"""
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id,
+                                            'include_mutual': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.mutual_counts(res.data), {
+            self.friend1.email: 1,
+            self.friend2.email: 1,
+            self.friend3.email: 2,
+        })
+
+    def test_mutual_counts_one_query_per_page(self):
+        """Tests counts for the whole list take one query past the version"""
+        for index in range(10):
+            friend = create_user(email=f'extra{index}@example.com')
+            create_accepted_connection(self.user, friend)
+            create_accepted_connection(friend, self.friend1)
+        self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        with self.assertNumQueries(2):
+            res = self.client.get(FRIENDS_URL, {'user_id': self.user.id,
+                                                'include_mutual': '1'})
+
+        self.assertEqual(self.mutual_counts(res.data)[self.friend1.email],
+                         11)
+
+    def test_list_with_mutual_counts(self):
+        """Tests the connections list supports mutual counts"""
+        res = self.client.get(FRIENDS_LIST_URL, {'include_mutual': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.mutual_counts(res.data)[self.friend3.email], 2)
+
+    def test_mutual_counts_opt_in(self):
+        """Tests counts are left out unless requested"""
+        res = self.client.get(FRIENDS_URL, {'user_id': self.user.id})
+
+        self.assertNotIn('mutual_friends', res.data[0])
+
+
+class TimelineAPITests(TestCase):
+    """Tests the feed of fellow members' workout evidence"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.friend = create_user(email='friend@example.com')
+        self.teammate = create_user(email='teammate@example.com')
+        self.team_friend = create_user(email='teamfriend@example.com')
+        self.stranger = create_user(email='stranger@example.com')
+        create_accepted_connection(self.user, self.friend)
+        create_accepted_connection(self.user, self.team_friend)
+
+        group = Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=self.user,
+        )
+        for member in (self.user, self.teammate, self.team_friend):
+            GroupMembership.objects.create(member=member, group=group)
+        self.workout = GroupWorkout.objects.create(
+            group=group, name='Test Workout', description='Full body',
+            link='http://test.co.uk')
+
+    def post_evidence(self, comment='Superb!'):
+        """Records evidence by the user and fans it out"""
+        with self.captureOnCommitCallbacks(execute=True):
+            evidence = GroupWorkoutEvidence.objects.create(
+                member=self.user, workout=self.workout, comment=comment)
+            publish_evidence(evidence, self.workout.group_id)
+        return evidence
+
+    def test_evidence_fanned_out(self):
+        """Tests group members, friends among them, receive the evidence"""
+        evidence = self.post_evidence()
+
+        owners = set(TimelineEntry.objects.filter(
+            evidence=evidence).values_list('owner', flat=True))
+        self.assertEqual(owners, {self.teammate.id, self.team_friend.id})
+
+    def test_friends_outside_group_left_out(self):
+        """Tests friends outside the group do not see its evidence"""
+        self.post_evidence()
+        self.client.force_authenticate(self.friend)
+
+        res = self.client.get(FRIENDS_FEED_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(TIMELINE_INLINE_FANOUT=1, BACKGROUND_TASKS_EAGER=True)
+    def test_large_fan_out_in_background(self):
+        """Tests fan-outs above the inline limit are still written"""
+        evidence = self.post_evidence()
+
+        self.assertEqual(
+            TimelineEntry.objects.filter(evidence=evidence).count(), 2)
+
+    def test_feed_paginated(self):
+        """Tests the feed pages through entries newest first"""
+        first = self.post_evidence('First')
+        second = self.post_evidence('Second')
+        self.client.force_authenticate(self.team_friend)
+
+        res = self.client.get(FRIENDS_FEED_URL, {'page_size': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [row['evidence']['id'] for row in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [row['evidence']['id'] for row in res.data['results']]
+
+        self.assertEqual(ids, [second.id, first.id])
+        self.assertIsNone(res.data['next'])
+
+    def test_feed_excludes_others(self):
+        """Tests members outside the audience see nothing"""
+        self.post_evidence()
+        self.client.force_authenticate(self.stranger)
+
+        res = self.client.get(FRIENDS_FEED_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_deleted_evidence_leaves_feed(self):
+        """Tests deleting evidence removes its timeline entries"""
+        self.post_evidence().delete()
+
+        self.assertFalse(TimelineEntry.objects.exists())
+
+
+def other_email(row, email):
+    """Email of the other member of a serialized connection"""
+    if row['user1']['email'] == email:
+        return row['user2']['email']
+    return row['user1']['email']
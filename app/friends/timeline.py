@@ -0,0 +1,51 @@
+"""
+Fan-out of workout evidence to the feeds of fellow group members
+"""
+from django.conf import settings
+from django.db import transaction
+
+from core.models import GroupMembership, TimelineEntry
+from core.tasks import submit
+
+INSERT_BATCH_SIZE = 1000
+
+
+def get_recipient_ids(actor_id, group_id):
+    """Fellow members of the group, the actor's friends among them
+
+    Friends outside the group are left out, evidence and its media are
+    only disclosed to members of the group it was posted in.
+    """
+    return sorted(GroupMembership.objects.filter(
+        group_id=group_id).exclude(member_id=actor_id).values_list(
+        'member_id', flat=True))
+
+
+def write_timeline_entries(evidence_id, actor_id, recipient_ids):
+    """Appends the evidence to each recipient's timeline in batches"""
+    for start in range(0, len(recipient_ids), INSERT_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=owner_id, actor_id=actor_id,
+                           evidence_id=evidence_id)
+             for owner_id in recipient_ids[start:start + INSERT_BATCH_SIZE]],
+            ignore_conflicts=True,
+        )
+
+
+def publish_evidence(evidence, group_id):
+    """Fans the evidence out once the upload commits
+
+    Small audiences are written straight away. Above
+    TIMELINE_INLINE_FANOUT recipients the writes go to the background
+    workers so the upload response is not held up.
+    """
+    def fan_out():
+        recipient_ids = get_recipient_ids(evidence.member_id, group_id)
+        if len(recipient_ids) > settings.TIMELINE_INLINE_FANOUT:
+            submit(write_timeline_entries, evidence.id, evidence.member_id,
+                   recipient_ids)
+        else:
+            write_timeline_entries(evidence.id, evidence.member_id,
+                                   recipient_ids)
+
+    transaction.on_commit(fan_out)
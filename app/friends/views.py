@@ -1,16 +1,42 @@
 """Views for the Friends API"""
 from datetime import datetime
 from django.http import Http404
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Friends
+from core.cache import ResponseCache
+from core.etags import conditional_response
+from core.models import FriendEdge, Friends, TimelineEntry
 from friends import serializers
+from friends.graph import annotate_mutual_friends, mutual_counts_requested
+from friends.pagination import TimelinePagination
+from friends.suggestions import suggest_friends
+from member.authentication import SignedTokenAuthentication
+
+friends_cache = ResponseCache('user-friends')
+# Suggestions also shift as friends of friends connect, so expire sooner
+suggestions_cache = ResponseCache('friend-suggestions', timeout=15 * 60)
+
+
+def get_friends_version(user_id):
+    """Version of the user's friends list, None if there is no such user"""
+    try:
+        return get_user_model().objects.filter(id=user_id).values_list(
+            'friends_version', flat=True).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def other_member_id(row, user_id):
+    """Id of the member a serialized connection links the user to"""
+    if str(row['user1']['id']) == str(user_id):
+        return row['user2']['id']
+    return row['user1']['id']
 
 
 class FriendsViewSet(mixins.CreateModelMixin,
@@ -22,25 +48,87 @@ class FriendsViewSet(mixins.CreateModelMixin,
 
     serializer_class = serializers.FriendsSerializer
     queryset = Friends.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
+    MAX_SUGGESTIONS = 50
+
     def get_queryset(self):
         """Get friends for authenticated user"""
 
-        return self.queryset.filter(
-            Q(user1=self.request.user) | Q(user2=self.request.user))
+        return self.get_serializer_class().setup_eager_loading(
+            self.queryset.filter(edges__user=self.request.user))
+
+    def list(self, request, *args, **kwargs):
+        """Lists the user's connections, with mutual counts on request"""
+        response = super().list(request, *args, **kwargs)
+        if mutual_counts_requested(request):
+            annotate_mutual_friends(
+                request.user.id, response.data,
+                lambda row: other_member_id(row, request.user.id))
+        return response
 
     @action(detail=False, methods=['GET'])
     def getFriends(self, request):
         """Custom action for getting friends for a given user"""
 
         user_id = self.request.query_params.get('user_id')
-        user = get_user_model().objects.filter(id=user_id).first()
 
-        serializer = self.get_serializer(
-            self.queryset.filter(user1=user), many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        def list_friends():
+            user = get_user_model().objects.filter(id=user_id).first()
+            friends = self.get_serializer_class().setup_eager_loading(
+                self.queryset.filter(edges__user=user).order_by('id'))
+            return self.get_serializer(friends, many=True).data
+
+        version = get_friends_version(user_id)
+        if mutual_counts_requested(request):
+            # Counts change as other members connect, so no ETag here
+            return Response(annotate_mutual_friends(
+                request.user.id,
+                friends_cache.get_or_set(user_id, version, list_friends),
+                lambda row: other_member_id(row, user_id)))
+
+        return conditional_response(
+            request, 'user-friends', version,
+            lambda: Response(
+                friends_cache.get_or_set(user_id, version, list_friends),
+                status=status.HTTP_200_OK))
+
+    @action(detail=False, methods=['GET'])
+    def feed(self, request):
+        """Custom action for the user's feed of fellow members' workouts"""
+
+        entries = serializers.TimelineEntrySerializer.setup_eager_loading(
+            TimelineEntry.objects.filter(owner=self.request.user))
+
+        paginator = TimelinePagination()
+        page = paginator.paginate_queryset(entries, request, view=self)
+        serializer = serializers.TimelineEntrySerializer(
+            page, many=True, context=self.get_serializer_context())
+
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def suggestions(self, request):
+        """Custom action for suggesting people the user may know"""
+
+        try:
+            limit = int(self.request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.MAX_SUGGESTIONS:
+            return Response(
+                {'message': 'limit must be between 1 and '
+                            f'{self.MAX_SUGGESTIONS}'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        def list_suggestions():
+            return serializers.FriendSuggestionSerializer(
+                suggest_friends(request.user.id, limit), many=True).data
+
+        return Response(suggestions_cache.get_or_set(
+            request.user.id, get_friends_version(request.user.id),
+            list_suggestions, variant=limit))
 
     @action(detail=True, methods=['POST'])
     def addFriend(self, request, pk=None):
@@ -53,22 +141,28 @@ class FriendsViewSet(mixins.CreateModelMixin,
             id=requested_by_id).first()
         user2 = get_user_model().objects.filter(id=user2_id).first()
 
-        existing_friend_connections = self.queryset.filter(
-            Q(user1=requested_by) | Q(user2=requested_by))
+        if not requested_by or not user2:
+            return Response({'message': 'Member not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        if existing_friend_connections.filter(
-                Q(user1=user2) | Q(user2=user2)).exists():
+        if FriendEdge.objects.filter(
+                user=requested_by, friend=user2).exists():
 
             return Response({'message': 'Connection already exists for users'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        friend_connection = Friends.objects.create(
-            user1=requested_by,
-            user2=user2,
-            status='Pending',
-            requested_by=requested_by,
-        )
-        friend_connection.save()
+        try:
+            with transaction.atomic():
+                friend_connection = Friends.objects.create(
+                    user1=requested_by,
+                    user2=user2,
+                    status='Pending',
+                    requested_by=requested_by,
+                )
+        except IntegrityError:
+            # A concurrent request connected the same members first
+            return Response({'message': 'Connection already exists for users'},
+                            status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(friend_connection)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -81,7 +175,9 @@ class FriendsViewSet(mixins.CreateModelMixin,
         friend_conn_id = self.request.data.get('friend_conn_id')
         new_status = self.request.data.get('status')
 
-        friend_connection = self.queryset.filter(
+        connections = self.get_serializer_class().setup_eager_loading(
+            self.queryset)
+        friend_connection = connections.filter(
             Q(id=friend_conn_id)
             & Q(status='Pending')).first()
 
@@ -0,0 +1,127 @@
+"""
+Bulk import of group workouts from JSON or CSV
+"""
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from core.models import GroupWorkout
+from core.signals import group_rows_bulk_created
+
+WORKOUT_FIELDS = ('name', 'description', 'link')
+MAX_FIELD_LENGTHS = {'name': 255, 'link': 255}
+MAX_REPORTED_ERRORS = 50
+
+
+class UnreadableRow:
+    """Stands in for the rest of a CSV file that cannot be parsed"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_csv_rows(upload):
+    """Yields workout rows from an uploaded CSV file line by line
+
+    Reading stops at the first undecodable or malformed line, which is
+    yielded as an UnreadableRow so it is reported like any invalid row.
+    """
+    text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    except UnicodeDecodeError:
+        yield UnreadableRow('File is not UTF-8 encoded text')
+    except csv.Error as exc:
+        yield UnreadableRow(f'File is not valid CSV: {exc}')
+    finally:
+        # Leave closing the upload to Django
+        text.detach()
+
+
+def import_workouts(group, rows, max_rows, chunk_size=500):
+    """Validates and inserts workout rows for the group in chunks
+
+    Rows are inserted as they are validated, inside one transaction that
+    is rolled back if any row is invalid. Returns the created ids and the
+    row errors.
+    """
+    validate_url = URLValidator()
+    valid_urls = set()
+    created_ids = []
+    errors = []
+    chunk = []
+
+    with transaction.atomic():
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > max_rows:
+                errors.append({'row': row_number,
+                               'errors': [f'No more than {max_rows} rows']})
+                break
+
+            row_errors = validate_row(row, validate_url, valid_urls)
+            if row_errors:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': row_number, 'errors': row_errors})
+                continue
+            if errors:
+                # The import will be rolled back, keep validating only
+                continue
+
+            chunk.append(GroupWorkout(
+                group=group,
+                name=row['name'].strip(),
+                description=row['description'],
+                link=row['link'].strip(),
+            ))
+            if len(chunk) >= chunk_size:
+                created_ids.extend(_insert(chunk))
+                chunk = []
+
+        if chunk and not errors:
+            created_ids.extend(_insert(chunk))
+
+        if errors:
+            transaction.set_rollback(True)
+            return [], errors
+
+        if created_ids:
+            group_rows_bulk_created.send(
+                sender=GroupWorkout, group_id=group.id,
+                created=len(created_ids))
+
+    return created_ids, errors
+
+
+def validate_row(row, validate_url, valid_urls):
+    """Returns the problems with a workout row"""
+    if isinstance(row, UnreadableRow):
+        return [row.message]
+    if not isinstance(row, dict):
+        return ['Row must be an object with name, description and link']
+
+    row_errors = []
+    for field in WORKOUT_FIELDS:
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            row_errors.append(f'{field} is required')
+        elif len(value) > MAX_FIELD_LENGTHS.get(field, len(value)):
+            row_errors.append(
+                f'{field} is longer than {MAX_FIELD_LENGTHS[field]}')
+
+    link = row.get('link')
+    if not row_errors and link.strip() not in valid_urls:
+        try:
+            validate_url(link.strip())
+            valid_urls.add(link.strip())
+        except ValidationError:
+            row_errors.append('link is not a valid URL')
+
+    return row_errors
+
+
+def _insert(chunk):
+    return [workout.id for workout in
+            GroupWorkout.objects.bulk_create(chunk)]
@@ -0,0 +1,16 @@
+"""
+Pagination for the Group APIs
+"""
+from core.pagination import KeysetPagination
+
+
+class GroupPagination(KeysetPagination):
+    """Pages through groups in creation order"""
+    ordering = ('id',)
+
+
+class EvidencePagination(KeysetPagination):
+    """Pages through workout evidence, newest submissions first"""
+    ordering = ('-submission_date', '-id')
+    page_size = 50
+    max_page_size = 100
@@ -0,0 +1,90 @@
+"""
+Weekly workout progress of group members against the group target
+"""
+import datetime
+
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from core.cache import ResponseCache
+from core.models import GroupMembership, GroupWorkoutEvidence
+
+PROGRESS_CACHE_TIMEOUT = 60 * 60
+
+progress_cache = ResponseCache('group-progress',
+                               timeout=PROGRESS_CACHE_TIMEOUT)
+
+
+def week_start(day):
+    """Monday of the ISO week containing day"""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def get_weekly_progress(group, weeks):
+    """Progress of each member over the last weeks, read through the cache"""
+    current_week = week_start(timezone.localdate())
+
+    return progress_cache.get_or_set(
+        group.id, group.version,
+        lambda: compute_weekly_progress(group, current_week, weeks),
+        variant=f'{current_week.isoformat()}:{weeks}',
+    )
+
+
+def compute_weekly_progress(group, current_week, weeks):
+    """Counts evidence per member and ISO week in one grouped query"""
+    week_starts = [current_week - datetime.timedelta(weeks=offset)
+                   for offset in range(weeks)]
+
+    weekly_counts = GroupWorkoutEvidence.objects.filter(
+        group_id=group.id,
+        submission_date__gte=week_starts[-1],
+    ).annotate(
+        week=TruncWeek('submission_date'),
+    ).values('member_id', 'week').annotate(
+        evidence_count=Count('id'),
+    ).order_by()
+
+    counts = {(row['member_id'], _as_date(row['week'])): row['evidence_count']
+              for row in weekly_counts}
+
+    memberships = GroupMembership.objects.filter(group_id=group.id).values(
+        'member_id', 'member__email', 'member__first_name',
+        'member__last_name', 'member_role').order_by('member_id')
+
+    target = group.target_workout_number_per_week
+    members = []
+    for membership in memberships:
+        member_weeks = []
+        for week in week_starts:
+            evidence_count = counts.get((membership['member_id'], week), 0)
+            member_weeks.append({
+                'week_start': week.isoformat(),
+                'evidence_count': evidence_count,
+                'target_met': (None if target is None
+                               else evidence_count >= target),
+            })
+        members.append({
+            'member': {
+                'id': membership['member_id'],
+                'email': membership['member__email'],
+                'first_name': membership['member__first_name'],
+                'last_name': membership['member__last_name'],
+            },
+            'member_role': membership['member_role'],
+            'weeks': member_weeks,
+        })
+
+    return {
+        'group': group.id,
+        'target_workout_number_per_week': target,
+        'weeks': [week.isoformat() for week in week_starts],
+        'members': members,
+    }
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
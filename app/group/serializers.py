@@ -4,12 +4,13 @@ Serializers for Group API
 
 from rest_framework import serializers
 
-from core.models import (Group, GroupMembership,
+from core.models import (Group, GroupMembership, GroupStats,
                          GroupWorkout, GroupWorkoutEvidence)
+from core.serializers import EagerLoadingMixin
 from member.serializers import MemberSerializer
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for groups"""
 
     class Meta:
@@ -19,7 +20,17 @@ class GroupSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class GroupMembershipSerializer(serializers.ModelSerializer):
+class GroupStatsSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Serializer for group statistics"""
+
+    class Meta:
+        model = GroupStats
+        fields = ['group', 'member_count', 'workout_count', 'evidence_count']
+        read_only_fields = fields
+
+
+class GroupMembershipSerializer(EagerLoadingMixin,
+                                serializers.ModelSerializer):
     """Serializer for Group Membership"""
     # group = GroupSerializer()
     # member = MemberSerializer()
@@ -34,52 +45,66 @@ class GroupMembershipSerializer(serializers.ModelSerializer):
         slug_field='email'
     )
 
+    select_related_fields = ('group', 'member')
+
     class Meta:
         model = GroupMembership
         fields = ['id', 'member_role', 'group', 'member']
         read_only_fields = ['id']
 
 
-class GroupMembersListSerializer(serializers.ModelSerializer):
+class GroupMembersListSerializer(EagerLoadingMixin,
+                                 serializers.ModelSerializer):
     """Serializer for members list for group"""
 
     member = MemberSerializer()
 
+    select_related_fields = ('member',)
+
     class Meta:
         model = GroupMembership
         fields = ['member', 'group', 'member_role']
 
 
-class GroupWorkoutSerializer(serializers.ModelSerializer):
+class GroupWorkoutSerializer(EagerLoadingMixin,
+                             serializers.ModelSerializer):
     """Serializer for workout list for group"""
 
     group = GroupSerializer()
 
+    select_related_fields = ('group',)
+
     class Meta:
         model = GroupWorkout
         fields = ['id', 'name', 'group', 'description', 'link', 'created_date']
         read_only_fields = ['id', 'created_date']
 
 
-class GroupWorkoutEvidenceSerializer(serializers.ModelSerializer):
+class GroupWorkoutEvidenceSerializer(EagerLoadingMixin,
+                                     serializers.ModelSerializer):
     """Serializer for workout evidence list for groupmembers"""
 
     member = MemberSerializer()
     workout = GroupWorkoutSerializer()
 
+    select_related_fields = ('member', 'workout')
+
     class Meta:
         model = GroupWorkoutEvidence
         fields = ['id', 'member', 'workout',
-                  'evidence_image', 'comment', 'submission_date']
+                  'evidence_image', 'evidence_thumbnail', 'evidence_medium',
+                  'comment', 'submission_date']
         read_only_fields = ['id', 'created_date']
 
 
-class WorkoutEvidenceImageSerializer(serializers.ModelSerializer):
+class WorkoutEvidenceImageSerializer(EagerLoadingMixin,
+                                     serializers.ModelSerializer):
     """Serializer for workout evidence"""
 
     class Meta:
         model = GroupWorkoutEvidence
         fields = ['id', 'member', 'workout',
-                  'evidence_image', 'comment', 'submission_date']
+                  'evidence_image', 'evidence_thumbnail', 'evidence_medium',
+                  'comment', 'submission_date']
         read_only_fields = ['id', 'submission_date']
         extra_kwargs = {'evidence_image': {'required': 'True'}}
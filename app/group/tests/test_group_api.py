@@ -2,22 +2,29 @@
 Tests for the Group API
 """
 
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Group, GroupMembership
+from core.models import Group, GroupMembership, GroupStats
 from group.serializers import (GroupMembershipSerializer,
                                GroupMembersListSerializer, GroupSerializer)
+from group.views import GroupViewSet
 
 GROUPS_URL = reverse('group:group-list')
 GROUPS_URL_CUSTOM = reverse('group:group-getGroups')
 GROUP_MEMBERS_URL = reverse('group:group-members')
 GET_GROUP_MEMBER_URL = reverse('group:group-getGroupmember')
+GROUP_STATS_URL = reverse('group:group-stats')
 GROUP_ADD_MEMBER_URL = reverse('group:group-addMember')
+GROUP_ADD_MEMBERS_URL = reverse('group:group-addMembers')
 GROUP_UPDATE_MEMBER_URL = reverse(
     'group:group-updateMember', kwargs={'pk': None})
 GROUP_DELETE_MEMBER_URL = reverse(
@@ -50,6 +57,24 @@ def create_group_membership(user, group, role):
     return group_member
 
 
+def create_group_with_members(owner, size, role='Member'):
+    """creates a group with an Admin owner and size further members"""
+    group = create_group(owner, group_name=f'Test Group {size}')
+    create_group_membership(owner, group, 'Admin')
+
+    get_user_model().objects.bulk_create([
+        get_user_model()(email=f'member{size}-{index}@example.com')
+        for index in range(size)
+    ])
+    members = list(get_user_model().objects.filter(
+        email__startswith=f'member{size}-').order_by('id'))
+    GroupMembership.objects.bulk_create([
+        GroupMembership(member=member, group=group, member_role=role)
+        for member in members
+    ])
+    return group, members
+
+
 class PublicGroupAPITests(TestCase):
     """Tests the unauthenticated user requests in Group API"""
 
@@ -87,10 +112,52 @@ class PrivateGroupAPITests(TestCase):
         create_group_membership(self.user, group2, 'Admin')
 
         res = self.client.get(GROUPS_URL_CUSTOM)
-        groups = Group.objects.all()  # .order_by['-id']
+        groups = Group.objects.order_by('id')
         serializer = GroupSerializer(groups, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertIsNone(res.data['next'])
+
+    def test_custom_get_groups_limited_to_member_groups(self):
+        """Tests only groups the user is a member of are returned"""
+        user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com',
+            password='testPass111',
+        )
+        group1 = create_group(self.user, group_name="Test Group 1")
+        create_group_membership(self.user, group1, 'Admin')
+
+        group2 = create_group(user2, group_name="Test Group 2")
+        create_group_membership(user2, group2, 'Admin')
+
+        res = self.client.get(GROUPS_URL_CUSTOM)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'],
+                         GroupSerializer([group1], many=True).data)
+
+    def test_custom_get_groups_paginated(self):
+        """Tests groups are paged through with a cursor"""
+        groups = []
+        for index in range(5):
+            group = create_group(self.user, group_name=f"Test Group {index}")
+            create_group_membership(self.user, group, 'Admin')
+            groups.append(group)
+
+        res = self.client.get(GROUPS_URL_CUSTOM, {'page_size': 2})
+        returned_ids = [group['id'] for group in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            returned_ids.extend(group['id'] for group in res.data['results'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(returned_ids, [group.id for group in groups])
+
+    def test_custom_get_groups_invalid_cursor(self):
+        """Tests an invalid cursor is rejected"""
+        res = self.client.get(GROUPS_URL_CUSTOM, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_get_groups_for_user(self):
         """Tests retrieving groups for the user"""
@@ -172,6 +239,37 @@ class PrivateGroupAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_group_stats(self):
+        """Tests that custom action returns the group statistics"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        for index in range(3):
+            user = get_user_model().objects.create_user(
+                email=f'testUser{index}@example.com',
+                password='testPass111',
+            )
+            create_group_membership(user, group, 'Member')
+
+        res = self.client.get(GROUP_STATS_URL, {'group_id': group.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['group'], group.id)
+        self.assertEqual(res.data['member_count'], 4)
+        self.assertEqual(res.data['workout_count'], 0)
+        self.assertEqual(res.data['evidence_count'], 0)
+
+    def test_retrieve_group_stats_missing_group(self):
+        """Tests statistics are not returned for an unknown group"""
+        res = self.client.get(GROUP_STATS_URL, {'group_id': 9999})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_group_stats_invalid_group_id(self):
+        """Tests a non-numeric group id is rejected"""
+        res = self.client.get(GROUP_STATS_URL, {'group_id': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_group_member(self):
         """Tests that custom action returns specified group member"""
         user2 = get_user_model().objects.create_user(
@@ -247,6 +345,25 @@ class PrivateGroupAPITests(TestCase):
         self.assertEqual(res.data['member'], self.user.email)
         self.assertEqual(res.data['member_role'], 'Admin')
 
+    def test_add_existing_member_to_group_error(self):
+        """Tests that a member cannot be added to the same group twice"""
+
+        group1 = create_group(self.user, group_name='Test Group')
+        create_group_membership(self.user, group1, 'Admin')
+
+        group_membership_params = {
+            'member': self.user.id,
+            'group': group1.id,
+            'member_role': 'Admin'
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBER_URL, group_membership_params)
+        group_membership = GroupMembership.objects.filter(
+            group=group1, member=self.user)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(group_membership.count(), 1)
+
     def test_add_member_to_group_with_no_admin_present(self):
         """Tests that a member cannot be added to a group without an admin"""
 
@@ -363,3 +480,258 @@ class PrivateGroupAPITests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(group_membership.count(), 0)
+
+    def test_invalid_group_rejected(self):
+        """Tests a non-numeric group id is rejected by every action"""
+        requests = [
+            (self.client.get, GROUP_MEMBERS_URL, {'group_id': 'abc'}),
+            (self.client.get, GET_GROUP_MEMBER_URL,
+             {'group_id': 'abc', 'member_id': self.user.id}),
+            (self.client.post, GROUP_ADD_MEMBER_URL,
+             {'group': 'abc', 'member': self.user.id,
+              'member_role': 'Admin'}),
+            (self.client.put, GROUP_UPDATE_MEMBER_URL,
+             {'group': 'abc', 'member': self.user.id,
+              'new_member_role': 'Admin'}),
+            (self.client.delete, GROUP_DELETE_MEMBER_URL,
+             {'group': 'abc', 'member': self.user.id}),
+            (self.client.delete, reverse(
+                'group:group-deleteGroup', kwargs={'pk': 'abc'}), {}),
+        ]
+
+        for send, url, params in requests:
+            with self.subTest(url=url):
+                res = send(url, params)
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+
+class GroupAdminCheckTests(TestCase):
+    """Tests the admin presence check used when changing memberships"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_admin_check_other_admin_present(self):
+        """Tests another admin in the group satisfies the check"""
+        group, members = create_group_with_members(self.user, 2, 'Admin')
+
+        self.assertTrue(GroupViewSet().check_admin_user_present(
+            group.id, self.user.id))
+
+    def test_admin_check_only_admin_excluded(self):
+        """Tests the member being changed does not count as the admin"""
+        group, members = create_group_with_members(self.user, 2)
+
+        self.assertFalse(GroupViewSet().check_admin_user_present(
+            group.id, self.user.id))
+        self.assertTrue(GroupViewSet().check_admin_user_present(
+            group.id, members[0].id))
+
+    def test_admin_check_single_query(self):
+        """Tests the admin check is one query for a large group"""
+        group, members = create_group_with_members(self.user, 200)
+
+        with self.assertNumQueries(1):
+            GroupViewSet().check_admin_user_present(group.id, members[0].id)
+
+    def test_member_changes_query_count_independent_of_group_size(self):
+        """Tests membership changes cost the same in small and large groups"""
+        query_counts = []
+        for size in (5, 100):
+            group, members = create_group_with_members(self.user, size)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.put(GROUP_UPDATE_MEMBER_URL, {
+                    'member': members[0].id,
+                    'group': group.id,
+                    'new_member_role': 'Member',
+                })
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                res = self.client.delete(GROUP_DELETE_MEMBER_URL, {
+                    'member': members[1].id,
+                    'group': group.id,
+                })
+                self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_member_lists_query_count_independent_of_group_size(self):
+        """Tests listing members costs the same in small and large groups"""
+        query_counts = []
+        for size in (5, 100):
+            group, members = create_group_with_members(self.user, size)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(GROUP_MEMBERS_URL,
+                                      {'group_id': group.id})
+                self.assertEqual(len(res.data), size + 1)
+                res = self.client.get(GROUPS_URL)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+
+class GroupBulkAddMembersTests(TestCase):
+    """Tests adding a batch of members to a group"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.group = create_group(self.user)
+        create_group_membership(self.user, self.group, 'Admin')
+
+    def create_users(self, count):
+        """creates users without memberships"""
+        get_user_model().objects.bulk_create([
+            get_user_model()(email=f'bulk{index}@example.com')
+            for index in range(count)
+        ])
+        return list(get_user_model().objects.filter(
+            email__startswith='bulk').order_by('id'))
+
+    def test_add_members_to_group(self):
+        """Tests a batch of members is added to the group"""
+        users = self.create_users(3)
+        payload = {
+            'group': self.group.id,
+            'members': [{'member': user.id, 'member_role': 'Member'}
+                        for user in users],
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['created'] * 3)
+        self.assertEqual(GroupMembership.objects.filter(
+            group=self.group, member_role='Member').count(), 3)
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).member_count, 4)
+
+    def test_add_members_reports_per_item_results(self):
+        """Tests invalid items are reported without blocking the batch"""
+        user = self.create_users(1)[0]
+        payload = {
+            'group': self.group.id,
+            'members': [
+                {'member': user.id, 'member_role': 'Member'},
+                {'member': user.id, 'member_role': 'Member'},
+                {'member': self.user.id, 'member_role': 'Member'},
+                {'member': 9999, 'member_role': 'Member'},
+                {'member': user.id, 'member_role': 'Owner'},
+                {'member': 'abc', 'member_role': 'Member'},
+            ],
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['created', 'duplicate', 'already_member', 'member_not_found',
+             'invalid_role', 'invalid'])
+        self.assertEqual(GroupMembership.objects.filter(
+            group=self.group).count(), 2)
+
+    def test_add_members_counts_rows_inserted(self):
+        """Tests a member added concurrently is not reported as created"""
+        users = self.create_users(2)
+        payload = {
+            'group': self.group.id,
+            'members': [{'member': user.id, 'member_role': 'Member'}
+                        for user in users],
+        }
+        atomic = transaction.atomic
+
+        def add_concurrently(*args, **kwargs):
+            if not GroupMembership.objects.filter(member=users[0]).exists():
+                GroupMembership.objects.create(
+                    group=self.group, member=users[0], member_role='Member')
+            return atomic(*args, **kwargs)
+
+        with mock.patch('group.views.transaction.atomic',
+                        side_effect=add_concurrently):
+            res = self.client.post(
+                GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(
+            [result['status'] for result in res.data['results']],
+            ['already_member', 'created'])
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).member_count, 3)
+
+    def test_add_members_requires_admin(self):
+        """Tests members cannot be added to a group without an admin"""
+        group = create_group(self.user, group_name='No Admin Group')
+        users = self.create_users(2)
+        payload = {
+            'group': group.id,
+            'members': [{'member': user.id, 'member_role': 'Member'}
+                        for user in users],
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(GroupMembership.objects.filter(group=group).exists())
+
+    def test_add_members_invalid_group(self):
+        """Tests a non-numeric group id is rejected"""
+        users = self.create_users(1)
+        payload = {
+            'group': 'abc',
+            'members': [{'member': users[0].id, 'member_role': 'Member'}],
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_add_members_admin_in_batch(self):
+        """Tests an admin in the batch satisfies the admin requirement"""
+        group = create_group(self.user, group_name='No Admin Group')
+        users = self.create_users(2)
+        payload = {
+            'group': group.id,
+            'members': [{'member': users[0].id, 'member_role': 'Admin'},
+                        {'member': users[1].id, 'member_role': 'Member'}],
+        }
+
+        res = self.client.post(GROUP_ADD_MEMBERS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(GroupMembership.objects.filter(group=group).count(),
+                         2)
+
+    def test_add_members_query_count_independent_of_batch_size(self):
+        """Tests a batch of 100 members costs the same queries as 5"""
+        users = self.create_users(105)
+        query_counts = []
+        for batch in (users[:5], users[5:]):
+            payload = {
+                'group': self.group.id,
+                'members': [{'member': user.id, 'member_role': 'Member'}
+                            for user in batch],
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    GROUP_ADD_MEMBERS_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
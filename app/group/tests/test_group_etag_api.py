@@ -0,0 +1,121 @@
+"""
+Tests for conditional GET of group lists driven by the group version
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Group, GroupMembership,
+                         GroupWorkout, GroupWorkoutEvidence)
+
+GROUP_MEMBERS_URL = reverse('group:group-members')
+GROUP_WORKOUT_URL = reverse('group:workout-workout', kwargs={'pk': None})
+GROUP_WORKOUT_EVIDENCE_LOG_URL = reverse(
+    'group:workout-groupEvidenceLog', kwargs={'pk': None})
+
+
+class GroupETagTests(TestCase):
+    """Tests ETags of the group lists and 304 responses"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=self.user,
+        )
+        GroupMembership.objects.create(
+            member=self.user, group=self.group, member_role='Admin')
+        self.workout = GroupWorkout.objects.create(
+            group=self.group,
+            name='Test Workout',
+            description='Full body workout',
+            link='http://test.co.uk',
+        )
+
+    def get_version(self):
+        return Group.objects.get(id=self.group.id).version
+
+    def test_not_modified_without_list_query(self):
+        """Tests a matching If-None-Match is answered from the version"""
+        res = self.client.get(GROUP_MEMBERS_URL, {'group_id': self.group.id})
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                GROUP_MEMBERS_URL, {'group_id': self.group.id},
+                HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_etag_changes_with_group_rows(self):
+        """Tests writes to members, workouts and evidence bump the version"""
+        versions = [self.get_version()]
+
+        user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com',
+            password='testPass111',
+        )
+        GroupMembership.objects.create(
+            member=user2, group=self.group, member_role='Member')
+        versions.append(self.get_version())
+        GroupWorkout.objects.create(
+            group=self.group,
+            name='Second Workout',
+            description='Upper body workout',
+            link='http://test.co.uk',
+        )
+        versions.append(self.get_version())
+        GroupWorkoutEvidence.objects.create(
+            member=self.user, workout=self.workout, comment='Superb!')
+        versions.append(self.get_version())
+        user2.first_name = 'Renamed'
+        user2.save()
+        versions.append(self.get_version())
+
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_stale_etag_gets_new_list(self):
+        """Tests a client holding an old version receives the new list"""
+        res = self.client.get(GROUP_WORKOUT_URL, {'group_id': self.group.id})
+        etag = res['ETag']
+
+        GroupWorkout.objects.create(
+            group=self.group,
+            name='Second Workout',
+            description='Upper body workout',
+            link='http://test.co.uk',
+        )
+        res = self.client.get(GROUP_WORKOUT_URL, {'group_id': self.group.id},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 2)
+
+    def test_etag_varies_with_query(self):
+        """Tests each page of the evidence log has its own ETag"""
+        first = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+            'group_id': self.group.id})
+        second = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+            'group_id': self.group.id, 'page_size': 1})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_unknown_group_has_no_etag(self):
+        """Tests lists of missing groups are returned without an ETag"""
+        res = self.client.get(GROUP_MEMBERS_URL, {'group_id': 9999},
+                              HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
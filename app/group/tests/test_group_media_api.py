@@ -0,0 +1,154 @@
+"""
+Tests for authorised delivery of evidence media
+"""
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Group, GroupMembership,
+                         GroupWorkout, GroupWorkoutEvidence)
+
+EVIDENCE_NAME = 'uploads/workout_evidence/media-test.jpg'
+THUMBNAIL_NAME = 'uploads/workout_evidence/media-test_thumb.jpg'
+UPLOAD_EVIDENCE_URL = reverse('group:workout-uploadEvidence',
+                              kwargs={'pk': None})
+
+
+def media_url(path):
+    """URL the media file is served from"""
+    return reverse('media', kwargs={'path': path})
+
+
+class PublicEvidenceMediaTests(TestCase):
+    """Tests unauthenticated media requests"""
+
+    def test_auth_required(self):
+        """Tests media is not served without authentication"""
+        res = APIClient().get(media_url(EVIDENCE_NAME))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateEvidenceMediaTests(TestCase):
+    """Tests authenticated media requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.outsider = get_user_model().objects.create_user(
+            email='outsider@example.com',
+            password='testPass111',
+        )
+        self.client.force_authenticate(self.user)
+
+        group = Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=3,
+            created_by=self.user,
+        )
+        GroupMembership.objects.create(
+            member=self.user, group=group, member_role='Admin')
+        workout = GroupWorkout.objects.create(
+            group=group,
+            name='Test Workout',
+            description='Full body workout',
+            link='http://test.co.uk',
+        )
+        GroupWorkoutEvidence.objects.create(
+            member=self.user,
+            workout=workout,
+            evidence_image=EVIDENCE_NAME,
+            evidence_thumbnail=THUMBNAIL_NAME,
+            comment='Superb!',
+        )
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_member_redirected_to_nginx(self):
+        """Tests the transfer is handed to nginx in a single query"""
+        with self.assertNumQueries(1):
+            res = self.client.get(media_url(EVIDENCE_NAME))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Accel-Redirect'],
+                         f'/protected-media/{EVIDENCE_NAME}')
+        self.assertNotIn('Content-Type', res)
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_member_derivative_redirected(self):
+        """Tests derivatives are authorised through their evidence"""
+        res = self.client.get(media_url(THUMBNAIL_NAME))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Accel-Redirect'],
+                         f'/protected-media/{THUMBNAIL_NAME}')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_non_member_not_found(self):
+        """Tests evidence of other groups is not disclosed"""
+        self.client.force_authenticate(self.outsider)
+
+        res = self.client.get(media_url(EVIDENCE_NAME))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('X-Accel-Redirect', res)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_posted_path_not_authorised(self):
+        """Tests evidence cannot claim the file of another group by name"""
+        group = Group.objects.create(
+            group_name='Other Group',
+            target_workout_number_per_week=3,
+            created_by=self.outsider,
+        )
+        GroupMembership.objects.create(
+            member=self.outsider, group=group, member_role='Admin')
+        workout = GroupWorkout.objects.create(
+            group=group,
+            name='Other Workout',
+            description='Full body workout',
+            link='http://test.co.uk',
+        )
+        self.client.force_authenticate(self.outsider)
+
+        res = self.client.post(UPLOAD_EVIDENCE_URL, {
+            'workout_id': workout.id,
+            'evidence_image': EVIDENCE_NAME,
+            'comment': 'Mine now',
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GroupWorkoutEvidence.objects.filter(
+            workout=workout).exists())
+        res = self.client.get(media_url(EVIDENCE_NAME))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_path_traversal_not_found(self):
+        """Tests paths outside the media root are refused"""
+        res = self.client.get(
+            media_url(f'uploads/../../{EVIDENCE_NAME}'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=False)
+    def test_member_served_by_django(self):
+        """Tests the file is streamed by Django without nginx"""
+        name = default_storage.save(EVIDENCE_NAME, ContentFile(b'evidence'))
+        GroupWorkoutEvidence.objects.update(evidence_image=name)
+        try:
+            res = self.client.get(media_url(name))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(res.streaming_content), b'evidence')
+            self.assertNotIn('X-Accel-Redirect', res)
+        finally:
+            default_storage.delete(name)
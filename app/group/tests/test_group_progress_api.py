@@ -0,0 +1,139 @@
+"""
+Tests for the Group weekly progress API
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Group, GroupMembership,
+                         GroupWorkout, GroupWorkoutEvidence)
+from group.progress import week_start
+
+GROUP_PROGRESS_URL = reverse('group:group-progress')
+
+
+def create_evidence(user, workout, submission_date):
+    """Create workout evidence submitted on the given date"""
+    evidence = GroupWorkoutEvidence.objects.create(
+        member=user,
+        workout=workout,
+        comment='Superb!',
+    )
+    GroupWorkoutEvidence.objects.filter(id=evidence.id).update(
+        submission_date=submission_date)
+    return evidence
+
+
+class PrivateGroupProgressAPITests(TestCase):
+    """Tests the authenticated user requests in Group progress API"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='testUser@example.com',
+            password='testPass123',
+        )
+        self.user2 = get_user_model().objects.create_user(
+            email='testUser2@example.com',
+            password='testPass111',
+        )
+        self.client.force_authenticate(self.user)
+
+        self.group = Group.objects.create(
+            group_name='Test Group',
+            target_workout_number_per_week=2,
+            created_by=self.user,
+        )
+        GroupMembership.objects.create(
+            member=self.user, group=self.group, member_role='Admin')
+        GroupMembership.objects.create(
+            member=self.user2, group=self.group, member_role='Member')
+        self.workout = GroupWorkout.objects.create(
+            group=self.group,
+            name='Test Workout',
+            description='Full body workout',
+            link='http://test.co.uk',
+        )
+        self.this_week = week_start(timezone.localdate())
+        self.last_week = self.this_week - datetime.timedelta(weeks=1)
+
+    def test_progress_for_current_week(self):
+        """Tests evidence is counted per member against the target"""
+        create_evidence(self.user, self.workout, self.this_week)
+        create_evidence(self.user, self.workout, self.this_week)
+        create_evidence(self.user2, self.workout, self.this_week)
+        create_evidence(self.user2, self.workout, self.last_week)
+
+        res = self.client.get(GROUP_PROGRESS_URL, {'group_id': self.group.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['target_workout_number_per_week'], 2)
+        self.assertEqual(res.data['weeks'], [self.this_week.isoformat()])
+        progress = {member['member']['id']: member['weeks']
+                    for member in res.data['members']}
+        self.assertEqual(progress[self.user.id][0]['evidence_count'], 2)
+        self.assertTrue(progress[self.user.id][0]['target_met'])
+        self.assertEqual(progress[self.user2.id][0]['evidence_count'], 1)
+        self.assertFalse(progress[self.user2.id][0]['target_met'])
+
+    def test_progress_for_previous_weeks(self):
+        """Tests the last N weeks are reported newest first"""
+        create_evidence(self.user2, self.workout, self.last_week)
+
+        res = self.client.get(GROUP_PROGRESS_URL, {
+            'group_id': self.group.id, 'weeks': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['weeks'], [self.this_week.isoformat(),
+                                             self.last_week.isoformat()])
+        progress = {member['member']['id']: member['weeks']
+                    for member in res.data['members']}
+        self.assertEqual(
+            [week['evidence_count'] for week in progress[self.user2.id]],
+            [0, 1])
+
+    def test_progress_cached_until_evidence_changes(self):
+        """Tests progress is served from cache and refreshed on upload"""
+        self.client.get(GROUP_PROGRESS_URL, {'group_id': self.group.id})
+
+        with self.assertNumQueries(1):
+            self.client.get(GROUP_PROGRESS_URL, {'group_id': self.group.id})
+
+        evidence = create_evidence(self.user, self.workout, self.this_week)
+        res = self.client.get(GROUP_PROGRESS_URL, {'group_id': self.group.id})
+        progress = {member['member']['id']: member['weeks']
+                    for member in res.data['members']}
+        self.assertEqual(progress[self.user.id][0]['evidence_count'], 1)
+
+        evidence.delete()
+        res = self.client.get(GROUP_PROGRESS_URL, {'group_id': self.group.id})
+        progress = {member['member']['id']: member['weeks']
+                    for member in res.data['members']}
+        self.assertEqual(progress[self.user.id][0]['evidence_count'], 0)
+
+    def test_progress_invalid_weeks(self):
+        """Tests the number of weeks is bounded"""
+        res = self.client.get(GROUP_PROGRESS_URL, {
+            'group_id': self.group.id, 'weeks': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_progress_missing_group(self):
+        """Tests progress is not returned for an unknown group"""
+        res = self.client.get(GROUP_PROGRESS_URL, {'group_id': 9999})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_progress_invalid_group_id(self):
+        """Tests a non-numeric group id is rejected"""
+        res = self.client.get(GROUP_PROGRESS_URL, {'group_id': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,23 +2,33 @@
 Tests for the Group API
 """
 
+import os
 import tempfile
+from datetime import date
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import (Group, GroupMembership,
+from core.models import (EvidenceBlob, Group, GroupMembership, GroupStats,
                          GroupWorkout, GroupWorkoutEvidence)
+from group.pagination import EvidencePagination
 from group.serializers import (GroupWorkoutSerializer,
                                GroupWorkoutEvidenceSerializer)
 
 GROUP_WORKOUT_URL = reverse('group:workout-workout', kwargs={'pk': None})
 GROUP_ADD_WORKOUT_URL = reverse(
     'group:workout-addWorkout', kwargs={'pk': None})
+GROUP_IMPORT_WORKOUTS_URL = reverse(
+    'group:workout-importWorkouts', kwargs={'pk': None})
 GROUP_DELETE_WORKOUT_URL = reverse(
     'group:workout-deleteWorkout', kwargs={'pk': None})
 GROUP_DELETE_WORKOUT_EVIDENCE_URL = reverse(
@@ -148,6 +158,130 @@ class PrivateGroupWorkoutAPITests(TestCase):
         self.assertEqual(res.data['description'], params['description'])
         self.assertEqual(res.data['link'], params['link'])
 
+    def test_import_workouts_json(self):
+        """Tests importing a programme of workouts from JSON"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        workouts = [
+            {'name': f'Week {week} workout',
+             'description': 'Full body workout',
+             'link': f'http://test.co.uk/week/{week}'}
+            for week in range(1, 13)
+        ]
+
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': group.id, 'workouts': workouts}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 12)
+        self.assertEqual(len(res.data['ids']), 12)
+        self.assertEqual(
+            list(GroupWorkout.objects.filter(group=group).order_by(
+                'id').values_list('name', flat=True)),
+            [workout['name'] for workout in workouts])
+        self.assertEqual(GroupStats.objects.get(group=group).workout_count,
+                         12)
+
+    def test_import_workouts_csv(self):
+        """Tests importing a programme of workouts from a CSV upload"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        csv_file = SimpleUploadedFile(
+            'programme.csv',
+            b'name,description,link\n'
+            b'Squats,"Legs, glutes",http://test.co.uk/squats\n'
+            b'Press ups,Chest,http://test.co.uk/press-ups\n',
+            content_type='text/csv')
+
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': group.id, 'file': csv_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        workout = GroupWorkout.objects.get(group=group, name='Squats')
+        self.assertEqual(workout.description, 'Legs, glutes')
+        self.assertEqual(workout.link, 'http://test.co.uk/squats')
+
+    def test_import_workouts_invalid_rows_rolled_back(self):
+        """Tests no workouts are imported when any row is invalid"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        workouts = [
+            {'name': 'Squats', 'description': 'Legs',
+             'link': 'http://test.co.uk/squats'},
+            {'name': 'Press ups', 'description': 'Chest',
+             'link': 'not a url'},
+            {'name': '', 'description': 'Back',
+             'link': 'http://test.co.uk/rows'},
+        ]
+
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': group.id, 'workouts': workouts}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['row'] for error in res.data['errors']],
+                         [2, 3])
+        self.assertFalse(GroupWorkout.objects.filter(group=group).exists())
+
+    def test_import_workouts_csv_not_utf8(self):
+        """Tests an undecodable CSV file is reported as a row error"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        csv_file = SimpleUploadedFile(
+            'programme.csv', b'\xff\xfename,description,link\n',
+            content_type='text/csv')
+
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': group.id, 'file': csv_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['row'] for error in res.data['errors']], [1])
+        self.assertFalse(GroupWorkout.objects.filter(group=group).exists())
+
+    def test_import_workouts_csv_malformed(self):
+        """Tests a malformed CSV file is reported as a row error"""
+        group = create_group(self.user)
+        create_group_membership(self.user, group, 'Admin')
+        csv_file = SimpleUploadedFile(
+            'programme.csv',
+            b'name,description,link\nSquats,' + b'x' * 200000 + b',l\n',
+            content_type='text/csv')
+
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': group.id, 'file': csv_file}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('not valid CSV', res.data['errors'][0]['errors'][0])
+        self.assertFalse(GroupWorkout.objects.filter(group=group).exists())
+
+    def test_import_workouts_missing_group(self):
+        """Tests workouts are not imported for an unknown group"""
+        res = self.client.post(GROUP_IMPORT_WORKOUTS_URL, {
+            'group_id': 9999, 'workouts': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_group_id_rejected(self):
+        """Tests a non-numeric group id is rejected by every action"""
+        requests = [
+            (self.client.post, GROUP_IMPORT_WORKOUTS_URL,
+             {'group_id': 'abc', 'workouts': []}),
+            (self.client.post, GROUP_ADD_WORKOUT_URL,
+             {'group_id': 'abc', 'name': 'Test Workout'}),
+            (self.client.get, GROUP_WORKOUT_URL, {'group_id': 'abc'}),
+            (self.client.get, GROUP_WORKOUT_EVIDENCE_LOG_FOR_MEMBER_URL,
+             {'group_id': 'abc', 'member_id': self.user.id}),
+            (self.client.get, GROUP_WORKOUT_EVIDENCE_LOG_URL,
+             {'group_id': 'abc'}),
+        ]
+
+        for send, url, params in requests:
+            with self.subTest(url=url):
+                res = send(url, params)
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
     def test_get_workout_for_group(self):
         """Tests retrieving workouts for a group"""
         params = {
@@ -165,6 +299,27 @@ class PrivateGroupWorkoutAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_get_workout_cached_until_workouts_change(self):
+        """Tests the workout list is cached and refreshed on changes"""
+        workout = create_workout(self.user)
+        self.client.get(GROUP_WORKOUT_URL, {'group_id': workout.group.id})
+
+        # Only the version lookup for the ETag reaches the database
+        with self.assertNumQueries(1):
+            self.client.get(GROUP_WORKOUT_URL, {'group_id': workout.group.id})
+
+        GroupWorkout.objects.create(
+            group=workout.group,
+            name='Second Workout',
+            description='Upper body workout',
+            link='http://test.co.uk',
+        )
+        res = self.client.get(GROUP_WORKOUT_URL, {
+            'group_id': workout.group.id})
+
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Test Workout', 'Second Workout'])
+
     def test_delete_workout_for_group(self):
         """Tests that a group workout can be deleted successfully"""
         params = {
@@ -246,12 +401,13 @@ class PrivateGroupWorkoutAPITests(TestCase):
                               'member_id': self.user.id,
                               'group_id': group.id})
         workout_evidence = GroupWorkoutEvidence.objects.filter(
-            member=self.user, workout_id__in=[workout1.id, workout2.id])
+            member=self.user, workout_id__in=[workout1.id, workout2.id]
+        ).order_by('-submission_date', '-id')
 
         serializer = GroupWorkoutEvidenceSerializer(
             workout_evidence, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_all_workout_evidence_for_group(self):
         """Tests retrieving workouts evidence for group"""
@@ -295,12 +451,84 @@ class PrivateGroupWorkoutAPITests(TestCase):
         res = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
                               'group_id': group.id})
         workout_evidence = GroupWorkoutEvidence.objects.filter(
-            workout_id__in=[workout1.id, workout2.id])
+            workout_id__in=[workout1.id, workout2.id]
+        ).order_by('-submission_date', '-id')
 
         serializer = GroupWorkoutEvidenceSerializer(
             workout_evidence, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_group_evidence_log_paginated(self):
+        """Tests the group evidence log is paged newest first"""
+        workout = create_workout(self.user)
+        evidence_ids = []
+        for day in range(1, 6):
+            evidence = create_workout_evidence(self.user, workout)
+            GroupWorkoutEvidence.objects.filter(id=evidence.id).update(
+                submission_date=date(2024, 7, day % 3 + 1))
+            evidence_ids.append(evidence.id)
+
+        res = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+                              'group_id': workout.group.id,
+                              'page_size': 2})
+        returned_ids = [evidence['id'] for evidence in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            returned_ids.extend(
+                evidence['id'] for evidence in res.data['results'])
+
+        expected_ids = list(GroupWorkoutEvidence.objects.order_by(
+            '-submission_date', '-id').values_list('id', flat=True))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(returned_ids, expected_ids)
+        self.assertCountEqual(returned_ids, evidence_ids)
+
+    def test_group_evidence_log_date_window(self):
+        """Tests the evidence log is limited to the since/until window"""
+        workout = create_workout(self.user)
+        for day in (1, 8, 15):
+            evidence = create_workout_evidence(self.user, workout)
+            GroupWorkoutEvidence.objects.filter(id=evidence.id).update(
+                submission_date=date(2024, 7, day))
+
+        res = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+                              'group_id': workout.group.id,
+                              'since': '2024-07-02',
+                              'until': '2024-07-14'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['submission_date'],
+                         '2024-07-08')
+
+    def test_group_evidence_log_invalid_date(self):
+        """Tests an invalid date window is rejected"""
+        workout = create_workout(self.user)
+
+        res = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+                              'group_id': workout.group.id,
+                              'since': '2024-13-45'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_group_evidence_log_page_size_capped(self):
+        """Tests clients cannot request pages above the size cap"""
+        workout = create_workout(self.user)
+        GroupWorkoutEvidence.objects.bulk_create([
+            GroupWorkoutEvidence(member=self.user, workout=workout,
+                                 comment='Superb!')
+            for _ in range(EvidencePagination.max_page_size + 1)
+        ])
+
+        res = self.client.get(GROUP_WORKOUT_EVIDENCE_LOG_URL, {
+                              'group_id': workout.group.id,
+                              'page_size': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']),
+                         EvidencePagination.max_page_size)
+        self.assertIsNotNone(res.data['next'])
 
 
 class UploadEvidenceTests(TestCase):
@@ -355,6 +583,200 @@ class UploadEvidenceTests(TestCase):
         # self.assertTrue(os.path.exists(
         #     self.workout_evidence.evidence_image.path))
 
+    def upload_evidence(self, evidence_file):
+        """Posts the file as evidence for the test workout"""
+        payload = {
+            'evidence_image': evidence_file,
+            'workout_id': self.workout_evidence.workout.id,
+            'comment': 'Excellent Workout'
+        }
+        return self.client.post(
+            GROUP_WORKOUT_UPLOAD_EVIDENCE_URL, payload, format='multipart')
+
+    def stored_evidence_files(self):
+        """Names of the evidence files currently in media storage"""
+        directory = default_storage.path('uploads/workout_evidence')
+        if not os.path.isdir(directory):
+            return set()
+        return set(os.listdir(directory))
+
+    def test_evidence_upload_streamed_to_media_storage(self):
+        """Tests the upload is written once to its final location"""
+        image_bytes = BytesIO()
+        Image.new('RGB', (10, 20)).save(image_bytes, format='JPEG')
+        evidence_file = SimpleUploadedFile(
+            'evidence.jpg', image_bytes.getvalue(), content_type='image/jpeg')
+
+        res = self.upload_evidence(evidence_file)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        uploaded = GroupWorkoutEvidence.objects.get(id=res.data['id'])
+        try:
+            self.assertTrue(uploaded.evidence_image.name.startswith(
+                'uploads/workout_evidence/'))
+            with open(uploaded.evidence_image.path, 'rb') as stored:
+                self.assertEqual(stored.read(), image_bytes.getvalue())
+        finally:
+            uploaded.evidence_image.delete()
+
+    @override_settings(EVIDENCE_MAX_UPLOAD_SIZE=2000)
+    def test_evidence_upload_too_large_aborted(self):
+        """Tests an upload is aborted once it passes the size limit"""
+        image_bytes = BytesIO()
+        Image.effect_noise((100, 100), 64).convert('RGB').save(
+            image_bytes, format='JPEG')
+        evidence_file = SimpleUploadedFile(
+            'evidence.jpg', image_bytes.getvalue(), content_type='image/jpeg')
+        stored_before = self.stored_evidence_files()
+
+        res = self.upload_evidence(evidence_file)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(self.stored_evidence_files(), stored_before)
+        self.assertEqual(GroupWorkoutEvidence.objects.count(), 1)
+
+    @override_settings(EVIDENCE_MAX_UPLOAD_SIZE=100)
+    def test_evidence_upload_content_length_rejected(self):
+        """Tests an upload is rejected from its declared length"""
+        image_bytes = BytesIO()
+        Image.effect_noise((400, 400), 64).convert('RGB').save(
+            image_bytes, format='JPEG')
+        evidence_file = SimpleUploadedFile(
+            'evidence.jpg', image_bytes.getvalue(), content_type='image/jpeg')
+
+        res = self.upload_evidence(evidence_file)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    @override_settings(EVIDENCE_MAX_IMAGE_DIMENSION=100)
+    def test_evidence_upload_dimensions_too_large(self):
+        """Tests images above the dimension limit are rejected"""
+        image_bytes = BytesIO()
+        Image.new('RGB', (200, 50)).save(image_bytes, format='PNG')
+        evidence_file = SimpleUploadedFile(
+            'evidence.png', image_bytes.getvalue(), content_type='image/png')
+        stored_before = self.stored_evidence_files()
+
+        res = self.upload_evidence(evidence_file)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(self.stored_evidence_files(), stored_before)
+
+    def test_evidence_upload_invalid_image(self):
+        """Tests files that are not images are rejected"""
+        evidence_file = SimpleUploadedFile(
+            'evidence.jpg', b'not an image', content_type='image/jpeg')
+        stored_before = self.stored_evidence_files()
+
+        res = self.upload_evidence(evidence_file)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.stored_evidence_files(), stored_before)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_evidence_upload_generates_derivatives(self):
+        """Tests thumbnails are generated after the upload commits"""
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as evidence_file:
+            evidence = Image.new('RGB', (2000, 1500))
+            evidence.save(evidence_file, format='JPEG')
+            evidence_file.seek(0)
+            payload = {
+                'evidence_image': evidence_file,
+                'workout_id': self.workout_evidence.workout.id,
+                'comment': 'Excellent Workout'
+            }
+
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    GROUP_WORKOUT_UPLOAD_EVIDENCE_URL,
+                    payload,  format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        uploaded = GroupWorkoutEvidence.objects.get(id=res.data['id'])
+        try:
+            self.assertTrue(uploaded.evidence_thumbnail)
+            self.assertTrue(uploaded.evidence_medium)
+            with Image.open(uploaded.evidence_thumbnail.path) as thumbnail:
+                self.assertEqual(thumbnail.size, (320, 240))
+            with Image.open(uploaded.evidence_medium.path) as medium:
+                self.assertEqual(medium.size, (1080, 810))
+        finally:
+            uploaded.evidence_image.delete()
+            uploaded.evidence_thumbnail.delete()
+            uploaded.evidence_medium.delete()
+
+    def test_identical_evidence_stored_once(self):
+        """Tests re-uploaded images share one reference counted file"""
+        image_bytes = BytesIO()
+        Image.effect_noise((30, 30), 64).convert('RGB').save(
+            image_bytes, format='JPEG')
+        uploads = [self.upload_evidence(SimpleUploadedFile(
+            name, image_bytes.getvalue(), content_type='image/jpeg'))
+            for name in ('first.jpg', 'second.JPG')]
+
+        first, second = [GroupWorkoutEvidence.objects.get(id=res.data['id'])
+                         for res in uploads]
+        blob = EvidenceBlob.objects.get(id=first.blob_id)
+        try:
+            self.assertEqual(second.blob_id, blob.id)
+            self.assertEqual(blob.ref_count, 2)
+            self.assertEqual(first.evidence_image.name, blob.name)
+            self.assertEqual(second.evidence_image.name, blob.name)
+            self.assertIn(blob.sha256, blob.name)
+            self.assertTrue(default_storage.exists(blob.name))
+        finally:
+            default_storage.delete(blob.name)
+
+    def test_evidence_delete_releases_blob(self):
+        """Tests a blob and its file go once no evidence references it"""
+        image_bytes = BytesIO()
+        Image.effect_noise((30, 30), 64).convert('RGB').save(
+            image_bytes, format='JPEG')
+        ids = [self.upload_evidence(SimpleUploadedFile(
+            'evidence.jpg', image_bytes.getvalue(),
+            content_type='image/jpeg')).data['id'] for _ in range(2)]
+        blob = GroupWorkoutEvidence.objects.get(id=ids[0]).blob
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupWorkoutEvidence.objects.get(id=ids[0]).delete()
+
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(default_storage.exists(blob.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(GROUP_DELETE_WORKOUT_EVIDENCE_URL,
+                                     {'workout_evidence_id': ids[1]})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(EvidenceBlob.objects.filter(id=blob.id).exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_group_delete_releases_blobs(self):
+        """Tests deleting a group releases the blobs of all its evidence"""
+        image_bytes = BytesIO()
+        Image.effect_noise((30, 30), 64).convert('RGB').save(
+            image_bytes, format='JPEG')
+        ids = [self.upload_evidence(SimpleUploadedFile(
+            'evidence.jpg', image_bytes.getvalue(),
+            content_type='image/jpeg')).data['id'] for _ in range(2)]
+        blob = GroupWorkoutEvidence.objects.get(id=ids[0]).blob
+        group = self.workout_evidence.workout.group
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(reverse(
+                'group:group-deleteGroup', kwargs={'pk': group.id}))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(GroupWorkoutEvidence.objects.exists())
+        self.assertFalse(EvidenceBlob.objects.filter(id=blob.id).exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
     # def test_evidence_upload_invalid_request(self):
     #     """Tests invalid evidence upload is handled"""
 
@@ -0,0 +1,177 @@
+"""
+Streaming upload handling for workout evidence images
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             StopFutureHandlers)
+from django.db import transaction
+from PIL import Image
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.models import EvidenceBlob, workout_evidence_image_file_path
+
+# Bytes of image data read while looking for the image header
+HEADER_PROBE_SIZE = 256 * 2 ** 10
+# Allowance for multipart boundaries and the other form fields
+MULTIPART_OVERHEAD = 64 * 2 ** 10
+
+
+class EvidenceTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Evidence image is too large.'
+    default_code = 'evidence_too_large'
+
+
+class InvalidEvidenceImage(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = 'Evidence must be a valid image.'
+    default_code = 'invalid_evidence_image'
+
+
+class StreamedEvidenceFile(UploadedFile):
+    """Evidence image already written to its place in media storage"""
+
+    def __init__(self, storage_name, size, content_type, sha256,
+                 dimensions):
+        super().__init__(name=os.path.basename(storage_name),
+                         content_type=content_type, size=size)
+        self.storage_name = storage_name
+        self.sha256 = sha256
+        self.dimensions = dimensions
+
+    def discard(self):
+        """Removes the stored file when it will not be referenced"""
+        default_storage.delete(self.storage_name)
+
+
+def store_evidence_blob(upload):
+    """Files the streamed upload under its content hash
+
+    Identical images share one blob, so when the content is already stored
+    the upload is discarded and only a reference is added.
+    """
+    extension = os.path.splitext(upload.storage_name)[1].lower()
+    with transaction.atomic():
+        blob, created = EvidenceBlob.objects.acquire(
+            upload.sha256, upload.size, extension)
+        if created:
+            path = default_storage.path(blob.name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(default_storage.path(upload.storage_name), path)
+        else:
+            upload.discard()
+
+    return blob
+
+
+class EvidenceUploadHandler(FileUploadHandler):
+    """Streams the evidence image straight to its final media location
+
+    The content hash and image dimensions are taken from the chunks as
+    they arrive, and the upload is aborted as soon as a limit is broken,
+    so nothing is buffered in memory or copied through a temporary file.
+    """
+    field_name = 'evidence_image'
+    chunk_size = 64 * 2 ** 10
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.destination = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > (settings.EVIDENCE_MAX_UPLOAD_SIZE
+                             + MULTIPART_OVERHEAD):
+            raise EvidenceTooLarge()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.field_name or self.destination:
+            return
+
+        self.storage_name = workout_evidence_image_file_path(
+            None, self.file_name)
+        path = default_storage.path(self.storage_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.destination = open(path, 'xb')
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(path, settings.FILE_UPLOAD_PERMISSIONS)
+
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.header = BytesIO()
+        self.dimensions = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.is_streaming():
+            return raw_data
+
+        self.size += len(raw_data)
+        if self.size > settings.EVIDENCE_MAX_UPLOAD_SIZE:
+            self.abort(EvidenceTooLarge())
+        if self.dimensions is None:
+            self.read_dimensions(raw_data)
+
+        self.sha256.update(raw_data)
+        self.destination.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.is_streaming():
+            return None
+        if self.dimensions is None:
+            self.abort(InvalidEvidenceImage())
+
+        self.destination.close()
+        return StreamedEvidenceFile(
+            storage_name=self.storage_name,
+            size=self.size,
+            content_type=self.content_type,
+            sha256=self.sha256.hexdigest(),
+            dimensions=self.dimensions,
+        )
+
+    def upload_interrupted(self):
+        if self.is_streaming():
+            self.discard()
+
+    def read_dimensions(self, raw_data):
+        """Reads the image size from the header once enough has arrived"""
+        self.header.write(raw_data)
+        try:
+            # Image.open only parses the header, no pixels are decoded
+            with Image.open(BytesIO(self.header.getvalue())) as image:
+                self.dimensions = image.size
+        except Image.DecompressionBombError:
+            self.abort(EvidenceTooLarge(
+                'Evidence image dimensions are too large.'))
+        except (OSError, SyntaxError, ValueError, EOFError):
+            if self.size > HEADER_PROBE_SIZE:
+                self.abort(InvalidEvidenceImage())
+            return
+
+        self.header = None
+        width, height = self.dimensions
+        if (max(width, height) > settings.EVIDENCE_MAX_IMAGE_DIMENSION
+                or width * height > settings.EVIDENCE_MAX_IMAGE_PIXELS):
+            self.abort(EvidenceTooLarge(
+                'Evidence image dimensions are too large.'))
+
+    def is_streaming(self):
+        return self.destination is not None and not self.destination.closed
+
+    def abort(self, exc):
+        self.discard()
+        raise exc
+
+    def discard(self):
+        self.destination.close()
+        default_storage.delete(self.storage_name)
@@ -1,19 +1,60 @@
 """
 Views for the Group APIs
 """
+import posixpath
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import Http404
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponse
+from django.utils.dateparse import parse_date
+from django.views.static import serve
 from rest_framework.decorators import action
 from rest_framework import viewsets, status, mixins
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (GroupMembership,
                          Group,
+                         GroupStats,
                          GroupWorkout,
                          GroupWorkoutEvidence)
+from core.cache import ResponseCache
+from core.etags import conditional_response
+from core.images import generate_evidence_derivatives
+from core.signals import deleting_group, group_rows_bulk_created
+from core.tasks import submit_on_commit
+from friends.timeline import publish_evidence
 from group import serializers
+from member.authentication import SignedTokenAuthentication
+from group.importers import import_workouts, iter_csv_rows
+from group.pagination import EvidencePagination, GroupPagination
+from group.progress import get_weekly_progress
+from group.uploads import (EvidenceUploadHandler, StreamedEvidenceFile,
+                           store_evidence_blob)
+
+members_cache = ResponseCache('group-members')
+workouts_cache = ResponseCache('group-workouts')
+
+
+def parse_id(value):
+    """Integer id from a request parameter, None if it is not one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_group_version(value, lookup='id'):
+    """Version of the group matching the lookup, None if there is none"""
+    try:
+        return Group.objects.filter(**{lookup: value}).values_list(
+            'version', flat=True).first()
+    except (TypeError, ValueError):
+        return None
 
 
 class GroupViewSet(mixins.CreateModelMixin,
@@ -25,34 +66,42 @@ class GroupViewSet(mixins.CreateModelMixin,
 
     serializer_class = serializers.GroupMembershipSerializer
     queryset = GroupMembership.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    MAX_PROGRESS_WEEKS = 12
+    MAX_BULK_MEMBERS = 1000
+    MEMBER_ROLES = ('Admin', 'Member')
 
     def get_queryset(self):
         """Get groups for authenticated user"""
 
-        return self.queryset.filter(member=self.request.user)
+        return self.get_serializer_class().setup_eager_loading(
+            self.queryset.filter(member=self.request.user))
 
     @action(detail=False, methods=['GET'])
     def getGroups(self, request):
         """Custom action for getting groups for user"""
 
-        group_ids = list(self.get_queryset().values_list('group'))
-        group_ids = list(map(lambda x: x[0], group_ids))
+        groups = self.get_serializer_class().setup_eager_loading(
+            Group.objects.filter(groupmembership__member=self.request.user))
 
-        groups = Group.objects.filter(id__in=group_ids)
-        serializer = self.get_serializer(groups, many=True)
+        paginator = GroupPagination()
+        page = paginator.paginate_queryset(groups, request, view=self)
+        serializer = self.get_serializer(page, many=True)
 
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['DELETE'])
     def deleteGroup(self, request, *args, **kwargs):
         """deletes the group"""
 
-        group_id = kwargs.get('pk')
+        group_id = parse_id(kwargs.get('pk'))
         try:
             group = Group.objects.filter(id=group_id).first()
-            self.perform_destroy(group)
+            if group is None:
+                raise Http404
+            with transaction.atomic(), deleting_group(group):
+                self.perform_destroy(group)
             return Response({'message': 'Group deleted successfully'},
                             status=status.HTTP_204_NO_CONTENT)
         except (Http404):
@@ -63,19 +112,77 @@ class GroupViewSet(mixins.CreateModelMixin,
     def members(self, request):
         """Custom action for getting list of members for a given group"""
 
-        group_id = self.request.query_params.get('group_id')
-        serializer = self.get_serializer(
-            self.queryset.filter(group_id=group_id), many=True)
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        def list_members():
+            members = self.get_serializer_class().setup_eager_loading(
+                self.queryset.filter(group_id=group_id))
+            return self.get_serializer(members, many=True).data
+
+        version = get_group_version(group_id)
+        return conditional_response(
+            request, 'group-members', version,
+            lambda: Response(members_cache.get_or_set(
+                group_id, version, list_members)))
+
+    @action(detail=False, methods=['GET'])
+    def stats(self, request):
+        """Custom action for getting the statistics of a given group"""
+
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        group_stats = GroupStats.objects.filter(group_id=group_id).first()
+        if not group_stats:
+            rebuilt = GroupStats.objects.rebuild([group_id])
+            if not rebuilt:
+                return Response({'message': 'Group not found'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            group_stats = rebuilt[0]
+
+        serializer = self.get_serializer(group_stats)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['GET'])
+    def progress(self, request):
+        """Custom action for getting weekly progress against the target"""
+
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            weeks = int(self.request.query_params.get('weeks', 1))
+        except ValueError:
+            weeks = 0
+        if not 1 <= weeks <= self.MAX_PROGRESS_WEEKS:
+            return Response(
+                {'message': 'weeks must be between 1 and '
+                            f'{self.MAX_PROGRESS_WEEKS}'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        group = Group.objects.filter(id=group_id).first()
+        if not group:
+            return Response({'message': 'Group not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(get_weekly_progress(group, weeks))
+
     @action(detail=False, methods=['GET'])
     def getGroupmember(self, request):
         """Custom action for getting list of members for a given group"""
 
-        group_id = self.request.query_params.get('group_id')
+        group_id = parse_id(self.request.query_params.get('group_id'))
         member_id = self.request.query_params.get('member_id')
-        member = self.queryset.filter(
-            group_id=group_id, member_id=member_id).first()
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        member = self.get_membership(group_id, member_id)
 
         serializer = self.get_serializer(
             member)
@@ -85,45 +192,146 @@ class GroupViewSet(mixins.CreateModelMixin,
     @action(detail=False, methods=['POST'])
     def addMember(self, request):
         """Adds the membe to the group"""
-        group_id = self.request.data.get('group')
+        group_id = parse_id(self.request.data.get('group'))
         member_id = self.request.data.get('member')
         member_role = self.request.data.get('member_role')
+        if group_id is None:
+            return Response({'message': 'Invalid group'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         member = get_user_model().objects.filter(id=member_id).first()
 
         # TODO: change member_role literals and all references to a constant
         if (member_role == 'Member'):
-            if (not self.check_admin_user_present(group_id, member)):
+            if (not self.check_admin_user_present(group_id, member_id)):
                 return Response({'message': 'Group must have an Admin member'},
                                 status=status.HTTP_403_FORBIDDEN)
 
         group = Group.objects.filter(id=group_id).first()
 
-        group_member = GroupMembership.objects.create(
-            member=member,
-            group=group,
-            member_role=member_role,
-        )
-        group_member.save()
+        try:
+            with transaction.atomic():
+                group_member = GroupMembership.objects.create(
+                    member=member,
+                    group=group,
+                    member_role=member_role,
+                )
+        except IntegrityError:
+            return Response({'message': 'Member already exists in group'},
+                            status=status.HTTP_400_BAD_REQUEST)
         serializer = self.get_serializer(group_member)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['POST'])
+    def addMembers(self, request):
+        """Adds a batch of members to the group in one transaction"""
+        group_id = parse_id(self.request.data.get('group'))
+        items = self.request.data.get('members')
+
+        if group_id is None:
+            return Response({'message': 'Invalid group'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(items, list) or not items:
+            return Response({'message': 'members must be a non-empty list'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.MAX_BULK_MEMBERS:
+            return Response(
+                {'message': 'No more than '
+                            f'{self.MAX_BULK_MEMBERS} members per request'},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        group = Group.objects.filter(id=group_id).first()
+        if not group:
+            return Response({'message': 'Group not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            try:
+                member_id = int(item.get('member'))
+            except (TypeError, ValueError):
+                member_id = None
+            results.append({'member': member_id,
+                            'member_role': item.get('member_role'),
+                            'status': None})
+
+        member_ids = {result['member'] for result in results
+                      if result['member'] is not None}
+        existing_users = set(get_user_model().objects.filter(
+            id__in=member_ids).values_list('id', flat=True))
+        existing_members = set(GroupMembership.objects.filter(
+            group_id=group.id, member_id__in=member_ids,
+        ).values_list('member_id', flat=True))
+
+        to_create = {}
+        for result in results:
+            if result['member'] is None:
+                result['status'] = 'invalid'
+            elif result['member_role'] not in self.MEMBER_ROLES:
+                result['status'] = 'invalid_role'
+            elif result['member'] not in existing_users:
+                result['status'] = 'member_not_found'
+            elif result['member'] in existing_members:
+                result['status'] = 'already_member'
+            elif result['member'] in to_create:
+                result['status'] = 'duplicate'
+            else:
+                result['status'] = 'created'
+                to_create[result['member']] = result['member_role']
+
+        if to_create and 'Admin' not in to_create.values():
+            has_admin = GroupMembership.objects.filter(
+                group_id=group.id, member_role='Admin').exists()
+            if not has_admin:
+                return Response({'message': 'Group must have an Admin member'},
+                                status=status.HTTP_403_FORBIDDEN)
+
+        created = 0
+        if to_create:
+            with transaction.atomic():
+                # Rows added concurrently are skipped, count what was added
+                added = GroupMembership.objects.filter(
+                    group_id=group.id, member_id__in=to_create)
+                already_added = set(added.values_list('member_id', flat=True))
+                GroupMembership.objects.bulk_create(
+                    [GroupMembership(group=group, member_id=member_id,
+                                     member_role=member_role)
+                     for member_id, member_role in to_create.items()
+                     if member_id not in already_added],
+                    batch_size=500,
+                    ignore_conflicts=True,
+                )
+                created = added.count() - len(already_added)
+                group_rows_bulk_created.send(
+                    sender=GroupMembership, group_id=group.id,
+                    created=created)
+            for result in results:
+                if (result['status'] == 'created'
+                        and result['member'] in already_added):
+                    result['status'] = 'already_member'
+
+        return Response(
+            {'created': created, 'results': results},
+            status=(status.HTTP_201_CREATED if created
+                    else status.HTTP_200_OK))
+
     @action(detail=True, methods=['PUT'])
     def updateMember(self, request, pk=None):
         """updates member role in given group"""
-        group_id = self.request.data.get('group')
+        group_id = parse_id(self.request.data.get('group'))
         member_id = self.request.data.get('member')
         new_member_role = self.request.data.get('new_member_role')
-
-        member = get_user_model().objects.filter(id=member_id).first()
+        if group_id is None:
+            return Response({'message': 'Invalid group'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         # TODO: change member_role literals and all references to a constant
         if (new_member_role == 'Member'):
-            if (not self.check_admin_user_present(group_id, member)):
+            if (not self.check_admin_user_present(group_id, member_id)):
                 return Response({'message': 'Group must have an Admin member'},
                                 status=status.HTTP_403_FORBIDDEN)
-        member_to_update = self.queryset.filter(group_id=group_id,
-                                                member_id=member_id).first()
+        member_to_update = self.get_membership(group_id, member_id)
         if not member_to_update:
             return Response({'message': 'Member does not exist in given group'
                              }, status=status.HTTP_400_BAD_REQUEST)
@@ -140,17 +348,17 @@ class GroupViewSet(mixins.CreateModelMixin,
     @action(detail=True, methods=['DELETE'])
     def deleteMember(self, request, pk=None):
         """updates member role in given group"""
-        group_id = self.request.data.get('group')
+        group_id = parse_id(self.request.data.get('group'))
         member_id = self.request.data.get('member')
+        if group_id is None:
+            return Response({'message': 'Invalid group'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        member = get_user_model().objects.filter(id=member_id).first()
-
-        if (not self.check_admin_user_present(group_id, member)):
+        if (not self.check_admin_user_present(group_id, member_id)):
             return Response({'message': 'Group must have an Admin member'},
                             status=status.HTTP_403_FORBIDDEN)
 
-        member_to_delete = self.queryset.filter(group_id=group_id,
-                                                member_id=member_id).first()
+        member_to_delete = self.get_membership(group_id, member_id)
         if not member_to_delete:
             return Response({'message': 'Member does not exist in given group'
                              }, status=status.HTTP_400_BAD_REQUEST)
@@ -173,22 +381,25 @@ class GroupViewSet(mixins.CreateModelMixin,
             return serializers.GroupSerializer
         elif self.action == "getGroups":
             return serializers.GroupSerializer
+        elif self.action == "stats":
+            return serializers.GroupStatsSerializer
 
         return self.serializer_class
 
-    def check_admin_user_present(self, group_id, member):
-        """Checks whether there is an admin user in the group"""
-        serializer = self.get_serializer(
-            self.queryset.filter(group_id=group_id), many=True)
-
-        if (serializer.data):
-            for membership in serializer.data:
-                if (membership['member'] != member.email
-                        and membership['member_role'] == 'Admin'):
-                    return True
-            return False
-        else:
-            return False
+    def get_membership(self, group_id, member_id):
+        """Returns the membership of a member in a group, if any"""
+        serializer_class = serializers.GroupMembershipSerializer
+        try:
+            return serializer_class.setup_eager_loading(self.queryset).get(
+                group_id=group_id, member_id=member_id)
+        except GroupMembership.DoesNotExist:
+            return None
+
+    def check_admin_user_present(self, group_id, member_id):
+        """Checks whether the group has an admin other than the member"""
+        return GroupMembership.objects.filter(
+            group_id=group_id, member_role='Admin',
+        ).exclude(member_id=member_id).exists()
 
 
 class GroupWorkoutViewSet(mixins.CreateModelMixin,
@@ -201,8 +412,9 @@ class GroupWorkoutViewSet(mixins.CreateModelMixin,
 
     serializer_class = serializers.GroupWorkoutSerializer
     queryset = GroupWorkout.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    MAX_IMPORTED_WORKOUTS = 5000
 
     def get_queryset(self):
         """Get group workouts for authenticated user"""
@@ -212,33 +424,78 @@ class GroupWorkoutViewSet(mixins.CreateModelMixin,
     @action(detail=True, methods=['GET'])
     def workout(self, request, pk=None, *args, **kwargs):
         """updates member role in given group"""
-        group_id = self.request.query_params['group_id']
-        queryset_res = self.queryset.filter(group_id=group_id)
-        serializer = self.get_serializer(queryset_res, many=True)
-
-        return Response(serializer.data)
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        def list_workouts():
+            workouts = self.get_serializer_class().setup_eager_loading(
+                self.queryset.filter(group_id=group_id))
+            return self.get_serializer(workouts, many=True).data
+
+        version = get_group_version(group_id)
+        return conditional_response(
+            request, 'group-workouts', version,
+            lambda: Response(workouts_cache.get_or_set(
+                group_id, version, list_workouts)))
 
     @action(detail=True, methods=['POST'])
     def addWorkout(self, request, pk=None, *args, **kwargs):
         """Adds the workout to the group"""
         name = self.request.data.get('name')
         description = self.request.data.get('description')
-        group_id = self.request.data.get('group_id')
+        group_id = parse_id(self.request.data.get('group_id'))
         link = self.request.data.get('link')
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         group = Group.objects.filter(id=group_id).first()
 
-        workout = GroupWorkout.objects.create(
-            name=name,
-            description=description,
-            link=link,
-            group=group,
-        )
-
-        workout.save()
+        with transaction.atomic():
+            workout = GroupWorkout.objects.create(
+                name=name,
+                description=description,
+                link=link,
+                group=group,
+            )
         serializer = self.get_serializer(workout)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=['POST'])
+    def importWorkouts(self, request, pk=None, *args, **kwargs):
+        """Adds a programme of workouts from a JSON array or CSV upload"""
+        group_id = parse_id(self.request.data.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        group = Group.objects.filter(id=group_id).first()
+        if not group:
+            return Response({'message': 'Group not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        upload = self.request.FILES.get('file')
+        if upload:
+            rows = iter_csv_rows(upload)
+        else:
+            rows = self.request.data.get('workouts')
+            if not isinstance(rows, list):
+                return Response(
+                    {'message': 'Provide a workouts list or a CSV file'},
+                    status=status.HTTP_400_BAD_REQUEST)
+
+        created_ids, errors = import_workouts(
+            group, rows, max_rows=self.MAX_IMPORTED_WORKOUTS)
+        if errors:
+            return Response({'message': 'No workouts were imported',
+                             'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'created': len(created_ids), 'ids': created_ids},
+                        status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['DELETE'])
     def deleteWorkout(self, request, pk=None):
         """deletes workout in given group"""
@@ -259,64 +516,89 @@ class GroupWorkoutViewSet(mixins.CreateModelMixin,
         member_id = self.request.query_params['member_id']
         workout_id = self.request.query_params['workout_id']
 
-        queryset_res = GroupWorkoutEvidence.objects.filter(
-            workout_id=workout_id, member_id=member_id)
-
-        serializer = self.get_serializer(queryset_res, many=True)
+        queryset_res = self.get_serializer_class().setup_eager_loading(
+            GroupWorkoutEvidence.objects.filter(
+                workout_id=workout_id, member_id=member_id).order_by(
+                *EvidencePagination.ordering))
 
-        return Response(serializer.data)
+        version = get_group_version(workout_id, lookup='groupworkout__id')
+        return conditional_response(
+            request, 'workout-evidence', version,
+            lambda: Response(
+                self.get_serializer(queryset_res, many=True).data))
 
     @action(detail=True, methods=['GET'])
     def evidenceLog(self, request, pk=None, *args, **kwargs):
 
         member_id = self.request.query_params['member_id']
-        group_id = self.request.query_params['group_id']
-
-        workout_ids = GroupWorkout.objects.filter(
-            group_id=group_id).values_list('id')
-
-        workout_ids = list(map(lambda x: x[0], workout_ids))
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         queryset_res = GroupWorkoutEvidence.objects.filter(
-            member_id=member_id, workout_id__in=workout_ids)
+            member_id=member_id, group_id=group_id)
 
-        serializer = self.get_serializer(queryset_res, many=True)
-        return Response(serializer.data)
+        return conditional_response(
+            request, 'member-evidence-log', get_group_version(group_id),
+            lambda: self.paginate_evidence(queryset_res))
 
     @action(detail=True, methods=['GET'])
     def groupEvidenceLog(self, request, pk=None, *args, **kwargs):
 
-        group_id = self.request.query_params['group_id']
-
-        workout_ids = GroupWorkout.objects.filter(
-            group_id=group_id).values_list('id')
-
-        workout_ids = list(map(lambda x: x[0], workout_ids))
+        group_id = parse_id(self.request.query_params.get('group_id'))
+        if group_id is None:
+            return Response({'message': 'Invalid group_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         queryset_res = GroupWorkoutEvidence.objects.filter(
-            workout_id__in=workout_ids)
+            group_id=group_id)
 
-        serializer = self.get_serializer(queryset_res, many=True)
-        return Response(serializer.data)
+        return conditional_response(
+            request, 'group-evidence-log', get_group_version(group_id),
+            lambda: self.paginate_evidence(queryset_res))
 
     @action(detail=True, methods=['POST'])
     def uploadEvidence(self, request, pk=None, *args, **kwargs):
         """uploads workout evidence"""
 
+        # Must be in place before request.data parses the upload
+        request.upload_handlers.insert(0, EvidenceUploadHandler(request))
+
         workout_id = self.request.data.get('workout_id')
         evidence = self.request.data.get('evidence_image')
         comment = self.request.data.get('comment')
 
-        workout = self.queryset.filter(id=workout_id).first()
-
-        workout_evidence = GroupWorkoutEvidence.objects.create(
-            member=self.request.user,
-            workout=workout,
-            evidence_image=evidence,
-            comment=comment
-        )
+        # A plain string would be stored as the name of any media file
+        if evidence is not None and not isinstance(evidence, UploadedFile):
+            return Response({'message': 'Evidence image must be a file'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        workout_evidence.save()
+        workout = self.queryset.filter(id=workout_id).first()
+        if not workout:
+            if isinstance(evidence, StreamedEvidenceFile):
+                evidence.discard()
+            return Response({'message': 'Workout not found'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            blob = None
+            if isinstance(evidence, StreamedEvidenceFile):
+                # Already in media storage, reference the shared copy
+                blob = store_evidence_blob(evidence)
+                evidence = blob.name
+
+            workout_evidence = GroupWorkoutEvidence.objects.create(
+                member=self.request.user,
+                workout=workout,
+                evidence_image=evidence,
+                blob=blob,
+                comment=comment
+            )
+            if workout_evidence.evidence_image:
+                submit_on_commit(generate_evidence_derivatives,
+                                 workout_evidence.id)
+            publish_evidence(workout_evidence, workout.group_id)
         serializer = self.get_serializer(workout_evidence)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -339,6 +621,31 @@ class GroupWorkoutViewSet(mixins.CreateModelMixin,
         return Response({'res': 'Workout Evidence successfully deleted.'},
                         status=status.HTTP_204_NO_CONTENT)
 
+    def paginate_evidence(self, queryset):
+        """Returns a page of evidence within the requested date window"""
+        window = {}
+        for param, lookup in (('since', 'submission_date__gte'),
+                              ('until', 'submission_date__lte')):
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                window[lookup] = parse_date(value)
+            except ValueError:
+                window[lookup] = None
+            if window[lookup] is None:
+                return Response({'message': f'Invalid {param} date'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_serializer_class().setup_eager_loading(
+            queryset.filter(**window))
+
+        paginator = EvidencePagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = self.get_serializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
     def get_serializer_class(self):
         """Return the serializer class  for  request"""
 
@@ -349,3 +656,39 @@ class GroupWorkoutViewSet(mixins.CreateModelMixin,
             return serializers.WorkoutEvidenceImageSerializer
 
         return self.serializer_class
+
+
+class EvidenceMediaView(APIView):
+    """Serves evidence images to members of the group they belong to"""
+
+    authentication_classes = [SignedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, path):
+        """returns the media file, transferred by nginx where available"""
+        path = posixpath.normpath(path)
+        if path.startswith(('/', '../')) or path in ('.', '..'):
+            raise Http404
+
+        # One indexed EXISTS query covering originals and derivatives
+        authorised = GroupWorkoutEvidence.objects.filter(
+            Q(evidence_image=path)
+            | Q(evidence_thumbnail=path)
+            | Q(evidence_medium=path),
+            group__groupmembership__member=request.user,
+        ).exists()
+        if not authorised:
+            raise Http404
+
+        if not settings.MEDIA_ACCEL_REDIRECT:
+            response = serve(request._request, path,
+                             document_root=settings.MEDIA_ROOT)
+        else:
+            response = HttpResponse()
+            # Let nginx set the type from the file it sends
+            del response['Content-Type']
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+        response['Cache-Control'] = 'private, max-age=3600'
+
+        return response
@@ -0,0 +1,103 @@
+"""
+Token authentication resolving tokens through the cache
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from member.tokens import (InvalidToken, signed_tokens_enabled,
+                           verify_access_token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that skips the token query when cached
+
+    The member a token resolves to is cached for AUTH_TOKEN_CACHE_TIMEOUT
+    seconds, and dropped when the token is deleted, the password changes
+    or the member is deleted. Lookups are only cached in a cache shared by
+    the worker processes, see token_cache_shared. The cached member can be
+    behind the database, so views reading or saving more than its id load
+    the member again.
+    """
+
+    def authenticate_credentials(self, key):
+        if not token_cache_shared():
+            return super().authenticate_credentials(key)
+
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            return (user, token)
+
+        return (user, Token(key=key, user=user))
+
+
+class SignedTokenAuthentication(CachedTokenAuthentication):
+    """Also accepts signed access tokens when MEMBER_TOKEN_MODE is signed
+
+    `Authorization: Bearer <access token>` is verified against SECRET_KEY
+    in-process. The member is built from the token's claims with every
+    other field deferred, so a request only reaches the database if the
+    view reads more of the member than its id and email. Views reading or
+    saving the member load it with a query of their own.
+    """
+    access_keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if (not auth or not signed_tokens_enabled()
+                or auth[0].lower() != self.access_keyword.lower().encode()):
+            return super().authenticate(request)
+
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            claims = verify_access_token(auth[1].decode())
+        except (InvalidToken, UnicodeError) as exc:
+            raise AuthenticationFailed(str(exc))
+
+        user = get_user_model().from_db(
+            DEFAULT_DB_ALIAS, ['id', 'email', 'is_staff'],
+            [claims['uid'], claims['email'], claims['staff']])
+        return (user, claims)
+
+    def authenticate_header(self, request):
+        if signed_tokens_enabled():
+            return self.access_keyword
+        return super().authenticate_header(request)
+
+
+def token_cache_shared():
+    """Whether every worker process sees the cached token lookups
+
+    A token dropped from a local memory cache would keep authenticating in
+    the other workers until it expires there.
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def token_cache_key(key):
+    # Tokens are credentials, keep them out of cache key listings
+    return f'auth-token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_token(key):
+    """Forgets a token once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(token_cache_key(key)))
+
+
+def invalidate_member_tokens(user_id):
+    """Forgets the tokens of a member once the transaction commits"""
+    for key in Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True):
+        invalidate_token(key)
@@ -0,0 +1,17 @@
+"""
+Pagination for the member APIs
+"""
+from core.pagination import KeysetPagination
+
+
+class MemberSearchPagination(KeysetPagination):
+    """Pages through search results, best matches first"""
+    ordering = ('-rank', '-id')
+    page_size = 20
+    max_page_size = 50
+
+    @staticmethod
+    def decode_value(model, name, value):
+        if name == 'rank':
+            return int(value)
+        return KeysetPagination.decode_value(model, name, value)
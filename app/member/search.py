@@ -0,0 +1,69 @@
+"""
+Ranked member search by name and email
+"""
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import (Case, CharField, FloatField, IntegerField,
+                              Lookup, Q, Value, When)
+from django.db.models.functions import Cast, Greatest, Round
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+MAX_SEARCH_LENGTH = 100
+# Ranks are scaled to integers, which survive the pagination cursor exactly
+RANK_SCALE = 10000
+
+
+@CharField.register_lookup
+class TrigramContains(Lookup):
+    """Case insensitive substring match on PostgreSQL, as ILIKE
+
+    icontains compares UPPER(column::text), an expression the trigram
+    indexes on the plain columns cannot serve, while ILIKE can.
+    """
+    lookup_name = 'trigram_icontains'
+
+    def get_db_prep_lookup(self, value, connection):
+        return ('%s', [f'%{connection.ops.prep_for_like_query(value)}%'])
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', lhs_params + rhs_params
+
+
+def search_members(queryset, term):
+    """Members matching the term, annotated with a rank to order by
+
+    PostgreSQL ranks by trigram similarity, tolerating typos, and both
+    the ILIKE and similarity filters are served by the GIN trigram
+    indexes. Other databases fall back to a contains search ranked by how
+    closely the term matches. The rank is an integer so that the cursor
+    of the next page compares equal to the row it was taken from.
+    """
+    term = (term or '').strip()[:MAX_SEARCH_LENGTH]
+    if not term:
+        return queryset.none().annotate(rank=Value(0))
+
+    if connection.vendor == 'postgresql':
+        matches = Q()
+        for field in SEARCH_FIELDS:
+            matches |= Q(**{f'{field}__trigram_icontains': term})
+            matches |= Q(**{f'{field}__trigram_similar': term})
+        rank = Greatest(*[TrigramSimilarity(field, term)
+                          for field in SEARCH_FIELDS])
+    else:
+        matches = Q()
+        for field in SEARCH_FIELDS:
+            matches |= Q(**{f'{field}__icontains': term})
+        rank = Case(
+            *[When(**{f'{field}__iexact': term}, then=Value(1.0))
+              for field in SEARCH_FIELDS],
+            *[When(**{f'{field}__istartswith': term}, then=Value(0.6))
+              for field in SEARCH_FIELDS],
+            default=Value(0.3),
+            output_field=FloatField(),
+        )
+
+    return queryset.filter(matches).annotate(rank=Cast(
+        Round(rank * Value(RANK_SCALE, output_field=FloatField())),
+        IntegerField()))
@@ -8,8 +8,12 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core.serializers import EagerLoadingMixin
+from member.authentication import invalidate_member_tokens
+from member.tokens import revoke_member_refresh_tokens
 
-class MemberSerializer(serializers.ModelSerializer):
+
+class MemberSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Serializer for the member object"""
 
     class Meta:
@@ -31,6 +35,8 @@ class MemberSerializer(serializers.ModelSerializer):
         if password:
             member.set_password(password)
             member.save()
+            invalidate_member_tokens(member.id)
+            revoke_member_refresh_tokens(member.id)
 
         return member
 
@@ -59,3 +65,8 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = member
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for exchanging or revoking a refresh token"""
+    refresh = serializers.CharField(trim_whitespace=False)
@@ -0,0 +1,13 @@
+"""
+Signal handlers keeping cached authentication in step with tokens
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from member.authentication import invalidate_token
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -0,0 +1,137 @@
+"""
+Tests for the cached token authentication
+"""
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+
+from member.authentication import CachedTokenAuthentication
+
+ME_URL = reverse('member:me')
+DELETE_MEMBER_URL = reverse('member:member-deleteMember', kwargs={'pk': None})
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests token lookups are cached and invalidated"""
+
+    def setUp(self):
+        # A file based cache is shared by processes like memcached
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        cache_settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir,
+        }})
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_queries_per_request_reduced(self):
+        """Tests repeated requests authenticate without the database"""
+        factory = APIRequestFactory()
+        requests = 50
+
+        def count_queries(authentication):
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(requests):
+                    request = factory.get(
+                        ME_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+                    user, _ = authentication.authenticate(request)
+                    self.assertEqual(user.id, self.user.id)
+            return len(queries)
+
+        self.assertEqual(count_queries(TokenAuthentication()), requests)
+        self.assertEqual(count_queries(CachedTokenAuthentication()), 1)
+
+    def test_request_authenticated_from_cache(self):
+        """Tests the token is not looked up again"""
+        self.client.get(ME_URL)
+
+        # Only the member is read afresh
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        """Tests a deleted token stops authenticating immediately"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        """Tests the member is read again after a password change"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(ME_URL, {'password': 'newpass1234'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(2):
+            self.client.get(ME_URL)
+
+    def test_cached_member_not_saved(self):
+        """Tests updating the member does not write back cached fields"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(id=self.user.id).update(
+            first_name='Fresh', friends_version=5)
+
+        res = self.client.patch(ME_URL, {'last_name': 'Runner'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['first_name'], 'Fresh')
+        self.user.refresh_from_db()
+        self.assertGreaterEqual(self.user.friends_version, 5)
+        self.assertEqual(self.user.last_name, 'Runner')
+
+    def test_deleted_member_rejected(self):
+        """Tests a deleted member's token stops authenticating"""
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(DELETE_MEMBER_URL,
+                                     {'member_id': self.user.id})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LocalTokenCacheTests(TestCase):
+    """Tests token lookups are not cached per worker process"""
+
+    def test_local_memory_cache_not_used(self):
+        """Tests every request looks the token up in the database"""
+        user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        token = Token.objects.create(user=user)
+        request = APIRequestFactory().get(
+            ME_URL, HTTP_AUTHORIZATION=f'Token {token.key}')
+        CachedTokenAuthentication().authenticate(request)
+
+        with self.assertNumQueries(1):
+            CachedTokenAuthentication().authenticate(request)
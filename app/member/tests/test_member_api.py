@@ -1,6 +1,9 @@
 """
 Tests for the member API
 """
+import json
+from base64 import b64decode, b64encode
+from urllib.parse import unquote
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
@@ -9,6 +12,14 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import (Friends,
+                         Group,
+                         GroupMembership,
+                         GroupStats,
+                         GroupWorkout,
+                         GroupWorkoutEvidence,
+                         TimelineEntry)
+
 
 CREATE_MEMBER_URL = reverse('member:create')
 TOKEN_URL = reverse('member:token')
@@ -183,6 +194,41 @@ class PrivateMemberApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(member.count(), 0)
 
+    def test_delete_member_updates_groups_and_friends(self):
+        """Tests the groups and friends of a deleted member are updated"""
+        other = create_member(email='other@example.com', password='pass123')
+        group = Group.objects.create(
+            group_name='Group', target_workout_number_per_week=3,
+            created_by=other)
+        for member in (self.member, other):
+            GroupMembership.objects.create(member=member, group=group)
+        workout = GroupWorkout.objects.create(
+            group=group, name='Workout', description='Full body',
+            link='http://test.co.uk')
+        for comment in ('First', 'Second'):
+            evidence = GroupWorkoutEvidence.objects.create(
+                member=self.member, workout=workout, comment=comment)
+        TimelineEntry.objects.create(
+            owner=other, actor=self.member, evidence=evidence)
+        Friends.objects.create(user1=self.member, user2=other,
+                               status='Accepted', requested_by=self.member)
+        group.refresh_from_db()
+        other.refresh_from_db()
+
+        res = self.client.delete(DELETE_MEMBER_URL,
+                                 {'member_id': self.member.id})
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        stats = GroupStats.objects.get(group=group)
+        self.assertEqual((stats.member_count, stats.evidence_count), (1, 0))
+        self.assertGreater(Group.objects.get(id=group.id).version,
+                           group.version)
+        self.assertGreater(
+            get_user_model().objects.get(id=other.id).friends_version,
+            other.friends_version)
+        self.assertFalse(Friends.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
     def test_get_member_search_results(self):
 
         user2 = create_member(
@@ -205,9 +251,85 @@ class PrivateMemberApiTests(TestCase):
 
         first_names = []
 
-        for val in res.data:
+        for val in res.data['results']:
             first_names.append(val['first_name'])
 
         self.assertIn(self.member.first_name, first_names)
         self.assertIn(user2.first_name, first_names)
         self.assertNotIn(user3.first_name, first_names)
+
+    def test_member_search_empty_string(self):
+        """Tests an empty search does not return every member"""
+        res = self.client.get(SEARCH_URL, {'search_string': '  '})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+        self.assertIsNone(res.data['next'])
+
+    def test_member_search_ranked(self):
+        """Tests closer matches are returned first, emails included"""
+        contains = create_member(email='a@example.com', password='pass123',
+                                 first_name='Bojordan', last_name='Smith')
+        exact = create_member(email='b@example.com', password='pass123',
+                              first_name='Jordan', last_name='Smith')
+        by_email = create_member(email='jordan.k@example.com',
+                                 password='pass123',
+                                 first_name='Kim', last_name='Lee')
+
+        res = self.client.get(SEARCH_URL, {'search_string': 'jordan'})
+
+        ids = [val['id'] for val in res.data['results']]
+        self.assertEqual(ids[0], exact.id)
+        self.assertIn(contains.id, ids)
+        self.assertIn(by_email.id, ids)
+
+    def test_member_search_paginated(self):
+        """Tests search results are paged with a cursor"""
+        for index in range(5):
+            create_member(email=f'runner{index}@example.com',
+                          password='pass123',
+                          first_name=f'Runner{index}', last_name='Smith')
+
+        res = self.client.get(SEARCH_URL, {'search_string': 'runner',
+                                           'page_size': 3})
+        ids = [val['id'] for val in res.data['results']]
+        res = self.client.get(res.data['next'])
+        ids += [val['id'] for val in res.data['results']]
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        self.assertIsNone(res.data['next'])
+
+    def test_member_search_cursor_rank_exact(self):
+        """Tests the cursor carries the rank as an integer"""
+        for index in range(3):
+            create_member(email=f'runner{index}@example.com',
+                          password='pass123',
+                          first_name=f'Runner{index}', last_name='Smith')
+
+        res = self.client.get(SEARCH_URL, {'search_string': 'runner',
+                                           'page_size': 1})
+        cursor = res.data['next'].split('cursor=')[1].split('&')[0]
+        rank, _ = json.loads(b64decode(unquote(cursor)))
+        self.assertIsInstance(rank, int)
+
+        invalid = b64encode(json.dumps(['high', 1]).encode()).decode()
+        res = self.client.get(SEARCH_URL, {'search_string': 'runner',
+                                           'cursor': invalid})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_member_search_mutual_counts(self):
+        """Tests search results can carry mutual friend counts"""
+        friend = create_member(email='friend@example.com',
+                               password='pass123', first_name='Friend')
+        found = create_member(email='found@example.com', password='pass123',
+                              first_name='Jordan', last_name='Smith')
+        for user1, user2 in ((self.member, friend), (friend, found)):
+            Friends.objects.create(user1=user1, user2=user2,
+                                   status='Accepted', requested_by=user1)
+
+        res = self.client.get(SEARCH_URL, {'search_string': 'jordan',
+                                           'include_mutual': 'true'})
+
+        self.assertEqual(res.data['results'][0]['id'], found.id)
+        self.assertEqual(res.data['results'][0]['mutual_friends'], 1)
@@ -0,0 +1,34 @@
+"""
+Tests for the member search query
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+from member import search
+
+
+class PostgresSearchQueryTests(SimpleTestCase):
+    """Tests the SQL of the PostgreSQL search, compiled without a server"""
+
+    def compile(self, term):
+        postgres = DatabaseWrapper({
+            **connection.settings_dict,
+            'ENGINE': 'django.db.backends.postgresql',
+        })
+        with mock.patch.object(search, 'connection', postgres):
+            queryset = search.search_members(
+                get_user_model().objects.all(), term)
+        return queryset.query.get_compiler(connection=postgres).as_sql()
+
+    def test_substring_match_on_indexed_columns(self):
+        """Tests substrings are matched with ILIKE on the plain columns"""
+        sql, params = self.compile('jo%')
+
+        self.assertNotIn('UPPER', sql)
+        for field in search.SEARCH_FIELDS:
+            self.assertIn(f'"core_user"."{field}" ILIKE %s', sql)
+        self.assertIn('%jo\\%%', params)
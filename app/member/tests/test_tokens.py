@@ -0,0 +1,158 @@
+"""
+Tests for signed access tokens and refresh tokens
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RefreshToken
+from member import tokens
+
+TOKEN_URL = reverse('member:token')
+TOKEN_REFRESH_URL = reverse('member:token-refresh')
+TOKEN_REVOKE_URL = reverse('member:token-revoke')
+ME_URL = reverse('member:me')
+GROUP_MEMBERS_URL = reverse('group:group-members')
+CACHE_STATS_URL = reverse('cache-stats')
+
+
+@override_settings(MEMBER_TOKEN_MODE='signed')
+class SignedTokenTests(TestCase):
+    """Tests issuing, using, refreshing and revoking signed tokens"""
+
+    def setUp(self):
+        tokens.revocation_list.loaded_at = None
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            first_name='Test',
+        )
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@example.com', 'password': 'testpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def use_access_token(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_pair_issued(self):
+        """Tests login returns an access and a refresh token"""
+        issued = self.obtain_tokens()
+
+        self.assertIn('access', issued)
+        self.assertIn('refresh', issued)
+        self.assertEqual(issued['expires_in'], 300)
+        self.assertTrue(RefreshToken.objects.filter(user=self.user).exists())
+        self.assertFalse(RefreshToken.objects.filter(
+            token_hash=issued['refresh']).exists())
+
+    def test_access_token_needs_no_queries(self):
+        """Tests requests are authenticated without the database"""
+        self.use_access_token(self.obtain_tokens()['access'])
+        tokens.revocation_list.reload()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        # The member is read in one query when the view needs it
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['first_name'], 'Test')
+
+    def test_update_keeps_member_inactive(self):
+        """Tests updating a deactivated member does not reactivate it"""
+        self.use_access_token(self.obtain_tokens()['access'])
+        get_user_model().objects.filter(id=self.user.id).update(
+            is_active=False)
+
+        res = self.client.patch(ME_URL, {'first_name': 'Changed'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.first_name, 'Changed')
+
+    def test_expired_access_token_rejected(self):
+        """Tests access tokens stop working after their lifetime"""
+        access = self.obtain_tokens()['access']
+        self.use_access_token(access)
+
+        with mock.patch('time.time', return_value=signing.time.time() + 301):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Bearer')
+
+    def test_tampered_access_token_rejected(self):
+        """Tests the signature is checked"""
+        access = self.obtain_tokens()['access']
+        self.use_access_token(access[:-2] + 'xx')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_tokens(self):
+        """Tests a refresh token is exchanged once for a new pair"""
+        refresh = self.obtain_tokens()['refresh']
+
+        res = self.client.post(TOKEN_REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], refresh)
+        self.use_access_token(res.data['access'])
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+
+        reused = self.client.post(TOKEN_REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(reused.status_code, status.HTTP_401_UNAUTHORIZED)
+        # Reuse of a spent token withdraws the whole family
+        self.assertFalse(RefreshToken.objects.filter(
+            user=self.user, revoked=False).exists())
+
+    def test_revoke_tokens(self):
+        """Tests revoked access and refresh tokens stop working"""
+        issued = self.obtain_tokens()
+        self.use_access_token(issued['access'])
+
+        res = self.client.post(TOKEN_REVOKE_URL,
+                               {'refresh': issued['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        res = self.client.post(TOKEN_REFRESH_URL,
+                               {'refresh': issued['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_seen_by_other_processes(self):
+        """Tests the revocation list is reloaded from the database"""
+        issued = self.obtain_tokens()
+        claims = tokens.verify_access_token(issued['access'])
+        tokens.revoke_tokens(access_claims=claims)
+        tokens.revocation_list.jtis = frozenset()
+        tokens.revocation_list.loaded_at = None
+
+        with self.assertRaises(tokens.InvalidToken):
+            tokens.verify_access_token(issued['access'])
+
+    @override_settings(MEMBER_TOKEN_MODE='db')
+    def test_bearer_ignored_in_db_mode(self):
+        """Tests signed tokens are only accepted when enabled"""
+        with override_settings(MEMBER_TOKEN_MODE='signed'):
+            access = self.obtain_tokens()['access']
+        self.use_access_token(access)
+
+        res = self.client.get(GROUP_MEMBERS_URL, {'group_id': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,151 @@
+"""
+Signed access tokens and the refresh tokens that renew them
+"""
+import datetime
+import hashlib
+import secrets
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import RefreshToken, RevokedAccessToken
+
+ACCESS_TOKEN_SALT = 'member.access-token'
+
+
+class InvalidToken(Exception):
+    """The token is malformed, expired or revoked"""
+
+
+def signed_tokens_enabled():
+    return settings.MEMBER_TOKEN_MODE == 'signed'
+
+
+def issue_access_token(user):
+    """Signs a short lived access token carrying the member's id"""
+    claims = {
+        'uid': user.id,
+        'email': user.email,
+        'staff': user.is_staff,
+        'jti': uuid.uuid4().hex,
+    }
+    return signing.dumps(claims, salt=ACCESS_TOKEN_SALT)
+
+
+def verify_access_token(token):
+    """Returns the claims of a valid access token, checked in-process"""
+    try:
+        claims = signing.loads(token, salt=ACCESS_TOKEN_SALT,
+                               max_age=settings.ACCESS_TOKEN_LIFETIME)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid or expired token.')
+
+    if revocation_list.contains(claims['jti']):
+        raise InvalidToken('Token has been revoked.')
+
+    return claims
+
+
+def issue_token_pair(user):
+    """Creates a refresh token and an access token for the member"""
+    refresh = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=_hash(refresh),
+        expires_at=timezone.now() + datetime.timedelta(
+            seconds=settings.REFRESH_TOKEN_LIFETIME),
+    )
+
+    return {
+        'access': issue_access_token(user),
+        'refresh': refresh,
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def rotate_refresh_token(refresh):
+    """Exchanges a refresh token for a new token pair
+
+    Each refresh token is single use. Presenting one that was already
+    used revokes every refresh token of the member, as it has leaked.
+    """
+    with transaction.atomic():
+        token = RefreshToken.objects.select_for_update().select_related(
+            'user').filter(token_hash=_hash(refresh)).first()
+        if token is None or token.expires_at <= timezone.now():
+            raise InvalidToken('Invalid or expired refresh token.')
+        if not token.revoked and token.user.is_active:
+            token.revoked = True
+            token.save(update_fields=['revoked'])
+            return issue_token_pair(token.user)
+
+    if token.revoked:
+        revoke_member_refresh_tokens(token.user_id)
+        raise InvalidToken('Refresh token has already been used.')
+    raise InvalidToken('Member is inactive.')
+
+
+def revoke_tokens(refresh=None, access_claims=None):
+    """Withdraws a refresh token and an access token ahead of expiry"""
+    if refresh:
+        RefreshToken.objects.filter(token_hash=_hash(refresh)).update(
+            revoked=True)
+
+    if access_claims:
+        now = timezone.now()
+        RevokedAccessToken.objects.filter(expires_at__lte=now).delete()
+        RevokedAccessToken.objects.get_or_create(
+            jti=access_claims['jti'],
+            defaults={'expires_at': now + datetime.timedelta(
+                seconds=settings.ACCESS_TOKEN_LIFETIME)},
+        )
+        revocation_list.add(access_claims['jti'])
+
+
+def revoke_member_refresh_tokens(user_id):
+    """Withdraws every refresh token of the member"""
+    RefreshToken.objects.filter(user_id=user_id, revoked=False).update(
+        revoked=True)
+
+
+class RevocationList:
+    """In-process copy of the revoked access tokens
+
+    Revocations are rare and access tokens short lived, so the list is
+    small. It is reloaded at most every TOKEN_REVOCATION_REFRESH seconds,
+    which keeps authentication free of database round trips.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jtis = frozenset()
+        self.loaded_at = None
+
+    def contains(self, jti):
+        if (self.loaded_at is None or time.monotonic() - self.loaded_at
+                > settings.TOKEN_REVOCATION_REFRESH):
+            self.reload()
+        return jti in self.jtis
+
+    def add(self, jti):
+        with self.lock:
+            self.jtis = self.jtis | {jti}
+
+    def reload(self):
+        jtis = frozenset(RevokedAccessToken.objects.filter(
+            expires_at__gt=timezone.now()).values_list('jti', flat=True))
+        with self.lock:
+            self.jtis = jtis
+            self.loaded_at = time.monotonic()
+
+
+revocation_list = RevocationList()
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -15,6 +15,10 @@ app_name = 'member'
 urlpatterns = [
     path('create/', views.CreateMemberView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path('token/refresh/', views.RefreshTokenView.as_view(),
+         name='token-refresh'),
+    path('token/revoke/', views.RevokeTokenView.as_view(),
+         name='token-revoke'),
     path('me/', views.ManageMemberView.as_view(), name='me'),
     path('', include(router.urls)),
 ]
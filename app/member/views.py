@@ -1,22 +1,38 @@
 """
 Views for the member API
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from rest_framework.decorators import action
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
-from django.db.models import Q
 
+from core.signals import deleting_member
+from friends.graph import annotate_mutual_friends, mutual_counts_requested
+from member.authentication import (
+    SignedTokenAuthentication,
+    invalidate_member_tokens,
+)
+from member.pagination import MemberSearchPagination
+from member.search import search_members
 from member.serializers import (
     MemberSerializer,
     AuthTokenSerializer,
+    RefreshTokenSerializer,
+)
+from member.tokens import (
+    InvalidToken,
+    issue_token_pair,
+    revoke_tokens,
+    rotate_refresh_token,
+    signed_tokens_enabled,
 )
 
 from django.contrib.auth import (
     get_user_model,
 )
+from django.db import transaction
 
 
 class CreateMemberView(generics.CreateAPIView):
@@ -29,23 +45,69 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_class = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        if not signed_tokens_enabled():
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(issue_token_pair(serializer.validated_data['user']))
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new access and refresh token"""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = []
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            tokens = rotate_refresh_token(
+                serializer.validated_data['refresh'])
+        except InvalidToken as exc:
+            return Response({'message': str(exc)},
+                            status=status.HTTP_401_UNAUTHORIZED)
+
+        return Response(tokens)
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Revoke a refresh token and the access token of the request"""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = [SignedTokenAuthentication]
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        access_claims = None
+        if isinstance(request.auth, dict):
+            # Claims of the signed access token the request was made with
+            access_claims = request.auth
+        revoke_tokens(refresh=serializer.validated_data['refresh'],
+                      access_claims=access_claims)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageMemberView(generics.RetrieveUpdateAPIView):
     """Manage the authenticaed member"""
     serializer_class = MemberSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication]
     permissions_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """retrieve and return the authenticated member"""
-        return self.request.user
+        # request.user can come from the token cache, never save it
+        return generics.get_object_or_404(
+            get_user_model(), id=self.request.user.id)
 
 
 class MemberViewSet(mixins.RetrieveModelMixin,
                     viewsets.GenericViewSet):
 
     serializer_class = MemberSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [SignedTokenAuthentication]
     permissions_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -59,13 +121,20 @@ class MemberViewSet(mixins.RetrieveModelMixin,
 
         search_string = self.request.query_params.get('search_string')
 
-        result = get_user_model().objects.filter(
-            Q(first_name__icontains=search_string) |
-            Q(last_name__icontains=search_string))
+        result = search_members(
+            self.get_serializer_class().setup_eager_loading(
+                get_user_model().objects.all()),
+            search_string)
 
-        serializer = self.get_serializer(result, many=True)
+        paginator = MemberSearchPagination()
+        page = paginator.paginate_queryset(result, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        results = serializer.data
+        if mutual_counts_requested(request):
+            annotate_mutual_friends(
+                request.user.id, results, lambda row: row['id'])
 
-        return Response(serializer.data)
+        return paginator.get_paginated_response(results)
 
     @action(detail=True, methods=['DELETE'])
     def deleteMember(self, request, pk=None):
@@ -79,6 +148,8 @@ class MemberViewSet(mixins.RetrieveModelMixin,
             return Response({'message': 'Member does not exist'
                              }, status=status.HTTP_400_BAD_REQUEST)
 
-        member_to_delete.delete()
+        invalidate_member_tokens(member_to_delete.id)
+        with transaction.atomic(), deleting_member(member_to_delete):
+            member_to_delete.delete()
         return Response({'res': 'Member successfully deleted '},
                         status=status.HTTP_204_NO_CONTENT)
@@ -5,6 +5,19 @@ server {
         alias /vol/static;
     }
 
+    # Media is authorised by the app, which answers with X-Accel-Redirect
+    location /static/media/ {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+    }
+
+    location /protected-media/ {
+        internal;
+        alias                   /vol/static/media/;
+        sendfile                on;
+        tcp_nopush              on;
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;